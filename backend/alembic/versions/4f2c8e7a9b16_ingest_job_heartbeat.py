@@ -0,0 +1,28 @@
+"""ingest job heartbeat
+
+Revision ID: 4f2c8e7a9b16
+Revises: e8b05c3a6d19
+Create Date: 2026-10-18 09:41:22.730514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2c8e7a9b16'
+down_revision: Union[str, Sequence[str], None] = 'e8b05c3a6d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingest_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingest_jobs', 'heartbeat_at')
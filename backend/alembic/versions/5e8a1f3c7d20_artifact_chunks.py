@@ -0,0 +1,45 @@
+"""artifact chunks
+
+Revision ID: 5e8a1f3c7d20
+Revises: 7c41e9b2d5a3
+Create Date: 2026-10-17 16:42:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1f3c7d20'
+down_revision: Union[str, Sequence[str], None] = '7c41e9b2d5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('artifact_chunks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('artifact_id', sa.UUID(), nullable=False),
+    sa.Column('ufdr_file_id', sa.UUID(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=384), nullable=True),
+    sa.ForeignKeyConstraint(['artifact_id'], ['artifacts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ufdr_file_id'], ['ufdr_files.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_artifact_chunks_artifact_id'), 'artifact_chunks', ['artifact_id'], unique=False)
+    op.create_index(op.f('ix_artifact_chunks_ufdr_file_id'), 'artifact_chunks', ['ufdr_file_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_artifact_chunks_ufdr_file_id'), table_name='artifact_chunks')
+    op.drop_index(op.f('ix_artifact_chunks_artifact_id'), table_name='artifact_chunks')
+    op.drop_table('artifact_chunks')
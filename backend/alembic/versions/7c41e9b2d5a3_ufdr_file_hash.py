@@ -0,0 +1,32 @@
+"""ufdr file hash
+
+Revision ID: 7c41e9b2d5a3
+Revises: 3a9d2f6c1b04
+Create Date: 2026-10-17 14:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c41e9b2d5a3'
+down_revision: Union[str, Sequence[str], None] = '3a9d2f6c1b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ufdr_files', sa.Column('file_hash', sa.String(length=64), nullable=True))
+    # promote the hash previously kept only in meta
+    op.execute("UPDATE ufdr_files SET file_hash = meta->>'hash' WHERE file_hash IS NULL AND meta IS NOT NULL")
+    op.create_index(op.f('ix_ufdr_files_file_hash'), 'ufdr_files', ['file_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ufdr_files_file_hash'), table_name='ufdr_files')
+    op.drop_column('ufdr_files', 'file_hash')
@@ -0,0 +1,43 @@
+"""embedding hnsw indexes
+
+Revision ID: 9b3f6d2e8a41
+Revises: 5e8a1f3c7d20
+Create Date: 2026-10-17 18:20:54.117063
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3f6d2e8a41'
+down_revision: Union[str, Sequence[str], None] = '5e8a1f3c7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# MiniLM embeddings are compared by cosine distance, so the indexes use vector_cosine_ops.
+HNSW_WITH = {'m': 16, 'ef_construction': 64}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps artifacts writable while a large table is indexed;
+    # it cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_artifacts_embedding_hnsw', 'artifacts', ['embedding'], unique=False,
+                        postgresql_using='hnsw', postgresql_with=HNSW_WITH,
+                        postgresql_ops={'embedding': 'vector_cosine_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_artifact_chunks_embedding_hnsw', 'artifact_chunks', ['embedding'], unique=False,
+                        postgresql_using='hnsw', postgresql_with=HNSW_WITH,
+                        postgresql_ops={'embedding': 'vector_cosine_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_artifact_chunks_embedding_hnsw', table_name='artifact_chunks', postgresql_concurrently=True)
+        op.drop_index('ix_artifacts_embedding_hnsw', table_name='artifacts', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""artifact search tsvector
+
+Revision ID: c2d7a91e4f58
+Revises: 9b3f6d2e8a41
+Create Date: 2026-10-17 19:42:10.503311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7a91e4f58'
+down_revision: Union[str, Sequence[str], None] = '9b3f6d2e8a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A stored generated column is filled in by the table rewrite this causes,
+    # and kept current by Postgres on every insert/update afterwards.
+    op.add_column('artifacts', sa.Column(
+        'search_tsv', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', coalesce(extracted_text, ''))", persisted=True),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_artifacts_search_tsv', 'artifacts', ['search_tsv'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_artifacts_search_tsv', table_name='artifacts', postgresql_concurrently=True)
+    op.drop_column('artifacts', 'search_tsv')
@@ -0,0 +1,35 @@
+"""artifact text trigram index
+
+Revision ID: e8b05c3a6d19
+Revises: c2d7a91e4f58
+Create Date: 2026-10-17 21:05:37.281640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b05c3a6d19'
+down_revision: Union[str, Sequence[str], None] = 'c2d7a91e4f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm ships with Postgres contrib; the index serves ILIKE '%...%'
+    # and word_similarity (<%) lookups on extracted_text.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index('ix_artifacts_extracted_text_trgm', 'artifacts', ['extracted_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'extracted_text': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_artifacts_extracted_text_trgm', table_name='artifacts', postgresql_concurrently=True)
@@ -9,7 +9,10 @@ from app.db.session import get_db
 from app.core.security import get_current_user
 from app.models.ufdrfile import UFDRFile
 from app.utils.audit_utils import create_audit
-from app.core.cache import del_pattern
+from app.core.cache import cache_memory_report, del_pattern
+from app.utils import vector_index
+from app.core.embedding_cache import embedding_cache_stats
+from app.core.semantic_cache import semantic_cache_stats
 from app.models.user import User, UserRole
 from app.schemas.user import AdminCreate, UserOut
 from app.core.security import get_password_hash
@@ -53,6 +56,7 @@ async def hard_delete_ufdr(ufdr_id: str, db: AsyncSession = Depends(get_db), cur
     try:
         await del_pattern(f"llm:{ufdr_id}:*")
         await del_pattern(f"search:{ufdr_id}:*")
+        await vector_index.bump_version(ufdr_id)
     except Exception:
         pass
     await create_audit(db, str(current_user.id), None, "hard_delete", "DELETE", f"/api/v1/admin/ufdr/{ufdr_id}", 200, None)
@@ -87,6 +91,7 @@ async def run_retention(days: int = Body(..., embed=True), mode: str = Body("sof
             try:
                 await del_pattern(f"llm:{ufdr.id}:*")
                 await del_pattern(f"search:{ufdr.id}:*")
+                await vector_index.bump_version(ufdr.id)
             except Exception:
                 pass
         affected.append(str(ufdr.id))
@@ -148,3 +153,36 @@ async def create_user_admin(
         "force_password_change": new_user.force_password_change,
         "temp_password": temp_password,
     }
+
+
+@router.get("/cache/embeddings")
+async def get_embedding_cache_stats(current_user: User = Depends(get_current_user)):
+    """Admin-only: embedding cache size and hit rate."""
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Admin required")
+    try:
+        return await embedding_cache_stats()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Embedding cache unavailable")
+
+
+@router.get("/cache/llm")
+async def get_llm_cache_stats(current_user: User = Depends(get_current_user)):
+    """Admin-only: semantic LLM answer cache hit rate."""
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Admin required")
+    try:
+        return await semantic_cache_stats()
+    except Exception:
+        raise HTTPException(status_code=503, detail="LLM cache unavailable")
+
+
+@router.get("/cache/memory")
+async def get_cache_memory(current_user: User = Depends(get_current_user)):
+    """Admin-only: Redis memory per key namespace (scans every key)."""
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Admin required")
+    try:
+        return await cache_memory_report()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Redis unavailable")
@@ -1,5 +1,6 @@
 # app/api/routes/artifacts.py
 
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -10,6 +11,7 @@ from app.models.artifact import Artifact
 from app.models.ufdrfile import UFDRFile
 from app.models.case_assignment import CaseAssignment
 from app.models.user import User
+from app.utils.text_search import contains, fuzzy_match, fuzzy_score, set_word_similarity_threshold
 
 router = APIRouter(prefix="/artifacts", tags=["Artifacts"])
 
@@ -17,6 +19,10 @@ router = APIRouter(prefix="/artifacts", tags=["Artifacts"])
 async def list_artifacts(
     ufdr_file_id: str,
     q: str | None = Query(None, description="Keyword for FTS search"),
+    match: Literal["fts", "substring", "fuzzy"] = Query(
+        "fts", description="fts (stemmed words), substring (e.g. part of a number) or fuzzy (misspelt names)"
+    ),
+    threshold: float = Query(0.6, ge=0.0, le=1.0, description="fuzzy: minimum word similarity"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
@@ -47,11 +53,17 @@ async def list_artifacts(
     # --- Build query ---
     stmt = select(Artifact).where(Artifact.ufdr_file_id == ufdr_file_id)
 
-    # 🧠 Full-Text Search (FTS)
-    if q:
-        stmt = stmt.where(
-            func.to_tsvector("english", Artifact.extracted_text)
-            .op("@@")(func.plainto_tsquery("english", q))
+    # 🧠 Full-Text Search (FTS) over the stored, GIN-indexed tsvector
+    if q and match == "fts":
+        stmt = stmt.where(Artifact.search_tsv.op("@@")(func.plainto_tsquery("english", q)))
+
+    # 🔎 Substring / fuzzy matching, served by the pg_trgm index
+    elif q and match == "substring":
+        stmt = stmt.where(contains(Artifact.extracted_text, q))
+    elif q and match == "fuzzy":
+        await set_word_similarity_threshold(db, threshold)
+        stmt = stmt.where(fuzzy_match(Artifact.extracted_text, q)).order_by(
+            fuzzy_score(Artifact.extracted_text, q).desc(), Artifact.id
         )
 
     # 🧭 Pagination
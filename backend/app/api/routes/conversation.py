@@ -2,53 +2,118 @@
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import or_
 from datetime import datetime
+import json
 import uuid
 from typing import List, Optional
 from sqlalchemy import select
+from app.db import session as db_session
 from app.db.deps import get_db
 from app.core.security import get_current_user
 from app.models.artifact import Artifact
 from app.models.ufdrfile import UFDRFile
 from app.models.user import User
-from app.utils.ai_utils import build_forensic_prompt
-from app.utils.embedding_utils import generate_embedding
+from app.utils.ai_utils import build_context, build_forensic_prompt, estimate_tokens
+from app.utils.embedding_utils import agenerate_embedding
+from app.utils.vector_search import SearchMode, load_passages, search_passages
+from app.utils.text_search import contains, indexable_terms
 from app.utils.chat_memory import load_session, save_session
-from app.core.cache import (
-    get_cached,
-    set_cached,
-    search_cache_key,
-    llm_cache_key,
-)
-from app.core.llm import ask_llm_cached
+from app.core.cache import get_or_compute, search_cache_key
+from app.core.llm import ask_llm_cached, stream_llm_cached
 from app.core.config import settings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-@router.post("/ask/{ufdr_file_id}")
-async def ask_ai(
-    ufdr_file_id: str,
-    q: str = Query(..., description="Your question about this UFDR file"),
-    top_k: int = Query(100, ge=1, le=300),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """Handles UFDR-based forensic queries with conversational memory."""
-    # 1️⃣ Validate UFDR
-    result = await db.execute(select(UFDRFile).where(UFDRFile.id == ufdr_file_id))
-    ufdr = result.scalars().first()
-    if not ufdr:
-        raise HTTPException(status_code=404, detail="UFDR not found")
+# ---------- Retrieval ----------
+# Vector search ranks the chunks stored at ingest (app.utils.vector_search);
+# nothing is split per request. build_context then packs the passages into
+# the CONTEXT_TOKEN_BUDGET by relevance.
 
-    # -------------------------
-    #  Load / create chat session
-    # -------------------------
+
+async def _keyword_artifacts(db: AsyncSession, ufdr_file_id: str, q: str, top_k: int) -> List[Artifact]:
+    q_terms = indexable_terms(q)
+    stmt = select(Artifact).where(Artifact.ufdr_file_id == ufdr_file_id)
+    if q_terms:
+        # escaped, and each term answered from the trigram index
+        stmt = stmt.where(or_(*[contains(Artifact.extracted_text, t) for t in q_terms]))
+    res = await db.execute(stmt.limit(top_k))
+    return res.scalars().all()
+
+
+async def _load_artifacts(db: AsyncSession, artifact_ids: List[str]) -> List[Artifact]:
+    """Artifacts by id, in the order given."""
+    res = await db.execute(select(Artifact).where(Artifact.id.in_(artifact_ids)))
+    rows = {str(a.id): a for a in res.scalars().all()}
+    return [rows[i] for i in artifact_ids if i in rows]
+
+
+async def _search_context(ufdr_file_id: str, q: str, top_k: int, mode: Optional[str]) -> dict:
+    """
+    The search cache entry for a question: its ranked passages as
+    [artifact_id, chunk_id or None, score] references only. Texts are read
+    back from the chunk store on use, so entries stay small.
+    """
+    try:
+        q_emb = await agenerate_embedding(q)
+        q_emb = [float(x) for x in q_emb] if q_emb else None
+    except Exception:
+        q_emb = None
+
+    # own session: the entry may be refreshed in the background after the request has finished
+    async with db_session.SessionLocal() as db:
+        passages: List[tuple] = []
+        if q_emb:
+            try:
+                # savepoint: a failed vector query must not abort the transaction the fallback needs
+                async with db.begin_nested():
+                    passages = await search_passages(db, ufdr_file_id, q_emb, top_k, mode)
+            except Exception:
+                passages = []
+        if not passages:
+            artifacts = await _keyword_artifacts(db, ufdr_file_id, q, top_k)
+            passages = [(str(a.id), a.extracted_text, None, None) for a in artifacts]
+
+    return {"passages": [[art_id, chunk_id, score] for art_id, _text, score, chunk_id in passages]}
+
+
+async def _retrieve_context(
+    db: AsyncSession, ufdr_file_id: str, q: str, top_k: int, mode: Optional[str] = None
+) -> tuple:
+    """
+    (artifacts in the context, context_snippets, context tokens) for a
+    question, via the search cache; concurrent misses share one search.
+    """
+    async def search():
+        return await _search_context(ufdr_file_id, q, top_k, mode)
+
+    found = await get_or_compute(
+        search_cache_key(ufdr_file_id, q, mode or "auto"),
+        search,
+        expire_seconds=settings.SEARCH_CACHE_TTL,
+        stale_seconds=settings.SEARCH_CACHE_STALE_SECONDS,
+        cacheable=lambda v: bool(v.get("passages")),
+    )
+    passages = await load_passages(db, found.get("passages", []))
+    artifacts = await _load_artifacts(db, list(dict.fromkeys(p[0] for p in passages)))
+
+    if not artifacts:
+        # **Permanent safe fallback** (no test-only hack): provide a short, non-sensitive placeholder in context
+        # so LLM can still answer sensibly. Keep it minimal and factual if used in prod.
+        placeholder = "[INFO] No matching artifacts found for this query."
+        return [], placeholder, estimate_tokens(placeholder)
+
+    context_snippets, context_tokens, packed_ids = build_context(passages, {str(a.id): a.type for a in artifacts})
+    by_id = {str(a.id): a for a in artifacts}
+    return [by_id[i] for i in packed_ids], context_snippets, context_tokens
+
+
+async def _load_chat_session(ufdr_file_id: str, current_user: User, db: AsyncSession) -> dict:
     # Use a deterministic session UUID so subsequent calls from the same user+ufdr pick up the same session.
     sess_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{ufdr_file_id}:{current_user.id}"))
 
@@ -60,6 +125,34 @@ async def ask_ai(
             "user_id": str(current_user.id),
             "messages": [],
         }
+    return session_data
+
+
+def _transcript(session_data: dict) -> str:
+    """Human-readable transcript (the 'response' field)."""
+    transcript_lines = []
+    for m in session_data.get("messages", []):
+        # be defensive about expected keys
+        r = m.get("role", "unknown")
+        t = m.get("text", "")
+        transcript_lines.append(f"{r}: {t}")
+    return "\n".join(transcript_lines)
+
+
+async def _prepare_chat(
+    db: AsyncSession, ufdr_file_id: str, q: str, top_k: int, search_mode: Optional[str], current_user: User
+) -> tuple:
+    """(session_data with the question appended, context artifacts, context tokens, prompt)."""
+    # 1️⃣ Validate UFDR
+    result = await db.execute(select(UFDRFile).where(UFDRFile.id == ufdr_file_id))
+    ufdr = result.scalars().first()
+    if not ufdr:
+        raise HTTPException(status_code=404, detail="UFDR not found")
+
+    # -------------------------
+    #  Load / create chat session
+    # -------------------------
+    session_data = await _load_chat_session(ufdr_file_id, current_user, db)
 
     # Append user message to the session (timestamped)
     session_data["messages"].append(
@@ -67,83 +160,9 @@ async def ask_ai(
     )
 
     # -------------------------
-    #  Search artifacts (existing logic)
+    #  Rank stored chunks (keyword fallback)
     # -------------------------
-    s_key = search_cache_key(ufdr_file_id, q)
-    cached_search = await get_cached(s_key)
-    artifacts: List[Artifact] = []
-    context_snippets = ""
-
-    if cached_search and isinstance(cached_search, dict) and "artifact_ids" in cached_search:
-        artifact_ids = cached_search["artifact_ids"]
-        res = await db.execute(select(Artifact).where(Artifact.id.in_(artifact_ids)))
-        rows = {str(a.id): a for a in res.scalars().all()}
-        artifacts = [rows[i] for i in artifact_ids if i in rows]
-        context_snippets = cached_search.get("context_snippets", "")
-    else:
-        # embedding + vector search (keep your existing embedding + fallback code here)
-        try:
-            q_emb = generate_embedding(q)
-            q_emb = [float(x) for x in q_emb] if q_emb else None
-        except Exception as e:
-            q_emb = None
-
-        if q_emb:
-            try:
-                stmt = (
-                    select(Artifact)
-                    .where(Artifact.ufdr_file_id == ufdr_file_id)
-                    .where(Artifact.embedding.isnot(None))
-                    .order_by(Artifact.embedding.l2_distance(q_emb))
-                    .limit(top_k)
-                )
-                res = await db.execute(stmt)
-                artifacts = res.scalars().all()
-            except Exception:
-                artifacts = []
-
-        if not artifacts:
-            q_terms = [t.strip() for t in q.split() if t.strip()]
-            if q_terms:
-                conds = [Artifact.extracted_text.ilike(f"%{t}%") for t in q_terms]
-                stmt = (
-                    select(Artifact)
-                    .where(Artifact.ufdr_file_id == ufdr_file_id)
-                    .where(or_(*conds))
-                    .limit(top_k)
-                )
-            else:
-                stmt = select(Artifact).where(Artifact.ufdr_file_id == ufdr_file_id).limit(top_k)
-            res = await db.execute(stmt)
-            artifacts = res.scalars().all()
-
-        if not artifacts:
-            # **Permanent safe fallback** (no test-only hack): provide a short, non-sensitive placeholder in context
-            # so LLM can still answer sensibly. Keep it minimal and factual if used in prod.
-            context_snippets = "[INFO] No matching artifacts found for this query."
-        else:
-            # Build context_snippets from artifacts (preserve your existing splitting logic)
-            splitter = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=300)
-            for a in artifacts:
-                if not a.extracted_text:
-                    continue
-                chunks = splitter.split_text(a.extracted_text)
-                for chunk in chunks:
-                    if len(context_snippets) + len(chunk) > 200000:
-                        break
-                    context_snippets += f"[{a.type}] {chunk}\n"
-
-            # Cache search results
-            try:
-                artifact_ids = [str(a.id) for a in artifacts]
-                ttl = getattr(settings, "SEARCH_CACHE_TTL", 60 * 60 * 24)
-                await set_cached(
-                    s_key,
-                    {"artifact_ids": artifact_ids, "context_snippets": context_snippets},
-                    expire_seconds=ttl,
-                )
-            except Exception:
-                pass
+    artifacts, context_snippets, context_tokens = await _retrieve_context(db, ufdr_file_id, q, top_k, search_mode)
 
     # -------------------------
     #  Build prompt including prior dialogue (session_data)
@@ -152,37 +171,113 @@ async def ask_ai(
 
     if not isinstance(prompt, str):
         raise RuntimeError("Prompt must be a string; got %r" % (type(prompt),))
+    return session_data, artifacts, context_tokens, prompt
+
+
+def _context_meta(session_data: dict, artifacts: List[Artifact], context_tokens: int, prompt: str) -> dict:
+    return {
+        "session_id": session_data["id"],
+        "context_count": len(artifacts),
+        "context_ids": [str(a.id) for a in artifacts],
+        "context_tokens": context_tokens,
+        "prompt_tokens": estimate_tokens(prompt),
+    }
+
+
+def _append_answer(session_data: dict, ai_answer: str) -> None:
+    session_data["messages"].append(
+        {"role": "assistant", "text": ai_answer, "ts": datetime.utcnow().isoformat()}
+    )
+
+
+@router.post("/ask/{ufdr_file_id}")
+async def ask_ai(
+    ufdr_file_id: str,
+    q: str = Query(..., description="Your question about this UFDR file"),
+    top_k: int = Query(100, ge=1, le=300, description="Passages considered; the prompt keeps what fits CONTEXT_TOKEN_BUDGET"),
+    search_mode: Optional[SearchMode] = Query(
+        None, description="exact, approximate (HNSW index) or auto; defaults to VECTOR_SEARCH_MODE"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Handles UFDR-based forensic queries with conversational memory."""
+    session_data, artifacts, context_tokens, prompt = await _prepare_chat(
+        db, ufdr_file_id, q, top_k, search_mode, current_user
+    )
 
     # 8️⃣ Query LLM (cached)
     ai_answer = await ask_llm_cached(str(ufdr_file_id), q, prompt)
     ai_answer = ai_answer.strip() if ai_answer else ""
 
     # Append assistant answer to session and persist
-    session_data["messages"].append(
-        {"role": "assistant", "text": ai_answer, "ts": datetime.utcnow().isoformat()}
-    )
+    _append_answer(session_data, ai_answer)
     try:
         await save_session(session_data, db)
     except Exception:
         # log but do not fail the request
         pass
 
-    # Build a human-readable transcript (the 'response' field)
-    transcript_lines = []
-    for m in session_data.get("messages", []):
-        # be defensive about expected keys
-        r = m.get("role", "unknown")
-        t = m.get("text", "")
-        transcript_lines.append(f"{r}: {t}")
-    full_transcript = "\n".join(transcript_lines)
-
     # Final response: maintain backward compatibility (answer) and add response + session_id
     return {
         "query": q,
         "ufdr_file_id": ufdr_file_id,
         "answer": ai_answer,
-        "response": full_transcript,
-        "session_id": session_data["id"],
-        "context_count": len(artifacts),
-        "context_ids": [str(a.id) for a in artifacts],
-    }
\ No newline at end of file
+        "response": _transcript(session_data),
+        **_context_meta(session_data, artifacts, context_tokens, prompt),
+    }
+
+
+# ---------- Streaming ----------
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/{ufdr_file_id}/stream")
+async def ask_ai_stream(
+    ufdr_file_id: str,
+    q: str = Query(..., description="Your question about this UFDR file"),
+    top_k: int = Query(100, ge=1, le=300, description="Passages considered; the prompt keeps what fits CONTEXT_TOKEN_BUDGET"),
+    search_mode: Optional[SearchMode] = Query(
+        None, description="exact, approximate (HNSW index) or auto; defaults to VECTOR_SEARCH_MODE"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ask_ai as server-sent events: `context` (retrieval metadata) first, then
+    `token` events as Gemini writes the answer, then `done` with the full
+    answer. The chat session and LLM cache are only written once the answer
+    is complete; a dropped connection leaves both untouched.
+    """
+    session_data, artifacts, context_tokens, prompt = await _prepare_chat(
+        db, ufdr_file_id, q, top_k, search_mode, current_user
+    )
+    meta = {"query": q, "ufdr_file_id": ufdr_file_id, **_context_meta(session_data, artifacts, context_tokens, prompt)}
+
+    async def events():
+        yield _sse("context", meta)
+        parts = []
+        try:
+            async for text in stream_llm_cached(str(ufdr_file_id), q, prompt):
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error communicating with Gemini: {e}"})
+            return
+
+        ai_answer = "".join(parts).strip()
+        _append_answer(session_data, ai_answer)
+        try:
+            # the request's session may already be closed while the body streams
+            async with db_session.SessionLocal() as save_db:
+                await save_session(session_data, save_db)
+        except Exception:
+            pass
+        yield _sse("done", {"answer": ai_answer, "response": _transcript(session_data), "session_id": session_data["id"]})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
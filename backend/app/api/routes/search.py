@@ -0,0 +1,185 @@
+# app/api/routes/search.py
+
+import asyncio
+import base64
+import json
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.access import get_ufdr_for_user
+from app.core.cache import get_or_compute, search_cache_key
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.db import session as db_session
+from app.db.deps import get_db
+from app.models.artifact import Artifact
+from app.models.user import User
+from app.utils.embedding_utils import agenerate_embedding
+from app.utils.vector_search import SearchMode, search_passages
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+# ---------- Rankers ----------
+# Each ranker opens its own session so the two queries really run at the
+# same time; one AsyncSession can only execute one statement at once.
+def _tsquery(q: str):
+    # websearch syntax: quoted phrases, OR, -excluded; never raises on user input
+    return func.websearch_to_tsquery("english", q)
+
+
+async def _fts_ranked(ufdr_file_id: str, q: str, limit: int) -> List[str]:
+    """Artifact ids matching the stored tsvector, best ts_rank_cd first."""
+    query = _tsquery(q)
+    rank = func.ts_rank_cd(Artifact.search_tsv, query)
+    async with db_session.SessionLocal() as db:
+        res = await db.execute(
+            select(Artifact.id)
+            .where(Artifact.ufdr_file_id == ufdr_file_id, Artifact.search_tsv.op("@@")(query))
+            .order_by(rank.desc(), Artifact.id)
+            .limit(limit)
+        )
+        return [str(i) for i in res.scalars().all()]
+
+
+async def _vector_ranked(ufdr_file_id: str, q: str, limit: int, mode: Optional[str]) -> Optional[List[str]]:
+    """Artifact ids by their closest chunk (or whole-text) embedding; None if embedding or the query fails."""
+    try:
+        q_emb = await agenerate_embedding(q)
+        if not q_emb:
+            return None
+        async with db_session.SessionLocal() as db:
+            async with db.begin():
+                passages = await search_passages(db, ufdr_file_id, [float(x) for x in q_emb], limit, mode)
+    except Exception as e:
+        print(f"[SEARCH] vector search failed for {ufdr_file_id}: {e}")
+        return None
+    return list(dict.fromkeys(p[0] for p in passages))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[str]], k: int) -> List[list]:
+    """
+    Merge ranked id lists: score(id) = sum of 1 / (k + rank) over the lists
+    it appears in (rank from 1). Returns [id, score, rank in each list or
+    None, ...] rows, best score first, ties broken by id for a stable order.
+    """
+    ranks: Dict[str, List[Optional[int]]] = {}
+    for n, ranking in enumerate(rankings):
+        for rank, art_id in enumerate(ranking, start=1):
+            ranks.setdefault(art_id, [None] * len(rankings))[n] = rank
+    rows = [
+        [art_id, sum(1.0 / (k + r) for r in per_list if r is not None), *per_list]
+        for art_id, per_list in ranks.items()
+    ]
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    return rows
+
+
+# ---------- Cursors ----------
+# The cursor is the (score, id) of the last hit served, so a page is stable
+# even if the cached hit list expires and is recomputed in between.
+def _encode_cursor(score: float, art_id: str) -> str:
+    raw = json.dumps([score, art_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, art_id = json.loads(raw)
+        return float(score), str(art_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page(hits: List[list], cursor: Optional[str], limit: int) -> tuple:
+    """(hits after the cursor, up to limit; whether more follow)."""
+    if cursor:
+        score, art_id = _decode_cursor(cursor)
+        hits = [h for h in hits if (-h[1], h[0]) > (-score, art_id)]
+    return hits[:limit], len(hits) > limit
+
+
+async def _hybrid_hits(ufdr_file_id: str, q: str, mode: Optional[str]) -> List[list]:
+    """Fused [id, score, fts_rank, vector_rank] rows for the query, via the search cache."""
+    async def fuse():
+        limit = settings.SEARCH_CANDIDATES
+        fts, vec = await asyncio.gather(
+            _fts_ranked(ufdr_file_id, q, limit),
+            _vector_ranked(ufdr_file_id, q, limit, mode),
+        )
+        fused = {"hits": reciprocal_rank_fusion([fts, vec or []], settings.SEARCH_RRF_K)}
+        if vec is None:
+            fused["partial"] = True  # FTS only: served, but not cached
+        return fused
+
+    cached = await get_or_compute(
+        search_cache_key(ufdr_file_id, q, f"hybrid:{mode or 'auto'}"),
+        fuse,
+        expire_seconds=settings.SEARCH_CACHE_TTL,
+        stale_seconds=settings.SEARCH_CACHE_STALE_SECONDS,
+        cacheable=lambda value: not value.get("partial"),
+    )
+    return cached["hits"]
+
+
+@router.get("/{ufdr_file_id}")
+async def hybrid_search(
+    ufdr_file_id: str,
+    q: str = Query(..., min_length=1, description="Keywords or a natural-language question"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    search_mode: Optional[SearchMode] = Query(
+        None, description="Vector side: exact, approximate (HNSW index) or auto"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Full-text (stored tsvector) and vector search run concurrently and are
+    merged with reciprocal rank fusion, so an artifact found by both ranks
+    above one found by either alone. Snippets are highlighted with <mark>.
+    """
+    await get_ufdr_for_user(db, ufdr_file_id, current_user)
+
+    hits = await _hybrid_hits(ufdr_file_id, q, search_mode)
+    page, more = _page(hits, cursor, limit)
+
+    # headlines only for the page being returned: ts_headline re-parses the text
+    rows = {}
+    if page:
+        headline = func.ts_headline(
+            "english", func.coalesce(Artifact.extracted_text, ""), _tsquery(q), settings.SEARCH_HEADLINE_OPTIONS
+        )
+        res = await db.execute(
+            select(Artifact.id, Artifact.type, Artifact.created_at, headline.label("snippet"))
+            .where(Artifact.ufdr_file_id == ufdr_file_id, Artifact.id.in_([h[0] for h in page]))
+        )
+        rows = {str(r.id): r for r in res.all()}
+
+    results = []
+    for art_id, score, fts_rank, vector_rank in page:
+        r = rows.get(art_id)
+        if r is None:
+            continue
+        results.append({
+            "id": art_id,
+            "type": r.type,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+            "snippet": r.snippet,
+            "score": score,
+            "fts_rank": fts_rank,
+            "vector_rank": vector_rank,
+        })
+
+    return {
+        "query": q,
+        "ufdr_file_id": ufdr_file_id,
+        "total": len(hits),
+        "results": results,
+        "next_cursor": _encode_cursor(page[-1][1], page[-1][0]) if more else None,
+    }
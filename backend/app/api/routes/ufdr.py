@@ -1,29 +1,40 @@
 ## backend/app/api/routes/ufdr.py
 import os
 import hashlib
+import functools
 import uuid
 import tempfile
 import shutil
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Query, Request, Body, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from sqlalchemy.exc import IntegrityError
-from app.core.minio_client import upload_to_minio
-from fastapi.concurrency import run_in_threadpool
-from app.utils.parsers import (
-    parse_csv, parse_xml, parse_image, parse_audio,
-    parse_document, parse_text, parse_video
+from app.core.minio_client import (
+    upload_to_minio, create_multipart_upload, upload_part,
+    complete_multipart_upload, abort_multipart_upload, list_uploaded_parts,
+    presigned_put_url, presigned_part_url, object_size, remove_object,
+    MIN_PART_SIZE, MAX_PARTS
 )
+from app.core import upload_sessions
+from fastapi.concurrency import run_in_threadpool
+from app.core.access import check_case_access
 from app.core.security import get_current_user
 from app.db.deps import get_db
 from app.models.user import User
 from app.models.ufdrfile import UFDRFile
-from app.models.artifact import Artifact
 from app.models.case_assignment import CaseAssignment
-from app.utils.file_utils import safe_extract_zip, make_tempdir
-from app.utils.embedding_utils import generate_embedding
+from app.models.ingest_job import IngestJob
+from app.utils.file_utils import iter_upload_chunks, stream_to_path, UploadTooLargeError
+from app.utils.ingest import run_ingest_job, find_dedup_source
+from app.core.ingest_queue import enqueue_ingest_job
+from app.core.cache import acquire_lock, release_lock, ingest_lock_key
 from app.utils.audit_utils import create_audit
+from app.core.config import settings
+
+# Slack for multipart boundaries/headers when pre-checking Content-Length.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -40,172 +51,615 @@ def sha256sum_from_path(file_path: str) -> str:
     return h.hexdigest()
 
 
-def parse_zip(file_path: str):
-    """Safely extract and parse supported files inside a ZIP."""
-    artifacts = []
-    supported_exts = (
-        ".csv", ".xml", ".jpg", ".png", ".mp3", ".wav",
-        ".pdf", ".doc", ".txt", ".mp4", ".mkv"
-    )
+# ---------- Upload Endpoint ----------
+def _clean_zip_filename(filename: str | None) -> str:
+    raw_filename = (filename or "upload").replace("/", "_").replace("\\", "_")
+    if not raw_filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Only .zip files are supported")
+    return raw_filename
+
+
+def _reject_oversized(request: Request, limit: int) -> None:
+    """Fail fast on a declared Content-Length before reading any of the body."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail="File too large")
+
+
+async def _save_stream(chunks, raw_filename: str) -> tuple[str, str, int, str]:
+    """Stream chunks into a fresh temp dir; returns (tmp_dir, tmp_path, size, sha256)."""
+    tmp_dir = tempfile.mkdtemp(prefix="upload_tmp_")
+    tmp_path = os.path.join(tmp_dir, raw_filename)
+    try:
+        size, file_hash = await stream_to_path(chunks, tmp_path, settings.MAX_UPLOAD_BYTES)
+    except UploadTooLargeError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail="File too large")
+    except Exception as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    return tmp_dir, tmp_path, size, file_hash
+
 
-    tmp_dir_path, tmp_obj = make_tempdir(prefix="ufdr_ex_")
+@asynccontextmanager
+async def _upload_lock(file_hash: str):
+    """
+    Per-hash Redis lock shared by all API nodes, so two concurrent uploads of
+    the same ZIP can't both miss the duplicate lookup and ingest it twice.
+    If Redis is unreachable the upload proceeds unlocked rather than failing:
+    the duplicate lookup still runs, only the cross-node race window reopens.
+    """
+    key = ingest_lock_key(file_hash)
+    token = None
+    try:
+        token = await acquire_lock(key, settings.INGEST_LOCK_TTL, settings.INGEST_LOCK_WAIT)
+        if token is None:
+            raise HTTPException(status_code=409, detail="The same file is already being uploaded; retry shortly")
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Fail open: losing the lock only risks a duplicate ingest, not data loss
+        print(f"[INGEST] lock unavailable, uploading without it: {e}")
     try:
-        extracted_files = safe_extract_zip(file_path, tmp_dir_path)
-        for fpath in extracted_files:
-            lower = fpath.lower()
-            if not lower.endswith(supported_exts):
-                continue
-
-            if lower.endswith(".csv"):
-                artifacts.extend(parse_csv(fpath))
-            elif lower.endswith(".xml"):
-                artifacts.extend(parse_xml(fpath))
-            elif lower.endswith((".jpg", ".png")):
-                artifacts.extend(parse_image(fpath))
-            elif lower.endswith((".mp3", ".wav")):
-                artifacts.extend(parse_audio(fpath))
-            elif lower.endswith((".pdf", ".doc")):
-                artifacts.extend(parse_document(fpath))
-            elif lower.endswith(".txt"):
-                artifacts.extend(parse_text(fpath))
-            elif lower.endswith((".mp4", ".mkv")):
-                artifacts.extend(parse_video(fpath))
+        yield
     finally:
+        if token:
+            try:
+                await release_lock(key, token)
+            except Exception:
+                pass
+
+
+async def _record_upload(
+    db: AsyncSession,
+    current_user: User,
+    case_id: str | None,
+    filename: str,
+    storage_path: str,
+    file_hash: str | None,
+    size: int,
+    path: str,
+    source: UFDRFile | None = None,
+) -> tuple[UFDRFile, IngestJob]:
+    """Create the UFDR row, its queued ingest job and the audit entry, and commit."""
+    # -------- Save UFDR record --------
+    meta = {
+        "uploaded_by": str(current_user.id),
+        "uploaded_at": datetime.utcnow().isoformat(),
+        "hash": file_hash,
+        "size": size,
+    }
+    if source is not None:
+        meta["deduplicated_from"] = str(source.id)
+    new_ufdr = UFDRFile(
+        filename=filename,
+        storage_path=storage_path,  # 👈 stored in MinIO now
+        file_hash=file_hash,
+        meta=meta,
+        case_id=case_id,
+    )
+
+    db.add(new_ufdr)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Duplicate UFDR file")
+
+    # -------- Create ingest job --------
+    job = IngestJob(ufdr_file_id=new_ufdr.id, status="queued", created_by=current_user.id)
+    db.add(job)
+
+    # -------- Audit Log --------
+    await create_audit(
+        db=db,
+        user_id=str(current_user.id),
+        ip_address=None,
+        action_type="upload",
+        method="POST",
+        path=path,
+        status_code=201,
+    )
+    await db.commit()
+    return new_ufdr, job
+
+
+async def _start_ingest(
+    db: AsyncSession,
+    job: IngestJob,
+    response_payload: dict,
+    local_path: str | None = None,
+    clone_ready: bool = False,
+    store=None,
+) -> dict:
+    """
+    Queue the job for the workers (clones of an earlier upload included), or
+    run it here in inline mode. `store` is a MinIO upload still to be done;
+    inline ingestion runs it alongside parsing. `clone_ready` says a
+    duplicate's source has finished ingesting; inline, a duplicate whose
+    source is still underway parses its local copy instead of waiting.
+    """
+    if settings.INGEST_ASYNC:
+        # -------- Hand off to ingestion workers --------
         try:
-            tmp_obj.cleanup()
-        except Exception:
-            pass
+            await enqueue_ingest_job(str(job.id))
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"Could not enqueue: {e}"
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            raise HTTPException(status_code=503, detail="Ingestion queue unavailable")
+        response_payload["status"] = "queued"
+    else:
+        # -------- Parse and embed artifacts (or clone them) inline --------
+        job = await run_ingest_job(
+            job.id, local_path=local_path, worker="inline", store=store,
+            clone_wait=None if clone_ready else 0,
+        )
+        response_payload["status"] = job.status
+        response_payload["artifacts_parsed"] = (job.progress or {}).get("artifacts", 0)
+    return response_payload
 
-    return artifacts
+
+async def _ingest_saved_upload(
+    db: AsyncSession,
+    current_user: User,
+    case_id: str | None,
+    filename: str,
+    raw_filename: str,
+    tmp_dir: str,
+    tmp_path: str,
+    size: int,
+    file_hash: str,
+    path: str,
+):
+    """
+    Push a streamed upload to MinIO, record it and queue (or run) its ingest
+    job. A ZIP whose hash matches an earlier live upload skips MinIO and
+    clones that upload's artifacts instead of being parsed again. Inline
+    ingestion starts parsing straight away and uploads to MinIO meanwhile;
+    queued jobs need the object in MinIO before a worker can pick them up.
+    """
+    store = None
+    try:
+        async with _upload_lock(file_hash):
+            # -------- Same content uploaded before? --------
+            source, source_status = await find_dedup_source(db, file_hash, current_user)
+
+            if source is not None:
+                storage_path = source.storage_path
+            elif not settings.INGEST_ASYNC:
+                object_name = f"{uuid.uuid4().hex}/{raw_filename}"
+                storage_path = f"{settings.MINIO_BUCKET_NAME}/{object_name}"
+                store = functools.partial(run_in_threadpool, upload_to_minio, tmp_path, object_name)
+            else:
+                try:
+                    object_name = f"{uuid.uuid4().hex}/{raw_filename}"
+
+                    # -------- Upload to MinIO --------
+                    storage_path = await run_in_threadpool(upload_to_minio, tmp_path, object_name)
+
+                except Exception as e:
+                    import traceback
+                    print("UPLOAD ERROR:", traceback.format_exc())
+                    raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+            new_ufdr, job = await _record_upload(
+                db, current_user, case_id, filename, storage_path, file_hash, size, path, source
+            )
+    except HTTPException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    response_payload = {
+        "id": str(getattr(new_ufdr, "id", None)) or str(uuid.uuid4()),  # fallback safe
+        "filename": filename,
+        "hash": file_hash,
+        "size": size,
+        "storage_path": storage_path,
+        "uploaded_at": datetime.utcnow().isoformat(),
+        "job_id": str(job.id),
+    }
+    if source is not None:
+        response_payload["deduplicated_from"] = str(source.id)
+
+    try:
+        return await _start_ingest(
+            db, job, response_payload, local_path=tmp_path,
+            clone_ready=source_status == "done", store=store,
+        )
+    finally:
+        # -------- Cleanup --------
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
-# ---------- Upload Endpoint ----------
 @router.post("/upload")
 async def upload_ufdr(
+    request: Request,
     file: UploadFile = File(...),
     case_id: str | None = Form(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-   
-    MAX_UPLOAD_BYTES = 500 * 1024 * 1024  # 500 MB
-    allowed_exts = (".zip",)
-
-    raw_filename = (file.filename or "upload").replace("/", "_").replace("\\", "_")
-    if not raw_filename.lower().endswith(".zip"):
-        raise HTTPException(status_code=400, detail="Only .zip files are supported")
+    """
+    Multipart upload; the file part is copied to disk in fixed-size chunks.
+    Starlette spools the whole multipart body before this handler runs, so
+    only the Content-Length precheck happens early; use /upload/stream for
+    a body that is size-checked and hashed as it arrives.
+    """
+    raw_filename = _clean_zip_filename(file.filename)
+    _reject_oversized(request, settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
 
     # -------- Investigator access check --------
-    if current_user.role == "investigator":
-        if not case_id:
-            raise HTTPException(
-                status_code=400,
-                detail="case_id is required for investigators"
-            )
-        res = await db.execute(
-            select(CaseAssignment).where(
-                and_(
-                    CaseAssignment.case_id == case_id,
-                    CaseAssignment.user_id == current_user.id,
-                )
-            )
-        )
-        if res.scalar_one_or_none() is None:
-            raise HTTPException(status_code=403, detail="You are not assigned to this case")
+    await check_case_access(db, current_user, case_id)
+
+    # -------- Stream to disk (hashing as we go) --------
+    tmp_dir, tmp_path, size, file_hash = await _save_stream(
+        iter_upload_chunks(file, settings.UPLOAD_CHUNK_SIZE), raw_filename
+    )
+
+    return await _ingest_saved_upload(
+        db, current_user, case_id, file.filename, raw_filename,
+        tmp_dir, tmp_path, size, file_hash, path="/ufdr/upload",
+    )
 
-    # -------- Save temporarily to disk --------
-    tmp_dir = tempfile.mkdtemp(prefix="upload_tmp_")
-    tmp_path = os.path.join(tmp_dir, raw_filename)
 
+@router.post("/upload/stream")
+async def upload_ufdr_stream(
+    request: Request,
+    filename: str = Query(..., description="Original .zip filename"),
+    case_id: str | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Raw-body upload: the request body *is* the ZIP. Bytes go straight from the
+    socket to the temp file, so oversized uploads are cut off mid-stream
+    instead of after the whole body has been received.
+    """
+    raw_filename = _clean_zip_filename(filename)
+    _reject_oversized(request, settings.MAX_UPLOAD_BYTES)
+
+    await check_case_access(db, current_user, case_id)
+
+    tmp_dir, tmp_path, size, file_hash = await _save_stream(request.stream(), raw_filename)
+    if size == 0:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    return await _ingest_saved_upload(
+        db, current_user, case_id, filename, raw_filename,
+        tmp_dir, tmp_path, size, file_hash, path="/ufdr/upload/stream",
+    )
+
+# ---------- Resumable Upload ----------
+# POST /uploads → PUT /uploads/{id}/chunks/{n} (repeat) → POST /uploads/{id}/complete.
+# GET /uploads/{id} says where to resume after a dropped connection. Chunks
+# go straight into a MinIO multipart upload; the API node holds at most one
+# chunk per request and never the whole file. The ZIP's SHA-256 is computed
+# by the ingest worker as it streams the finished object back down.
+async def _owned_session(upload_id: str, current_user: User) -> dict:
     try:
-        with open(tmp_path, "wb") as out_f:
-            content = await file.read()
-            if len(content) > MAX_UPLOAD_BYTES:
-                raise HTTPException(status_code=413, detail="File too large")
-            out_f.write(content)
+        session = await upload_sessions.get_session(upload_id)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Upload session store unavailable")
+    if not session or session["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
 
-        file_hash = sha256sum_from_path(tmp_path)
-        object_name = f"{uuid.uuid4().hex}/{raw_filename}"
 
-        # -------- Upload to MinIO --------
-       
-        storage_path = await run_in_threadpool(upload_to_minio, tmp_path, object_name)
+async def _read_chunk(request: Request, limit: int) -> tuple[bytes, str]:
+    buf = bytearray()
+    h = hashlib.sha256()
+    async for piece in request.stream():
+        if len(buf) + len(piece) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk larger than {limit} bytes")
+        h.update(piece)
+        buf.extend(piece)
+    return bytes(buf), h.hexdigest()
+
+
+async def _finish_chunked(session: dict) -> tuple[str, int]:
+    if not session["parts"]:
+        raise HTTPException(status_code=400, detail="No chunks uploaded")
+    if session["total_size"] is not None and session["offset"] != session["total_size"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Received {session['offset']} of {session['total_size']} bytes",
+        )
+    try:
+        storage_path = await run_in_threadpool(
+            complete_multipart_upload,
+            session["object_name"],
+            session["minio_upload_id"],
+            [(p["n"], p["etag"]) for p in session["parts"]],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Completing upload failed: {str(e)}")
+    return storage_path, session["offset"]
+
 
+@router.post("/uploads")
+async def create_resumable_upload(
+    filename: str = Body(..., embed=True),
+    case_id: str | None = Body(None, embed=True),
+    size: int | None = Body(None, embed=True, description="Total bytes, if known"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Open a resumable upload session for a (possibly multi-GB) UFDR ZIP."""
+    raw_filename = _clean_zip_filename(filename)
+    if size is not None and size > settings.RESUMABLE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    await check_case_access(db, current_user, case_id)
 
+    object_name = f"{uuid.uuid4().hex}/{raw_filename}"
+    try:
+        minio_upload_id = await run_in_threadpool(create_multipart_upload, object_name)
     except Exception as e:
-        import traceback
-        print("UPLOAD ERROR:", traceback.format_exc())
-        shutil.rmtree(tmp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-    # -------- Save UFDR record --------
-    new_ufdr = UFDRFile(
-        filename=file.filename,
-        storage_path=storage_path,  # 👈 stored in MinIO now
-        meta={
-            "uploaded_by": str(current_user.id),
-            "uploaded_at": datetime.utcnow().isoformat(),
-            "hash": file_hash,
-        },
-        case_id=case_id,
-    )
+    try:
+        session = await upload_sessions.create_session(
+            str(current_user.id), filename, object_name, minio_upload_id, case_id, size
+        )
+    except Exception:
+        await run_in_threadpool(abort_multipart_upload, object_name, minio_upload_id)
+        raise HTTPException(status_code=503, detail="Upload session store unavailable")
+    return upload_sessions.session_status(session)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Current offset and received parts; resume by sending `next_part`. For a
+    direct upload: freshly signed URLs for the parts MinIO does not have yet.
+    """
+    session = await _owned_session(upload_id, current_user)
+    if session.get("mode") == "direct":
+        return _direct_status(session, await _direct_parts_received(session))
+    return upload_sessions.session_status(session)
+
+
+@router.put("/uploads/{upload_id}/chunks/{part_number}")
+async def put_resumable_chunk(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="Hex SHA-256 of this chunk's bytes"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Append chunk `part_number` (1-based, in order). Re-sending an already
+    stored chunk with the same checksum is a no-op, so a retry after a lost
+    response is safe.
+    """
+    session = await _owned_session(upload_id, current_user)
+    if session.get("mode") == "direct":
+        raise HTTPException(status_code=409, detail="Direct uploads PUT their parts to the presigned URLs")
+    _reject_oversized(request, settings.RESUMABLE_MAX_CHUNK_BYTES)
+
+    # read before taking the lock: the network is the slow part
+    data, digest = await _read_chunk(request, settings.RESUMABLE_MAX_CHUNK_BYTES)
+    if digest != x_chunk_sha256.strip().lower():
+        raise HTTPException(status_code=400, detail="Chunk checksum mismatch")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty chunk")
 
-    db.add(new_ufdr)
     try:
-        await db.flush()
-    except IntegrityError:
-        await db.rollback()
-        raise HTTPException(status_code=400, detail="Duplicate UFDR file")
+        async with upload_sessions.session_lock(upload_id):
+            session = await _owned_session(upload_id, current_user)
+            if session.get("storage_path"):
+                raise HTTPException(status_code=409, detail="Upload already assembled; retry the completion instead")
+            parts = session["parts"]
+
+            if part_number <= len(parts):
+                if parts[part_number - 1]["sha256"] == digest:
+                    return upload_sessions.session_status(session)
+                raise HTTPException(status_code=409, detail=f"Part {part_number} already stored with different content")
+            if part_number != len(parts) + 1:
+                raise HTTPException(status_code=409, detail=f"Expected part {len(parts) + 1} at offset {session['offset']}")
+            if part_number > MAX_PARTS:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_PARTS} parts; use larger chunks")
+            if parts and parts[-1]["size"] < MIN_PART_SIZE:
+                raise HTTPException(status_code=400, detail=f"Only the final chunk may be smaller than {MIN_PART_SIZE} bytes")
+            limit = session["total_size"] or settings.RESUMABLE_MAX_BYTES
+            if session["offset"] + len(data) > limit:
+                raise HTTPException(status_code=413, detail="Upload exceeds its declared size")
+
+            try:
+                etag = await run_in_threadpool(
+                    upload_part, session["object_name"], session["minio_upload_id"], part_number, data
+                )
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Storing chunk failed: {str(e)}")
+
+            parts.append({"n": part_number, "etag": etag, "sha256": digest, "size": len(data)})
+            session["offset"] += len(data)
+            await upload_sessions.save_session(session)
+            return upload_sessions.session_status(session)
+    except upload_sessions.SessionBusy:
+        raise HTTPException(status_code=409, detail="Another chunk for this upload is still being stored")
+
+
+# ---------- Direct (presigned) Upload ----------
+# POST /uploads/direct → PUT each byte range to its presigned MinIO URL →
+# POST /uploads/{id}/complete. Upload bytes never touch an API worker. Files
+# up to DIRECT_UPLOAD_SINGLE_MAX get one plain PUT URL; larger ones a MinIO
+# multipart upload with one URL per part. MinIO itself is the record of which
+# parts arrived, so GET /uploads/{id} asks it and re-signs the rest.
+def _direct_part_size(size: int) -> int:
+    part_size = max(settings.DIRECT_UPLOAD_PART_SIZE, MIN_PART_SIZE)
+    needed = -(-size // MAX_PARTS)
+    if needed > part_size:
+        # round up to whole MiB so clients get a tidy slice size
+        part_size = -(-needed // (1024 * 1024)) * 1024 * 1024
+    return part_size
+
+
+async def _direct_parts_received(session: dict) -> dict[int, tuple[str | None, int]]:
+    """part_number → (etag, size) for what MinIO holds so far."""
+    try:
+        if session["minio_upload_id"] is None:
+            size = await run_in_threadpool(object_size, session["object_name"])
+            return {} if size is None else {1: (None, size)}
+        parts = await run_in_threadpool(
+            list_uploaded_parts, session["object_name"], session["minio_upload_id"]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Object storage unavailable: {str(e)}")
+    return {n: (etag, size) for n, etag, size in parts}
 
-    # -------- Parse and embed artifacts --------
-    artifacts = parse_zip(tmp_path)
-    created_ids = []
-    for a in artifacts:
-        art = Artifact(
-            case_id=case_id,
-            ufdr_file_id=new_ufdr.id,
-            type=a.get("type"),
-            extracted_text=a.get("text"),
-            raw=a,
-            created_at=datetime.utcnow(),
+
+def _direct_status(session: dict, received: dict | None = None) -> dict:
+    """Presigned URLs for every part not yet received. Part n covers bytes [(n-1)*part_size, n*part_size)."""
+    received = received or {}
+    count = upload_sessions.part_count(session)
+    pending = [n for n in range(1, count + 1) if n not in received]
+    if session["minio_upload_id"] is None:
+        urls = [{"part_number": 1, "url": presigned_put_url(session["object_name"])}] if pending else []
+    else:
+        urls = [
+            {"part_number": n, "url": presigned_part_url(session["object_name"], session["minio_upload_id"], n)}
+            for n in pending
+        ]
+    return {
+        "upload_id": session["id"],
+        "mode": "direct",
+        "multipart": session["minio_upload_id"] is not None,
+        "filename": session["filename"],
+        "case_id": session["case_id"],
+        "total_size": session["total_size"],
+        "part_size": session["part_size"],
+        "part_count": count,
+        "offset": sum(size for _etag, size in received.values()),
+        "parts": urls,
+        "expires_in": settings.DIRECT_UPLOAD_URL_TTL,
+    }
+
+
+async def _finish_direct(session: dict) -> tuple[str, int]:
+    count = upload_sessions.part_count(session)
+    received = await _direct_parts_received(session)
+    missing = [n for n in range(1, count + 1) if n not in received]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing[:20]}")
+    size = sum(received[n][1] for n in range(1, count + 1))
+    if size != session["total_size"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Received {size} of {session['total_size']} bytes",
         )
+
+    if session["minio_upload_id"] is None:
+        return f"{settings.MINIO_BUCKET_NAME}/{session['object_name']}", size
+    try:
+        storage_path = await run_in_threadpool(
+            complete_multipart_upload,
+            session["object_name"],
+            session["minio_upload_id"],
+            [(n, received[n][0]) for n in range(1, count + 1)],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Completing upload failed: {str(e)}")
+    return storage_path, size
+
+
+@router.post("/uploads/direct")
+async def create_direct_upload(
+    filename: str = Body(..., embed=True),
+    case_id: str | None = Body(None, embed=True),
+    size: int = Body(..., embed=True, description="Total bytes"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Open an upload the client sends straight to MinIO through presigned URLs."""
+    raw_filename = _clean_zip_filename(filename)
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    if size > settings.RESUMABLE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    await check_case_access(db, current_user, case_id)
+
+    object_name = f"{uuid.uuid4().hex}/{raw_filename}"
+    minio_upload_id, part_size = None, size
+    if size > settings.DIRECT_UPLOAD_SINGLE_MAX:
+        part_size = _direct_part_size(size)
         try:
-            emb = await run_in_threadpool(generate_embedding, a.get("text") or "")
-            if emb:
-                art.embedding = emb
-        except Exception:
-            pass
+            minio_upload_id = await run_in_threadpool(create_multipart_upload, object_name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-        db.add(art)
-        await db.flush()
-        created_ids.append(str(art.id))
+    try:
+        session = await upload_sessions.create_session(
+            str(current_user.id), filename, object_name, minio_upload_id, case_id, size,
+            mode="direct", part_size=part_size,
+        )
+    except Exception:
+        if minio_upload_id is not None:
+            await run_in_threadpool(abort_multipart_upload, object_name, minio_upload_id)
+        raise HTTPException(status_code=503, detail="Upload session store unavailable")
+    return _direct_status(session)
 
-    await db.commit()
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Assemble the parts in MinIO and hand the object to ingestion. The API
+    never reads the object back; the ingest job streams it from MinIO.
+    The session outlives the assembly until the UFDR row is committed, so a
+    retry after a failed database write records the object it already made.
+    """
+    try:
+        async with upload_sessions.session_lock(upload_id):
+            session = await _owned_session(upload_id, current_user)
+            if session.get("storage_path"):
+                storage_path, size = session["storage_path"], session["assembled_size"]
+            else:
+                if session.get("mode") == "direct":
+                    storage_path, size = await _finish_direct(session)
+                else:
+                    storage_path, size = await _finish_chunked(session)
+                session["storage_path"], session["assembled_size"] = storage_path, size
+                await upload_sessions.save_session(session)
+
+            new_ufdr, job = await _record_upload(
+                db, current_user, session["case_id"], session["filename"], storage_path,
+                None, size, path=f"/ufdr/uploads/{upload_id}/complete",
+            )
+            await upload_sessions.delete_session(upload_id)
+    except upload_sessions.SessionBusy:
+        raise HTTPException(status_code=409, detail="A chunk for this upload is still being stored")
 
     response_payload = {
-        "id": str(getattr(new_ufdr, "id", None)) or str(uuid.uuid4()),  # fallback safe
-        "filename": file.filename,
-        "hash": file_hash,
+        "id": str(new_ufdr.id),
+        "filename": session["filename"],
+        "hash": None,  # filled in by the ingest worker
+        "size": size,
         "storage_path": storage_path,
         "uploaded_at": datetime.utcnow().isoformat(),
-        "artifacts_parsed": len(created_ids),
+        "job_id": str(job.id),
     }
+    return await _start_ingest(db, job, response_payload)
 
-    # -------- Audit Log --------
-    await create_audit(
-        db=db,
-        user_id=str(current_user.id),
-        ip_address=None,
-        action_type="upload",
-        method="POST",
-        path="/ufdr/upload",
-        status_code=201,
-    )
-    
-    # -------- Cleanup --------
-    shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    return response_payload
+@router.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    """Discard a session and the parts already stored in MinIO."""
+    session = await _owned_session(upload_id, current_user)
+    try:
+        if session["minio_upload_id"] is None:
+            await run_in_threadpool(remove_object, session["object_name"])
+        else:
+            await run_in_threadpool(abort_multipart_upload, session["object_name"], session["minio_upload_id"])
+    except Exception:
+        pass
+    await upload_sessions.delete_session(upload_id)
+    return {"ok": True}
 
 
 # ---------- List Endpoint ----------
@@ -258,10 +712,55 @@ async def list_ufdr_files(
         {
             "id": str(f.id),
             "filename": f.filename,
-            "hash": f.meta.get("hash") if isinstance(f.meta, dict) else None,
+            "hash": f.file_hash or (f.meta.get("hash") if isinstance(f.meta, dict) else None),
             "uploaded_by": f.meta.get("uploaded_by") if isinstance(f.meta, dict) else None,
             "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
             "case_id": str(f.case_id) if f.case_id else None,
         }
         for f in files
     ]
+
+
+# ---------- Ingest Job Status ----------
+@router.get("/jobs/{job_id}")
+async def get_ingest_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Per-stage progress (extract, parse, embed, insert, upload), throughput and busy/starved/blocked timings of an ingest job."""
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+
+    job = await db.get(IngestJob, job_uuid)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+
+    if current_user.role != "admin" and job.created_by != current_user.id:
+        ufdr = await db.get(UFDRFile, job.ufdr_file_id)
+        case_id = ufdr.case_id if ufdr else None
+        res = await db.execute(
+            select(CaseAssignment).where(
+                and_(
+                    CaseAssignment.case_id == case_id,
+                    CaseAssignment.user_id == current_user.id,
+                )
+            )
+        )
+        if case_id is None or res.scalar_one_or_none() is None:
+            raise HTTPException(status_code=403, detail="Not authorized to view this ingest job")
+
+    return {
+        "id": str(job.id),
+        "ufdr_file_id": str(job.ufdr_file_id),
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress or {},
+        "error": job.error,
+        "worker": job.worker,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
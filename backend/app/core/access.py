@@ -0,0 +1,59 @@
+# app/core/access.py
+"""
+Case-level access rules shared by the routes. Admins see every case;
+investigators only the cases they are assigned to.
+"""
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.case_assignment import CaseAssignment
+from app.models.ufdrfile import UFDRFile
+from app.models.user import User
+
+
+def is_restricted(user: User) -> bool:
+    return user.role != "admin"
+
+
+def assigned_case_ids(user: User):
+    """Subquery of the case ids `user` is assigned to."""
+    return select(CaseAssignment.case_id).where(CaseAssignment.user_id == user.id)
+
+
+async def _is_assigned(db: AsyncSession, user: User, case_id) -> bool:
+    res = await db.execute(
+        select(CaseAssignment).where(
+            CaseAssignment.case_id == case_id,
+            CaseAssignment.user_id == user.id,
+        )
+    )
+    return res.scalars().first() is not None
+
+
+async def check_case_access(db: AsyncSession, current_user: User, case_id: str | None) -> None:
+    """Investigators may only upload into cases they are assigned to."""
+    if not is_restricted(current_user):
+        return
+    if not case_id:
+        raise HTTPException(
+            status_code=400,
+            detail="case_id is required for investigators"
+        )
+    if not await _is_assigned(db, current_user, case_id):
+        raise HTTPException(status_code=403, detail="You are not assigned to this case")
+
+
+async def get_ufdr_for_user(db: AsyncSession, ufdr_file_id: str, current_user: User) -> UFDRFile:
+    """The UFDR file, if `current_user` may read it; 404/403 otherwise."""
+    result = await db.execute(select(UFDRFile).where(UFDRFile.id == ufdr_file_id))
+    ufdr = result.scalars().first()
+    if not ufdr:
+        raise HTTPException(status_code=404, detail="UFDR file not found")
+
+    if is_restricted(current_user):
+        if not ufdr.case_id:
+            raise HTTPException(status_code=403, detail="This UFDR is not linked to a case.")
+        if not await _is_assigned(db, current_user, ufdr.case_id):
+            raise HTTPException(status_code=403, detail="Not authorized to access this UFDR file.")
+    return ufdr
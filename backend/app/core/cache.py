@@ -1,11 +1,23 @@
 # backend/app/core/cache.py
 import json
+import math
+import time
+import uuid
+import asyncio
+import fnmatch
 import hashlib
-from typing import Any, Optional, List
+import functools
+import contextlib
+from typing import Any, Awaitable, Callable, Dict, Optional, List
+import msgpack
+import orjson
 import redis.asyncio as redis
+import zstandard
+from cachetools import TLRUCache
 from app.core.config import settings
 
 _redis: Optional[redis.Redis] = None
+_redis_bytes: Optional[redis.Redis] = None
 
 def _hash_query(q: str) -> str:
     return hashlib.sha256(q.encode("utf-8")).hexdigest()
@@ -16,31 +28,563 @@ def get_redis() -> redis.Redis:
         _redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
     return _redis
 
+def get_redis_bytes() -> redis.Redis:
+    """Client without response decoding, for binary values such as vectors."""
+    global _redis_bytes
+    if _redis_bytes is None:
+        _redis_bytes = redis.from_url(settings.REDIS_URL, decode_responses=False)
+    return _redis_bytes
+
+# ---------- Encoding ----------
+# Stored values start with a 4-byte header: 0xC1 (a byte neither msgpack
+# nor JSON text ever starts with), the format version, the serializer id
+# and the compression id. Writes use CACHE_CODEC, compressed with
+# CACHE_COMPRESSION once the serialized value reaches
+# CACHE_COMPRESS_MIN_BYTES; reads go by the header, so changing either
+# setting (or registering another codec) doesn't invalidate what is stored.
+# Values without the header are JSON text from before it existed.
+_MAGIC = 0xC1
+FORMAT_VERSION = 1
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+# name -> (id, dumps, loads)
+SERIALIZERS: Dict[str, tuple] = {
+    "json": (1, lambda v: json.dumps(v).encode("utf-8"), json.loads),
+    "orjson": (2, orjson.dumps, orjson.loads),
+    "msgpack": (3, functools.partial(msgpack.packb, use_bin_type=True), functools.partial(msgpack.unpackb, raw=False)),
+}
+# name -> (id, compress, decompress)
+COMPRESSORS: Dict[str, tuple] = {
+    "none": (0, bytes, bytes),
+    "zstd": (1, _zstd_compressor.compress, _zstd_decompressor.decompress),
+}
+
+def register_serializer(name: str, codec_id: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]) -> None:
+    if any(existing[0] == codec_id for n, existing in SERIALIZERS.items() if n != name):
+        raise ValueError(f"serializer id {codec_id} is taken")
+    SERIALIZERS[name] = (codec_id, dumps, loads)
+
+def _by_id(registry: Dict[str, tuple], codec_id: int) -> tuple:
+    for entry in registry.values():
+        if entry[0] == codec_id:
+            return entry
+    raise ValueError(f"unknown codec id {codec_id}")
+
+def _encode(value: Any) -> tuple:
+    """(stored bytes, serialized size before compression)"""
+    ser_id, dumps, _loads = SERIALIZERS[settings.CACHE_CODEC]
+    payload = dumps(value)
+    size = len(payload)
+    comp_id = 0
+    if size >= settings.CACHE_COMPRESS_MIN_BYTES and settings.CACHE_COMPRESSION != "none":
+        comp_id, compress, _decompress = COMPRESSORS[settings.CACHE_COMPRESSION]
+        payload = compress(payload)
+    return bytes((_MAGIC, FORMAT_VERSION, ser_id, comp_id)) + payload, size
+
+def _decode(raw: bytes) -> tuple:
+    """(value, serialized size); raises ValueError for formats this build can't read."""
+    if raw[0] != _MAGIC:
+        return json.loads(raw), len(raw)
+    version, ser_id, comp_id = raw[1], raw[2], raw[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"cache format version {version}")
+    payload = _by_id(COMPRESSORS, comp_id)[2](raw[4:])
+    return _by_id(SERIALIZERS, ser_id)[2](payload), len(payload)
+
+def encode_value(value: Any) -> bytes:
+    return _encode(value)[0]
+
+def decode_value(raw: bytes) -> Any:
+    return _decode(raw)[0]
+
+# ---------- Local tier ----------
+# Keys under LOCAL_CACHE_PREFIXES (result caches whose values are never
+# mutated by callers) are also kept decoded in a per-process LRU, bounded by
+# their encoded size (LOCAL_CACHE_MAX_BYTES) and by their Redis expiry. A
+# local copy is served without touching Redis for LOCAL_CACHE_TTL seconds,
+# then re-read; if Redis can't be reached it keeps being served. Writes and
+# deletes are announced on INVALIDATION_CHANNEL so other processes drop their
+# copies. A process clears its tier whenever it (re)subscribes, since it may
+# have missed announcements while it wasn't listening. Entries are sized by
+# their serialized (uncompressed) length.
+INVALIDATION_CHANNEL = "cache:invalidate"
+_INSTANCE = uuid.uuid4().hex
+
+class _LocalEntry:
+    __slots__ = ("value", "size", "check_after", "expires_at", "fresh_until")
+
+    def __init__(self, value: Any, size: int, check_after: float, expires_at: float, fresh_until: float):
+        self.value = value
+        self.size = size
+        self.check_after = check_after
+        self.expires_at = expires_at
+        self.fresh_until = fresh_until
+
+def _new_local_tier() -> TLRUCache:
+    return TLRUCache(
+        maxsize=max(settings.LOCAL_CACHE_MAX_BYTES, 1),
+        ttu=lambda _key, entry, _now: entry.expires_at,
+        getsizeof=lambda entry: entry.size,
+        timer=time.monotonic,
+    )
+
+_local = _new_local_tier()
+_listener: Optional[asyncio.Task] = None
+
+def _is_local(key: str) -> bool:
+    return settings.LOCAL_CACHE_MAX_BYTES > 0 and key.startswith(tuple(settings.LOCAL_CACHE_PREFIXES))
+
+def _keep_local(key: str, value: Any, size: int, ttl_ms: int, fresh_ms: int) -> _LocalEntry:
+    """Cache a value read from or written to Redis; ttl_ms/fresh_ms as PTTL reports them."""
+    now = time.monotonic()
+    entry = _LocalEntry(
+        value,
+        size,
+        check_after=now + settings.LOCAL_CACHE_TTL,
+        expires_at=now + ttl_ms / 1000 if ttl_ms > 0 else math.inf,
+        fresh_until=now + fresh_ms / 1000 if fresh_ms > 0 else (math.inf if fresh_ms == -1 else now),
+    )
+    _local.pop(key, None)
+    try:
+        _local[key] = entry
+    except ValueError:
+        pass  # bigger than the whole tier
+    _ensure_listener()
+    return entry
+
+def _drop_matching(pattern: str) -> None:
+    for key in [k for k in list(_local.keys()) if fnmatch.fnmatchcase(k, pattern)]:
+        _local.pop(key, None)
+
+def _announcement(kind: str, target: str) -> str:
+    return f"{_INSTANCE} {kind} {target}"
+
+def _apply_announcement(message: str) -> None:
+    try:
+        origin, kind, target = message.split(" ", 2)
+    except ValueError:
+        return
+    if origin == _INSTANCE:
+        return  # our own write; the local tier is already up to date
+    if kind == "key":
+        _local.pop(target, None)
+    elif kind == "pattern":
+        _drop_matching(target)
+
+async def _listen() -> None:
+    while True:
+        pubsub = get_redis().pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            _local.clear()
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _apply_announcement(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[CACHE] invalidation listener disconnected: {e}")
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+        await asyncio.sleep(1)
+
+def _ensure_listener() -> None:
+    global _listener
+    loop = asyncio.get_running_loop()
+    if _listener is None or _listener.done() or _listener.get_loop() is not loop:
+        _listener = loop.create_task(_listen())
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except BaseException:
+            pass
+        _listener = None
+
+async def _read_through(key: str) -> Optional[_LocalEntry]:
+    entry = _local.get(key)
+    if entry is not None and time.monotonic() < entry.check_after:
+        return entry
+    try:
+        async with get_redis_bytes().pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            pipe.pttl(_fresh_key(key))
+            raw, ttl_ms, fresh_ms = await pipe.execute()
+    except (redis.ConnectionError, redis.TimeoutError, OSError):
+        if entry is not None:
+            return entry  # Redis unreachable: keep serving the copy we have
+        raise
+    if not raw:
+        _local.pop(key, None)
+        return None
+    try:
+        value, size = _decode(raw)
+    except Exception:
+        return None
+    return _keep_local(key, value, size, ttl_ms, fresh_ms)
+
+def local_cache_stats() -> Dict:
+    return {"entries": len(_local), "bytes": _local.currsize, "max_bytes": settings.LOCAL_CACHE_MAX_BYTES}
+
 async def get_cached(key: str) -> Optional[Any]:
-    r = get_redis()
-    raw = await r.get(key)
+    if _is_local(key):
+        entry = await _read_through(key)
+        return entry.value if entry is not None else None
+    raw = await get_redis_bytes().get(key)
     if not raw:
         return None
     try:
-        return json.loads(raw)
+        return decode_value(raw)
     except Exception:
         return None
 
+async def _write(key: str, value: Any, expire_seconds: Optional[int], fresh_seconds: Optional[int]) -> None:
+    blob, size = _encode(value)
+    local = _is_local(key)
+    async with get_redis_bytes().pipeline(transaction=False) as pipe:
+        pipe.set(key, blob, ex=expire_seconds or None)
+        if fresh_seconds:
+            pipe.set(_fresh_key(key), "1", ex=fresh_seconds)
+        if local:
+            pipe.publish(INVALIDATION_CHANNEL, _announcement("key", key))
+        await pipe.execute()
+    if local:
+        _keep_local(
+            key, value, size,
+            ttl_ms=expire_seconds * 1000 if expire_seconds else -1,
+            fresh_ms=fresh_seconds * 1000 if fresh_seconds else -2,
+        )
+
 async def set_cached(key: str, value: Any, expire_seconds: int | None = None) -> None:
+    await _write(key, value, expire_seconds, None)
+
+async def delete_cached(*keys: str) -> None:
+    """Delete keys from Redis and from every process's local tier."""
+    if not keys:
+        return
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.delete(*keys)
+        for key in keys:
+            if _is_local(key):
+                _local.pop(key, None)
+                pipe.publish(INVALIDATION_CHANNEL, _announcement("key", key))
+        await pipe.execute()
+
+# Compare-and-delete so a holder whose lock already expired can't release someone else's.
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+async def acquire_lock(key: str, ttl_seconds: int, wait_seconds: float = 0, poll_seconds: float = 0.2) -> Optional[str]:
+    """SET NX EX lock shared across processes; returns a release token or None on timeout."""
+    r = get_redis()
+    token = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+    while True:
+        if await r.set(key, token, nx=True, ex=ttl_seconds):
+            return token
+        if loop.time() >= deadline:
+            return None
+        await asyncio.sleep(poll_seconds)
+
+async def release_lock(key: str, token: str) -> bool:
     r = get_redis()
-    dump = json.dumps(value)
-    if expire_seconds:
-        await r.set(key, dump, ex=expire_seconds)
+    return bool(await r.eval(_RELEASE_LOCK, 1, key, token))
+
+# ---------- Single-flight ----------
+# Concurrent misses for one key are coalesced onto a single computation:
+# within a process they await the same future; across processes the first
+# one takes a Redis lock (the pending marker, pending:<key>) and the rest
+# poll for its result. A waiter that outlives SINGLE_FLIGHT_WAIT, or sees
+# the marker vanish without a result (holder crashed or failed), computes
+# for itself. With stale_seconds, a value outlives its TTL by that long and
+# is still returned, while one background refresh replaces it; freshness is
+# tracked by a separate <key>:fresh marker so stored values keep their shape.
+_inflight: Dict[str, asyncio.Future] = {}
+_refreshing: Dict[str, asyncio.Task] = {}
+
+class _Abandoned(Exception):
+    """A computing() holder left without a value; its waiters compute for themselves."""
+
+def _fresh_key(key: str) -> str:
+    return f"{key}:fresh"
+
+async def _read(key: str, stale_seconds: int) -> tuple:
+    """(value or None, fresh?)"""
+    if not stale_seconds:
+        return await get_cached(key), True
+    if _is_local(key):
+        entry = await _read_through(key)
+        if entry is None:
+            return None, True
+        return entry.value, time.monotonic() < entry.fresh_until
+    async with get_redis_bytes().pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.exists(_fresh_key(key))
+        raw, fresh = await pipe.execute()
+    try:
+        value = decode_value(raw) if raw else None
+    except Exception:
+        value = None
+    return value, bool(fresh)
+
+async def set_cached_fresh(key: str, value: Any, expire_seconds: Optional[int], stale_seconds: int = 0) -> None:
+    """set_cached for keys read through get_or_compute: fresh for expire_seconds, then stale."""
+    if stale_seconds and expire_seconds:
+        await _write(key, value, expire_seconds + stale_seconds, expire_seconds)
+    else:
+        await _write(key, value, expire_seconds, None)
+
+async def _compute_and_store(
+    key: str, compute: Callable[[], Awaitable[Any]], expire_seconds: Optional[int],
+    stale_seconds: int, cacheable: Optional[Callable[[Any], bool]],
+) -> Any:
+    value = await compute()
+    if cacheable is not None and not cacheable(value):
+        return value
+    try:
+        await set_cached_fresh(key, value, expire_seconds, stale_seconds)
+    except Exception:
+        pass
+    return value
+
+async def _compute_once(
+    key: str, compute: Callable[[], Awaitable[Any]], expire_seconds: Optional[int],
+    stale_seconds: int, cacheable: Optional[Callable[[Any], bool]], wait_seconds: float,
+) -> Any:
+    """Compute under the cross-process pending marker, or wait for whoever holds it."""
+    store = functools.partial(_compute_and_store, key, compute, expire_seconds, stale_seconds, cacheable)
+    marker = single_flight_key(key)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+    while True:
+        try:
+            token = await acquire_lock(marker, settings.SINGLE_FLIGHT_LOCK_TTL)
+        except Exception:
+            return await store()  # no Redis: coalesce within this process only
+        if token:
+            try:
+                # the previous holder may have finished between our miss and the lock
+                value = await get_cached(key)
+                return value if value is not None else await store()
+            finally:
+                try:
+                    await release_lock(marker, token)
+                except Exception:
+                    pass
+
+        r = get_redis()
+        while True:
+            if loop.time() >= deadline:
+                return await store()
+            await asyncio.sleep(0.1)
+            value = await get_cached(key)
+            if value is not None:
+                return value
+            if not await r.exists(marker):
+                break  # released without a value: try to take over
+
+async def get_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    expire_seconds: Optional[int] = None,
+    stale_seconds: int = 0,
+    cacheable: Optional[Callable[[Any], bool]] = None,
+    wait_seconds: Optional[float] = None,
+) -> Any:
+    """
+    Cached JSON value for `key`, computing it with `compute()` on a miss so
+    that concurrent misses (in any process) share one computation. Values
+    rejected by `cacheable` are returned but not stored. If Redis is down
+    this degrades to coalescing within the process.
+    """
+    wait = settings.SINGLE_FLIGHT_WAIT if wait_seconds is None else wait_seconds
+    try:
+        value, fresh = await _read(key, stale_seconds)
+    except Exception:
+        value, fresh = None, True
+    if value is not None:
+        if not fresh:
+            _refresh_in_background(key, compute, expire_seconds, stale_seconds, cacheable)
+        return value
+
+    fut = _inflight.get(key)
+    if fut is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), wait)
+        except (asyncio.TimeoutError, _Abandoned):
+            return await _compute_and_store(key, compute, expire_seconds, stale_seconds, cacheable)
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        value = await _compute_once(key, compute, expire_seconds, stale_seconds, cacheable, wait)
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # waiters re-raise it; don't warn when there were none
+        raise
     else:
-        await r.set(key, dump)
+        fut.set_result(value)
+        return value
+    finally:
+        _inflight.pop(key, None)
+
+async def get_cached_revalidating(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    expire_seconds: Optional[int] = None,
+    stale_seconds: int = 0,
+    cacheable: Optional[Callable[[Any], bool]] = None,
+) -> Optional[Any]:
+    """
+    The read half of get_or_compute: the cached value or None, never
+    computing on a miss. A stale value is still returned and refreshed in
+    the background the same way.
+    """
+    value, fresh = await _read(key, stale_seconds)
+    if value is not None and not fresh:
+        _refresh_in_background(key, compute, expire_seconds, stale_seconds, cacheable)
+    return value
+
+async def wait_inflight(key: str, wait_seconds: Optional[float] = None) -> Optional[Any]:
+    """Result of a computation of `key` already running in this process, or None if there is none or it failed."""
+    fut = _inflight.get(key)
+    if fut is None:
+        return None
+    wait = settings.SINGLE_FLIGHT_WAIT if wait_seconds is None else wait_seconds
+    try:
+        return await asyncio.wait_for(asyncio.shield(fut), wait)
+    except Exception:
+        return None
+
+@contextlib.asynccontextmanager
+async def computing(key: str):
+    """
+    Hold `key`'s pending markers while the caller produces its value by other
+    means than get_or_compute (e.g. streaming it), so concurrent
+    get_or_compute misses wait instead of computing it again. Yields a
+    function to call with the value once it is stored; leaving without
+    calling it sends the waiters off to compute for themselves.
+    """
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    marker = single_flight_key(key)
+    try:
+        token = await acquire_lock(marker, settings.SINGLE_FLIGHT_LOCK_TTL)
+    except Exception:
+        token = None  # no Redis, or another process got there first: in-process only
+    try:
+        yield fut.set_result
+    finally:
+        if not fut.done():
+            fut.set_exception(_Abandoned(key))
+            fut.exception()
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+        if token:
+            try:
+                await release_lock(marker, token)
+            except Exception:
+                pass
+
+def _refresh_in_background(
+    key: str, compute: Callable[[], Awaitable[Any]], expire_seconds: Optional[int],
+    stale_seconds: int, cacheable: Optional[Callable[[Any], bool]],
+) -> None:
+    if key in _refreshing:
+        return
+
+    async def refresh():
+        marker = single_flight_key(key)
+        try:
+            token = await acquire_lock(marker, settings.SINGLE_FLIGHT_LOCK_TTL)
+            if not token:
+                return  # another process is already refreshing
+            try:
+                await _compute_and_store(key, compute, expire_seconds, stale_seconds, cacheable)
+            finally:
+                await release_lock(marker, token)
+        except Exception as e:
+            print(f"[CACHE] background refresh of {key} failed: {e}")
+        finally:
+            _refreshing.pop(key, None)
+
+    _refreshing[key] = asyncio.create_task(refresh())
 
 async def del_pattern(pattern: str) -> None:
     r = get_redis()
     async for key in r.scan_iter(match=pattern):
         await r.delete(key)
+    _drop_matching(pattern)
+    await r.publish(INVALIDATION_CHANNEL, _announcement("pattern", pattern))
+
+async def cache_memory_report(batch: int = 500) -> Dict:
+    """
+    Redis memory by key namespace (the part before the first ':'), from
+    MEMORY USAGE of every key, plus this process's local tier. It scans the
+    whole keyspace, so it is meant for occasional admin use.
+    """
+    r = get_redis_bytes()
+    namespaces: Dict[str, Dict[str, int]] = {}
+
+    async def measure(keys: List[bytes]) -> None:
+        async with r.pipeline(transaction=False) as pipe:
+            for k in keys:
+                pipe.memory_usage(k, samples=0)
+            sizes = await pipe.execute()
+        for k, size in zip(keys, sizes):
+            ns = namespaces.setdefault(k.split(b":", 1)[0].decode("utf-8", "replace"), {"keys": 0, "bytes": 0})
+            ns["keys"] += 1
+            ns["bytes"] += size or 0  # None: expired between SCAN and MEMORY USAGE
+
+    keys: List[bytes] = []
+    async for key in r.scan_iter(count=batch):
+        keys.append(key)
+        if len(keys) >= batch:
+            await measure(keys)
+            keys = []
+    if keys:
+        await measure(keys)
+    return {
+        "namespaces": dict(sorted(namespaces.items(), key=lambda kv: -kv[1]["bytes"])),
+        "total_bytes": sum(ns["bytes"] for ns in namespaces.values()),
+        "codec": settings.CACHE_CODEC,
+        "compression": settings.CACHE_COMPRESSION,
+        "local": local_cache_stats(),
+    }
 
 def llm_cache_key(ufdr_id: str, query: str) -> str:
     return f"llm:{ufdr_id}:{_hash_query(query)}"
 
-def search_cache_key(ufdr_id: str, query: str) -> str:
+def search_cache_key(ufdr_id: str, query: str, mode: str = "auto") -> str:
+    if mode != "auto":
+        query = f"{mode}:{query}"
     return f"search:{ufdr_id}:{_hash_query(query)}"
+
+def embedding_cache_key(model: str, text_hash: str) -> str:
+    return f"emb:{model}:{text_hash}"
+
+def ingest_lock_key(file_hash: str) -> str:
+    return f"lock:ingest:{file_hash}"
+
+def single_flight_key(key: str) -> str:
+    return f"pending:{key}"
+
+def upload_session_key(upload_id: str) -> str:
+    return f"upload:{upload_id}"
+
+def vector_index_version_key(ufdr_id: str) -> str:
+    return f"vecidx:ver:{ufdr_id}"
@@ -18,6 +18,72 @@ class Settings(BaseSettings):
     # ---------- Local Storage ----------
     LOCAL_STORAGE_PATH: str = "./data/uploads"
 
+    # ---------- Uploads ----------
+    MAX_UPLOAD_BYTES: int = 500 * 1024 * 1024  # 500 MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MB read/hash granularity
+    RESUMABLE_MAX_BYTES: int = 100 * 1024 ** 3  # 100 GB per resumable upload
+    RESUMABLE_CHUNK_SIZE: int = 16 * 1024 * 1024  # suggested chunk size returned to clients
+    RESUMABLE_MAX_CHUNK_BYTES: int = 64 * 1024 * 1024  # one chunk is held in memory while it goes to MinIO
+    UPLOAD_SESSION_TTL: int = 60 * 60 * 24  # idle resumable sessions expire after a day
+
+    # ---------- Ingestion ----------
+    INGEST_ASYNC: bool = True  # False = parse/embed inside the upload request
+    INGEST_STREAM: str = "ingest:jobs"
+    INGEST_CONSUMER_GROUP: str = "ingest-workers"
+    INGEST_WORKER_CONCURRENCY: int = 2
+    INGEST_CLAIM_IDLE_MS: int = 10 * 60 * 1000  # reclaim jobs from dead consumers
+    INGEST_HEARTBEAT_INTERVAL: float = 30.0  # seconds between job lease / queue entry renewals
+    INGEST_PROGRESS_INTERVAL: float = 1.0  # seconds between progress writes
+    INGEST_EMBED_BATCH: int = 512  # artifacts handed to generate_embeddings at once
+    INGEST_INSERT_BATCH: int = 1000  # rows per COPY / multi-row INSERT
+    INGEST_QUEUE_DEPTH: int = 4  # batches buffered between parse → embed → insert
+    # per-stage concurrency; the pool behind the parse stage is PARSE_WORKERS
+    INGEST_PARSE_STREAMS: int = 1  # CSV/XML/TXT members parsed side by side in-process
+    INGEST_EMBED_CONCURRENCY: int = 1  # embed batches in flight (cache lookups overlap encoding)
+    INGEST_INSERT_CONCURRENCY: int = 1  # >1 adds DB sessions, all committed together at the end
+    INGEST_LOCK_TTL: int = 15 * 60  # seconds; per-hash upload lock shared by API nodes
+    INGEST_LOCK_WAIT: float = 120.0  # how long a duplicate upload waits for that lock
+    INGEST_CLONE_POLL: float = 5.0  # seconds between checks on a duplicate's source job
+    INGEST_CLONE_WAIT: float = 2 * 60 * 60  # give up waiting and ingest independently
+    PARSE_WORKERS: int = 0  # parser processes; 0 = one per CPU
+    PARSE_MEMBER_TIMEOUT: float = 120.0  # seconds per ZIP member (POSIX only)
+    PARSE_STREAM_TIMEOUT: float = 600.0  # parsing seconds per CSV/XML/TXT member; waits on later stages don't count
+
+    # ---------- Document extraction ----------
+    DOC_FULL_TEXT: bool = True  # False = legacy 500-character preview per document
+    DOC_MAX_PAGES: int = 500  # PDF pages (DOCX/TXT: text windows) read per document
+    DOC_TIME_LIMIT: float = 60.0  # seconds per document; what was read by then is kept
+    DOC_WINDOW_CHARS: int = 1000  # text per artifact, about MiniLM's 256-token input
+    DOC_WINDOW_OVERLAP: int = 100  # characters repeated between consecutive windows
+
+    # ---------- Retrieval chunks ----------
+    CHUNK_CHARS: int = 1000  # artifacts longer than this get embedded chunks at ingest
+    CHUNK_OVERLAP: int = 100
+    CHUNK_MAX_PER_ARTIFACT: int = 200  # bounds the work one oversized field can cause
+
+    # ---------- Vector search ----------
+    VECTOR_SEARCH_MODE: str = "auto"  # auto | exact | approximate (per-request override on /chat/ask)
+    VECTOR_EXACT_MAX_ROWS: int = 20_000  # auto: UFDRs up to this many artifacts are scanned exactly
+    HNSW_EF_SEARCH: int = 100  # candidate list size; higher = better recall, slower (raised to top_k)
+    HNSW_ITERATIVE_SCAN: str | None = None  # "relaxed_order" / "strict_order"; needs pgvector >= 0.8
+    IVFFLAT_PROBES: int = 10  # only used if the indexes are rebuilt as IVFFlat
+    VECTOR_INDEX_ENABLED: bool = False  # keep recently searched UFDRs' embeddings in process memory
+    VECTOR_INDEX_MAX_BYTES: int = 1024 * 1024 * 1024  # per API process; least recently used UFDRs go first
+    VECTOR_INDEX_DIR: str | None = None  # .npy snapshots here are memory-mapped instead of re-read from Postgres
+
+    # ---------- Chat context ----------
+    CONTEXT_TOKEN_BUDGET: int = 6000  # evidence tokens per prompt; lower = faster, cheaper answers
+    CONTEXT_CHARS_PER_TOKEN: int = 4  # estimate used for budgeting (no local Gemini tokenizer)
+    CONTEXT_MIN_RELATIVE_SCORE: float = 0.6  # stop once similarity falls below this fraction of the best
+    CONTEXT_DEDUP_SIMILARITY: float = 0.85  # word-trigram Jaccard at which a passage counts as a repeat
+
+    # ---------- Hybrid search ----------
+    SEARCH_CANDIDATES: int = 200  # hits taken from each of FTS and vector search before fusion
+    SEARCH_RRF_K: int = 60  # reciprocal rank fusion constant; larger flattens the rank curve
+    SEARCH_CACHE_TTL: int = 60 * 60 * 24
+    SEARCH_CACHE_STALE_SECONDS: int = 60 * 60  # after the TTL, served while one request recomputes
+    SEARCH_HEADLINE_OPTIONS: str = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
     # ---------- JWT ----------
     JWT_SECRET: str = "supersecret"
     JWT_ALGORITHM: str = "HS256"
@@ -25,6 +91,10 @@ class Settings(BaseSettings):
 
     # ---------- AI / Embeddings ----------
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 64  # texts per forward pass
+    EMBED_CACHE_ENABLED: bool = True  # reuse vectors for texts seen before (Redis)
+    EMBED_CACHE_MAX_ENTRIES: int = 200_000  # ~1.5 KB each at 384 dims; LRU beyond this
+    EMBED_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 30 days
 
     # ---------- Gemini ----------
     GEMINI_API_KEY: str | None = None
@@ -36,6 +106,28 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = Field(default="minioadmin")
     MINIO_BUCKET_NAME: str = Field(default="cognis-ufdr")
     MINIO_SECURE: bool = Field(default=False)
+    # Host clients reach MinIO on, if not MINIO_ENDPOINT; presigned URLs are signed for it.
+    MINIO_PUBLIC_ENDPOINT: str | None = None
+    MINIO_PUBLIC_SECURE: bool | None = None
+    MINIO_REGION: str = "us-east-1"
+    DIRECT_UPLOAD_SINGLE_MAX: int = 64 * 1024 * 1024  # up to this size, one presigned PUT
+    DIRECT_UPLOAD_PART_SIZE: int = 64 * 1024 * 1024  # larger files: presigned multipart parts
+    DIRECT_UPLOAD_URL_TTL: int = 60 * 60 * 6  # presigned URLs stay valid for 6 hours
+
+    # ---------- Result caches ----------
+    LLM_CACHE_TTL: int = 60 * 60 * 24 * 7  # 7 days
+    LLM_CACHE_STALE_SECONDS: int = 60 * 60 * 24  # after the TTL, served while one request recomputes
+    SEMANTIC_CACHE_ENABLED: bool = True  # reuse answers to differently worded questions about a UFDR
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # query embedding cosine similarity needed for a hit
+    SEMANTIC_CACHE_MAX_PER_UFDR: int = 500
+    CACHE_CODEC: str = "msgpack"  # json | orjson | msgpack; stored values say which, so changing it is safe
+    CACHE_COMPRESSION: str = "zstd"  # none | zstd
+    CACHE_COMPRESS_MIN_BYTES: int = 1024  # smaller values aren't worth compressing
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # per-process copy of hot result-cache values; 0 disables
+    LOCAL_CACHE_TTL: int = 60  # seconds a local copy is served before Redis is checked again
+    LOCAL_CACHE_PREFIXES: list[str] = ["llm:", "search:"]
+    SINGLE_FLIGHT_LOCK_TTL: int = 120  # longest a computation may hold a key before others take over
+    SINGLE_FLIGHT_WAIT: float = 90  # how long a duplicate request waits before computing itself
 
     # ---------- Misc ----------
     ENVIRONMENT: str = "development"
@@ -0,0 +1,86 @@
+# app/core/embedding_cache.py
+"""
+Content-addressed embedding cache in Redis.
+
+Vectors are stored as raw float32 bytes under emb:<model>:<sha256 of the
+normalized text>, so the same contact or forwarded message is embedded
+once no matter how many members or uploads it appears in. A sorted set of
+last-use times bounds the cache at EMBED_CACHE_MAX_ENTRIES, evicting the
+least recently used keys first. Hit/miss counters are kept in a hash.
+"""
+import time
+import hashlib
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.cache import get_redis_bytes, embedding_cache_key
+from app.core.config import settings
+
+LRU_KEY = "emb:lru"
+STATS_KEY = "emb:stats"
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed; the form that gets hashed and embedded."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(normalized: str, model: Optional[str] = None) -> str:
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return embedding_cache_key(model or settings.EMBEDDING_MODEL, digest)
+
+
+async def get_many(keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+    """One MGET for the whole batch; hits are marked as recently used."""
+    if not keys:
+        return []
+    r = get_redis_bytes()
+    raws = await r.mget(keys)
+    now = time.time()
+    hits = {k: now for k, raw in zip(keys, raws) if raw}
+
+    async with r.pipeline(transaction=False) as pipe:
+        if hits:
+            pipe.zadd(LRU_KEY, hits, xx=True)
+        pipe.hincrby(STATS_KEY, "hits", len(hits))
+        pipe.hincrby(STATS_KEY, "misses", len(keys) - len(hits))
+        await pipe.execute()
+
+    return [np.frombuffer(raw, dtype=np.float32) if raw else None for raw in raws]
+
+
+async def put_many(items: Dict[str, np.ndarray]) -> None:
+    """Store vectors and evict least recently used keys beyond the size bound."""
+    if not items:
+        return
+    r = get_redis_bytes()
+    now = time.time()
+    async with r.pipeline(transaction=False) as pipe:
+        for k, vec in items.items():
+            pipe.set(k, np.asarray(vec, dtype=np.float32).tobytes(), ex=settings.EMBED_CACHE_TTL_SECONDS)
+        pipe.zadd(LRU_KEY, {k: now for k in items})
+        pipe.zcard(LRU_KEY)
+        *_, size = await pipe.execute()
+
+    excess = size - settings.EMBED_CACHE_MAX_ENTRIES
+    if excess > 0:
+        evicted = await r.zpopmin(LRU_KEY, excess)
+        if evicted:
+            await r.delete(*[k for k, _score in evicted])
+
+
+async def embedding_cache_stats() -> Dict:
+    r = get_redis_bytes()
+    raw = await r.hgetall(STATS_KEY)
+    entries = await r.zcard(LRU_KEY)
+    hits = int(raw.get(b"hits", 0))
+    misses = int(raw.get(b"misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "entries": entries,
+        "max_entries": settings.EMBED_CACHE_MAX_ENTRIES,
+    }
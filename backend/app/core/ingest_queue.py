@@ -0,0 +1,79 @@
+# backend/app/core/ingest_queue.py
+"""
+Redis Streams work queue for UFDR ingestion.
+
+The API appends job ids to one stream; every ingestion worker (on any node)
+reads through the same consumer group, so each job is delivered to exactly
+one consumer and is only removed from the pending list once acknowledged.
+"""
+from typing import List, Tuple
+import redis.asyncio as redis
+from app.core.cache import get_redis
+from app.core.config import settings
+
+
+async def ensure_group() -> None:
+    r = get_redis()
+    try:
+        await r.xgroup_create(settings.INGEST_STREAM, settings.INGEST_CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def enqueue_ingest_job(job_id: str) -> str:
+    """Append a job to the ingest stream and return its stream entry id."""
+    r = get_redis()
+    return await r.xadd(settings.INGEST_STREAM, {"job_id": str(job_id)})
+
+
+async def read_jobs(consumer: str, count: int = 1, block_ms: int = 5000) -> List[Tuple[str, str]]:
+    """Block for new jobs assigned to this consumer; returns [(entry_id, job_id)]."""
+    r = get_redis()
+    resp = await r.xreadgroup(
+        settings.INGEST_CONSUMER_GROUP,
+        consumer,
+        {settings.INGEST_STREAM: ">"},
+        count=count,
+        block=block_ms,
+    )
+    jobs = []
+    for _stream, entries in resp or []:
+        for entry_id, fields in entries:
+            jobs.append((entry_id, fields.get("job_id")))
+    return jobs
+
+
+async def claim_stale_jobs(consumer: str, count: int = 1) -> List[Tuple[str, str]]:
+    """Take over jobs left pending by consumers that died mid-ingest."""
+    r = get_redis()
+    resp = await r.xautoclaim(
+        settings.INGEST_STREAM,
+        settings.INGEST_CONSUMER_GROUP,
+        consumer,
+        min_idle_time=settings.INGEST_CLAIM_IDLE_MS,
+        start_id="0-0",
+        count=count,
+    )
+    # [next_start_id, [(id, fields), ...], (deleted ids on Redis >= 7)]
+    entries = resp[1] if resp and len(resp) > 1 else []
+    return [(entry_id, fields.get("job_id")) for entry_id, fields in entries if fields]
+
+
+async def ack_job(entry_id: str) -> None:
+    r = get_redis()
+    await r.xack(settings.INGEST_STREAM, settings.INGEST_CONSUMER_GROUP, entry_id)
+    await r.xdel(settings.INGEST_STREAM, entry_id)
+
+
+async def touch_job(consumer: str, entry_id: str) -> None:
+    """Reset a pending entry's idle time so long ingests are not reclaimed."""
+    r = get_redis()
+    await r.xclaim(
+        settings.INGEST_STREAM,
+        settings.INGEST_CONSUMER_GROUP,
+        consumer,
+        min_idle_time=0,
+        message_ids=[entry_id],
+        justid=True,
+    )
@@ -1,11 +1,15 @@
 # backend/app/core/llm.py
 import os
 import hashlib
-from typing import Optional
+from typing import AsyncIterator, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from app.core.config import settings
-from app.core.cache import get_cached, set_cached, llm_cache_key
+from app.core import semantic_cache
+from app.core.cache import (
+    computing, get_cached_revalidating, get_or_compute, set_cached_fresh, wait_inflight, llm_cache_key,
+)
+from app.utils.embedding_utils import agenerate_embedding
 
 # Validate config
 if not settings.GEMINI_API_KEY:
@@ -36,18 +40,135 @@ async def _generate_response_raw(prompt: str) -> str:
         # keep error visible but return a controlled message
         return f"[Error communicating with Gemini: {e}]"
 
+def _chunk_text(chunk) -> str:
+    """Text of one streamed message chunk; Gemini sends str or a list of parts."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            c if isinstance(c, str) else c.get("text", "")
+            for c in content if isinstance(c, (str, dict))
+        )
+    return ""
+
+async def astream_response(prompt: str) -> AsyncIterator[str]:
+    """Low-level streaming LLM call (no cache): answer text as Gemini produces it. Errors propagate."""
+    async for chunk in llm.astream([HumanMessage(content=prompt)]):
+        text = _chunk_text(chunk)
+        if text:
+            yield text
+
+def _is_answer(value) -> bool:
+    # failed calls come back as a message, not an exception; don't keep serving those
+    return isinstance(value, dict) and not value.get("response", "").startswith("[Error communicating with Gemini")
+
+async def _semantic_lookup(ufdr_id: str, query: str) -> tuple:
+    """(cached answer of a similar question or None, query embedding or None)."""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None, None
+    try:
+        q_emb = await agenerate_embedding(query)
+        if not q_emb:
+            return None, None
+        hit = await semantic_cache.lookup(ufdr_id, q_emb)
+    except Exception:
+        return None, None
+    if _is_answer(hit):
+        return hit["response"], q_emb
+    return None, q_emb
+
+async def _semantic_remember(ufdr_id: str, key: str, q_emb) -> None:
+    if q_emb:
+        try:
+            await semantic_cache.remember(ufdr_id, key, q_emb)
+        except Exception:
+            pass
+
+def _answer_compute(ufdr_id: str, key: str, prompt: str, q_emb=None):
+    async def generate():
+        value = {"response": await _generate_response_raw(prompt)}
+        if _is_answer(value):
+            await _semantic_remember(ufdr_id, key, q_emb)
+        return value
+    return generate
+
 async def ask_llm_cached(ufdr_id: str, query: str, prompt: str) -> str:
-    """Check Redis for an LLM cached response, otherwise call Gemini and cache."""
+    """
+    Check Redis for an LLM cached response, otherwise call Gemini and cache.
+    On an exact miss, a question worded differently from one already
+    answered for this UFDR can hit through the semantic tier. Concurrent
+    misses for the same question share one Gemini call.
+    """
     key = llm_cache_key(ufdr_id, query)
-    cached = await get_cached(key)
-    if cached and isinstance(cached, dict) and "response" in cached:
+    try:
+        cached = await get_cached_revalidating(
+            key, _answer_compute(ufdr_id, key, prompt),
+            expire_seconds=settings.LLM_CACHE_TTL,
+            stale_seconds=settings.LLM_CACHE_STALE_SECONDS,
+            cacheable=_is_answer,
+        )
+    except Exception:
+        cached = None
+    if _is_answer(cached) and "response" in cached:
+        return cached["response"]
+    answer, q_emb = await _semantic_lookup(ufdr_id, query)
+    if answer is not None:
+        return answer
+
+    cached = await get_or_compute(
+        key, _answer_compute(ufdr_id, key, prompt, q_emb),
+        expire_seconds=settings.LLM_CACHE_TTL,
+        stale_seconds=settings.LLM_CACHE_STALE_SECONDS,
+        cacheable=_is_answer,
+    )
+    if isinstance(cached, dict) and "response" in cached:
         return cached["response"]
+    return await _generate_response_raw(prompt)
 
-    resp = await _generate_response_raw(prompt)
-    # store with TTL from settings
-    ttl = getattr(settings, "LLM_CACHE_TTL", 60 * 60 * 24 * 7)  # default 7 days
+async def stream_llm_cached(ufdr_id: str, query: str, prompt: str) -> AsyncIterator[str]:
+    """
+    ask_llm_cached, streamed: a cached answer is yielded whole, otherwise
+    Gemini's output is passed through as it arrives. The answer is cached
+    only if the stream runs to completion, never a partial one. Stale hits
+    are refreshed and misses coalesced the same way as ask_llm_cached, so
+    /ask and /ask/stream share one Gemini call per question.
+    """
+    key = llm_cache_key(ufdr_id, query)
     try:
-        await set_cached(key, {"response": resp}, expire_seconds=ttl)
+        cached = await get_cached_revalidating(
+            key, _answer_compute(ufdr_id, key, prompt),
+            expire_seconds=settings.LLM_CACHE_TTL,
+            stale_seconds=settings.LLM_CACHE_STALE_SECONDS,
+            cacheable=_is_answer,
+        )
     except Exception:
-        pass
-    return resp
+        cached = None
+    if _is_answer(cached) and "response" in cached:
+        yield cached["response"]
+        return
+    answer, q_emb = await _semantic_lookup(ufdr_id, query)
+    if answer is not None:
+        yield answer
+        return
+    joined = await wait_inflight(key)
+    if _is_answer(joined) and joined.get("response"):
+        yield joined["response"]
+        return
+
+    async with computing(key) as publish:
+        parts = []
+        async for text in astream_response(prompt):
+            parts.append(text)
+            yield text
+
+        value = {"response": "".join(parts).strip()}
+        if not value["response"] or not _is_answer(value):
+            return
+        try:
+            await set_cached_fresh(key, value, settings.LLM_CACHE_TTL, settings.LLM_CACHE_STALE_SECONDS)
+        except Exception:
+            pass
+        else:
+            await _semantic_remember(ufdr_id, key, q_emb)
+        publish(value)
@@ -1,7 +1,15 @@
 # app/core/minio_client.py
+import hashlib
+from datetime import timedelta
 from minio import Minio
+from minio.datatypes import Part
+from minio.error import S3Error
 from app.core.config import settings
 
+# S3 multipart limits: every part but the last must be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10_000
+
 minio_client = Minio(
     settings.MINIO_ENDPOINT,
     access_key=settings.MINIO_ACCESS_KEY,
@@ -9,10 +17,24 @@ minio_client = Minio(
     secure=settings.MINIO_SECURE
 )
 
-def upload_to_minio(file_path: str, object_name: str):
-    bucket = settings.MINIO_BUCKET_NAME
+# Presigned URLs are handed to browsers and CLI uploaders, so they are signed
+# for the public host. A fixed region keeps signing offline (no bucket
+# location lookup from a client that may not be able to reach that host).
+presign_client = Minio(
+    settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_ENDPOINT,
+    access_key=settings.MINIO_ACCESS_KEY,
+    secret_key=settings.MINIO_SECRET_KEY,
+    secure=settings.MINIO_SECURE if settings.MINIO_PUBLIC_SECURE is None else settings.MINIO_PUBLIC_SECURE,
+    region=settings.MINIO_REGION,
+)
+
+def _ensure_bucket(bucket: str) -> None:
     if not minio_client.bucket_exists(bucket):
         minio_client.make_bucket(bucket)
+
+def upload_to_minio(file_path: str, object_name: str):
+    bucket = settings.MINIO_BUCKET_NAME
+    _ensure_bucket(bucket)
     minio_client.fput_object(bucket, object_name, file_path)
     return f"{bucket}/{object_name}"
 
@@ -20,3 +42,92 @@ def get_file_url(object_name: str, expires_in=3600):
     return minio_client.presigned_get_object(
         settings.MINIO_BUCKET_NAME, object_name, expires=expires_in
     )
+
+def download_from_minio(storage_path: str, file_path: str, chunk_size: int = 1024 * 1024) -> tuple[int, str]:
+    """
+    Stream a `bucket/object` storage path (as returned by upload_to_minio)
+    to disk, hashing as it goes. Returns (size, sha256 hex).
+    """
+    bucket, _, object_name = storage_path.partition("/")
+    h = hashlib.sha256()
+    size = 0
+    resp = minio_client.get_object(bucket, object_name)
+    try:
+        with open(file_path, "wb") as out_f:
+            for chunk in resp.stream(chunk_size):
+                h.update(chunk)
+                out_f.write(chunk)
+                size += len(chunk)
+    finally:
+        resp.close()
+        resp.release_conn()
+    return size, h.hexdigest()
+
+# ---------- Multipart uploads ----------
+# minio-py exposes multipart only through put_object; these wrap the same
+# calls so a resumable upload can send its parts across separate requests.
+def create_multipart_upload(object_name: str, content_type: str = "application/zip") -> str:
+    bucket = settings.MINIO_BUCKET_NAME
+    _ensure_bucket(bucket)
+    return minio_client._create_multipart_upload(bucket, object_name, {"Content-Type": content_type})
+
+def upload_part(object_name: str, upload_id: str, part_number: int, data: bytes) -> str:
+    """Upload one part; returns its ETag."""
+    return minio_client._upload_part(
+        settings.MINIO_BUCKET_NAME, object_name, data, None, upload_id, part_number
+    )
+
+def complete_multipart_upload(object_name: str, upload_id: str, parts: list[tuple[int, str]]) -> str:
+    """Stitch (part_number, etag) pairs into the final object; returns its storage path."""
+    bucket = settings.MINIO_BUCKET_NAME
+    minio_client._complete_multipart_upload(
+        bucket, object_name, upload_id, [Part(n, etag) for n, etag in sorted(parts)]
+    )
+    return f"{bucket}/{object_name}"
+
+def abort_multipart_upload(object_name: str, upload_id: str) -> None:
+    minio_client._abort_multipart_upload(settings.MINIO_BUCKET_NAME, object_name, upload_id)
+
+def list_uploaded_parts(object_name: str, upload_id: str) -> list[tuple[int, str, int]]:
+    """(part_number, etag, size) for every part MinIO holds for this upload."""
+    parts, marker = [], None
+    while True:
+        result = minio_client._list_parts(
+            settings.MINIO_BUCKET_NAME, object_name, upload_id, part_number_marker=marker
+        )
+        parts.extend((p.part_number, p.etag, p.size) for p in result.parts)
+        if not result.is_truncated:
+            return parts
+        marker = result.next_part_number_marker
+
+# ---------- Presigned (direct) uploads ----------
+# The client PUTs bytes straight to MinIO; the API only signs URLs and
+# finalizes, so upload traffic never passes through an API worker.
+def presigned_put_url(object_name: str, expires_seconds: int | None = None) -> str:
+    return presign_client.presigned_put_object(
+        settings.MINIO_BUCKET_NAME,
+        object_name,
+        expires=timedelta(seconds=expires_seconds or settings.DIRECT_UPLOAD_URL_TTL),
+    )
+
+def presigned_part_url(object_name: str, upload_id: str, part_number: int, expires_seconds: int | None = None) -> str:
+    """URL the client PUTs one multipart part to; the response ETag is MinIO's own record of it."""
+    return presign_client.get_presigned_url(
+        "PUT",
+        settings.MINIO_BUCKET_NAME,
+        object_name,
+        expires=timedelta(seconds=expires_seconds or settings.DIRECT_UPLOAD_URL_TTL),
+        extra_query_params={"uploadId": upload_id, "partNumber": str(part_number)},
+    )
+
+def object_size(object_name: str) -> int | None:
+    """Size of a stored object, or None if nothing has been written there."""
+    try:
+        return minio_client.stat_object(settings.MINIO_BUCKET_NAME, object_name).size
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return None
+        raise
+
+def remove_object(object_name: str) -> None:
+    minio_client.remove_object(settings.MINIO_BUCKET_NAME, object_name)
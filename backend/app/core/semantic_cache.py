@@ -0,0 +1,105 @@
+# app/core/semantic_cache.py
+"""
+Semantic tier in front of the exact LLM answer cache.
+
+The exact cache (llm:<ufdr>:<sha256 of the question>) only helps when a
+question is repeated word for word. Here each answered question's
+embedding is kept per UFDR, in a hash under llm:<ufdr>:sem mapping the
+answer's exact-cache key to the L2-normalised float32 vector. A new
+question whose cosine similarity to a stored one reaches
+SEMANTIC_CACHE_THRESHOLD reuses that answer. Each UFDR keeps at most
+SEMANTIC_CACHE_MAX_PER_UFDR questions, least recently used evicted first,
+and the keys share the llm:<ufdr>: prefix so existing cache purges cover them.
+"""
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.core.cache import get_cached, get_redis_bytes
+from app.core.config import settings
+
+STATS_KEY = "llmsem:stats"
+
+
+def _index_key(ufdr_id: str) -> str:
+    return f"llm:{ufdr_id}:sem"
+
+
+def _lru_key(ufdr_id: str) -> str:
+    return f"llm:{ufdr_id}:sem:lru"
+
+
+def _unit(q_emb: Sequence[float]) -> Optional[np.ndarray]:
+    v = np.asarray(q_emb, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else None
+
+
+async def _count(field: str) -> None:
+    await get_redis_bytes().hincrby(STATS_KEY, field, 1)
+
+
+async def lookup(ufdr_id: str, q_emb: Sequence[float]) -> Optional[Any]:
+    """
+    Cached answer of the most similar earlier question about this UFDR, or
+    None. Entries whose answer has since expired are dropped on the way.
+    """
+    q = _unit(q_emb)
+    if q is None:
+        return None
+    r = get_redis_bytes()
+    stored = await r.hgetall(_index_key(ufdr_id))
+    if stored:
+        keys = list(stored)
+        matrix = np.vstack([np.frombuffer(stored[k], dtype=np.float32) for k in keys])
+        sims = matrix @ q
+        for i in np.argsort(-sims):
+            if sims[i] < settings.SEMANTIC_CACHE_THRESHOLD:
+                break
+            answer_key = keys[i].decode("utf-8")
+            value = await get_cached(answer_key)
+            if value is None:
+                await r.hdel(_index_key(ufdr_id), keys[i])
+                await r.zrem(_lru_key(ufdr_id), keys[i])
+                continue
+            await r.zadd(_lru_key(ufdr_id), {keys[i]: time.time()}, xx=True)
+            await _count("hits")
+            return value
+    await _count("misses")
+    return None
+
+
+async def remember(ufdr_id: str, answer_key: str, q_emb: Sequence[float]) -> None:
+    """Index a question's embedding under the exact-cache key its answer was stored at."""
+    q = _unit(q_emb)
+    if q is None:
+        return
+    r = get_redis_bytes()
+    ttl = settings.LLM_CACHE_TTL + settings.LLM_CACHE_STALE_SECONDS
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hset(_index_key(ufdr_id), answer_key, q.tobytes())
+        pipe.zadd(_lru_key(ufdr_id), {answer_key: time.time()})
+        pipe.expire(_index_key(ufdr_id), ttl)
+        pipe.expire(_lru_key(ufdr_id), ttl)
+        pipe.zcard(_lru_key(ufdr_id))
+        *_, size = await pipe.execute()
+
+    excess = size - settings.SEMANTIC_CACHE_MAX_PER_UFDR
+    if excess > 0:
+        evicted = await r.zpopmin(_lru_key(ufdr_id), excess)
+        if evicted:
+            await r.hdel(_index_key(ufdr_id), *[k for k, _score in evicted])
+
+
+async def semantic_cache_stats() -> Dict:
+    raw = await get_redis_bytes().hgetall(STATS_KEY)
+    hits = int(raw.get(b"hits", 0))
+    misses = int(raw.get(b"misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "threshold": settings.SEMANTIC_CACHE_THRESHOLD,
+        "max_per_ufdr": settings.SEMANTIC_CACHE_MAX_PER_UFDR,
+    }
@@ -0,0 +1,98 @@
+# app/core/upload_sessions.py
+"""
+Resumable UFDR upload sessions.
+
+A session maps our upload id to a MinIO multipart upload plus the parts
+received so far. State is one JSON value in Redis, so any API node can take
+any chunk; the bytes themselves go straight into MinIO. Mutations happen
+under a per-session Redis lock (see session_lock).
+
+"chunked" sessions receive their chunks through the API. "direct" sessions
+only hand out presigned URLs: the client PUTs to MinIO itself and MinIO is
+the record of which parts arrived, so `parts` stays empty.
+"""
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.cache import get_cached, set_cached, get_redis, acquire_lock, release_lock, upload_session_key
+from app.core.config import settings
+
+
+class SessionBusy(Exception):
+    """Another request is still writing to this upload session."""
+
+
+async def create_session(
+    user_id: str,
+    filename: str,
+    object_name: str,
+    minio_upload_id: str,
+    case_id: Optional[str] = None,
+    total_size: Optional[int] = None,
+    mode: str = "chunked",
+    part_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    session = {
+        "id": uuid.uuid4().hex,
+        "mode": mode,
+        "user_id": user_id,
+        "case_id": case_id,
+        "filename": filename,
+        "object_name": object_name,
+        "minio_upload_id": minio_upload_id,  # None for a direct single PUT
+        "total_size": total_size,
+        "part_size": part_size,
+        "offset": 0,
+        "parts": [],  # [{"n", "etag", "sha256", "size"}] in part order
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    await save_session(session)
+    return session
+
+
+async def get_session(upload_id: str) -> Optional[Dict[str, Any]]:
+    return await get_cached(upload_session_key(upload_id))
+
+
+async def save_session(session: Dict[str, Any]) -> None:
+    # every write also pushes the idle expiry out again
+    await set_cached(upload_session_key(session["id"]), session, expire_seconds=settings.UPLOAD_SESSION_TTL)
+
+
+async def delete_session(upload_id: str) -> None:
+    await get_redis().delete(upload_session_key(upload_id))
+
+
+@asynccontextmanager
+async def session_lock(upload_id: str, wait_seconds: float = 10):
+    key = f"lock:{upload_session_key(upload_id)}"
+    token = await acquire_lock(key, ttl_seconds=300, wait_seconds=wait_seconds)
+    if token is None:
+        raise SessionBusy(upload_id)
+    try:
+        yield
+    finally:
+        await release_lock(key, token)
+
+
+def session_status(session: Dict[str, Any]) -> Dict[str, Any]:
+    """The client-facing view: where to resume from."""
+    parts = session["parts"]
+    return {
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "case_id": session["case_id"],
+        "offset": session["offset"],
+        "next_part": len(parts) + 1,
+        "parts": [{"part_number": p["n"], "size": p["size"], "sha256": p["sha256"]} for p in parts],
+        "total_size": session["total_size"],
+        "chunk_size": settings.RESUMABLE_CHUNK_SIZE,
+        "max_chunk_size": settings.RESUMABLE_MAX_CHUNK_BYTES,
+    }
+
+
+def part_count(session: Dict[str, Any]) -> int:
+    """Number of parts a direct multipart session is split into."""
+    return max(1, -(-session["total_size"] // session["part_size"]))
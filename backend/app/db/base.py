@@ -5,6 +5,8 @@ import app.models.user
 import app.models.case
 import app.models.ufdrfile
 import app.models.artifact
+import app.models.artifact_chunk
 import app.models.auditlog
 import app.models.chat_session
 import app.models.case_assignment
+import app.models.ingest_job
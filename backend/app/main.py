@@ -3,7 +3,7 @@ import app.db.base
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.audit import AuditMiddleware
-from app.api.routes import auth, users, ufdr, artifacts, conversation, dashboard, audit, admin, report
+from app.api.routes import auth, users, ufdr, artifacts, conversation, dashboard, audit, admin, report, search
 from app.api.routes import cases as cases_router
 from app.db.session import get_db
 from sqlalchemy.future import select
@@ -11,6 +11,7 @@ from app.models.user import User, UserRole
 from app.core.security import get_password_hash
 from app.models import User
 from app.db.session import SessionLocal
+from app.core.cache import stop_invalidation_listener
 
 app = FastAPI(title="Cognis Backend")
 
@@ -35,6 +36,7 @@ app.include_router(cases_router.router, prefix="/api/v1")
 app.include_router(ufdr.router, prefix="/api/v1")
 app.include_router(artifacts.router, prefix="/api/v1")
 app.include_router(conversation.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
 app.include_router(report.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(audit.router, prefix="/api/v1")
@@ -62,4 +64,9 @@ async def create_default_admin():
             print("ℹ️ Default admin already exists.")
 
 
+@app.on_event("shutdown")
+async def stop_cache_invalidation_listener():
+    await stop_invalidation_listener()
+
+
 # TRUNCATE TABLE users, cases, ufdr_files, artifacts, audit_logs RESTART IDENTITY CASCADE;
\ No newline at end of file
@@ -2,16 +2,20 @@ from .user import User
 from .case import Case
 from .ufdrfile import UFDRFile
 from .artifact import Artifact
+from .artifact_chunk import ArtifactChunk
 from .auditlog import AuditLog
 from .chat_session import ChatSession
 from .case_assignment import CaseAssignment
+from .ingest_job import IngestJob
 
 __all__ = [
     "User",
     "Case",
     "UFDRFile",
     "Artifact",
+    "ArtifactChunk",
     "AuditLog",
     "ChatSession",
     "CaseAssignment",
+    "IngestJob",
 ]
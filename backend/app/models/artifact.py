@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Index, Computed
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from pgvector.sqlalchemy import Vector
 from datetime import datetime
 import uuid
@@ -18,4 +18,20 @@ class Artifact(Base):
     raw = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     embedding = Column(Vector(384), nullable=True)
+    # maintained by Postgres; deferred so ORM loads of artifacts don't carry it
+    search_tsv = deferred(Column(
+        TSVECTOR, Computed("to_tsvector('english', coalesce(extracted_text, ''))", persisted=True)
+    ))
     ufdr_file = relationship("UFDRFile", back_populates="artifacts")
+
+    __table_args__ = (
+        Index(
+            "ix_artifacts_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_artifacts_search_tsv", "search_tsv", postgresql_using="gin"),
+        # ix_artifacts_extracted_text_trgm (gin_trgm_ops) is created by migration
+        # e8b05c3a6d19 only, since it needs the pg_trgm extension installed first.
+    )
@@ -0,0 +1,38 @@
+# backend/app/models/artifact_chunk.py
+from sqlalchemy import Column, ForeignKey, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from pgvector.sqlalchemy import Vector
+import uuid
+
+from app.db.base_class import Base
+
+
+class ArtifactChunk(Base):
+    """
+    One embedded slice of a long artifact's text, written at ingest time.
+    Offsets are character positions in the artifact's parsed text. Artifacts
+    short enough to embed whole have no chunks; retrieval uses their own
+    embedding.
+    """
+    __tablename__ = "artifact_chunks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    artifact_id = Column(UUID(as_uuid=True), ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False, index=True)
+    ufdr_file_id = Column(UUID(as_uuid=True), ForeignKey("ufdr_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    embedding = Column(Vector(384), nullable=True)
+
+    artifact = relationship("Artifact")
+
+    __table_args__ = (
+        Index(
+            "ix_artifact_chunks_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
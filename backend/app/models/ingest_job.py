@@ -0,0 +1,28 @@
+# backend/app/models/ingest_job.py
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import uuid
+
+from app.db.base_class import Base
+
+
+class IngestJob(Base):
+    """One background ingestion run (extract → parse → embed → insert) of a UFDR."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    ufdr_file_id = Column(UUID(as_uuid=True), ForeignKey("ufdr_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    stage = Column(String(20), nullable=True)
+    progress = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    worker = Column(String, nullable=True)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # lease: renewed while a worker runs the job
+
+    ufdr_file = relationship("UFDRFile")
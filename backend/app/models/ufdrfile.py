@@ -14,6 +14,7 @@ class UFDRFile(Base):
     case_id = Column(UUID(as_uuid=True), ForeignKey("cases.id", ondelete="SET NULL"), nullable=True)
     filename = Column(String, nullable=False)
     storage_path = Column(String, nullable=False)
+    file_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded ZIP
     meta = Column(JSON, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,67 @@
+# app/scripts/backfill_chunks.py
+"""
+Chunk and embed long artifacts ingested before artifact_chunks existed.
+
+    python -m app.scripts.backfill_chunks [--ufdr <id>] [--batch 200]
+
+Safe to re-run: artifacts that already have chunks are skipped. Until an
+UFDR is backfilled, chat retrieval falls back to whole-artifact embeddings.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import exists, func, select
+
+import app.db.base  # noqa: F401  (register all models before use)
+from app.core.config import settings
+from app.db import session as db_session
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+from app.utils import embedding_utils, vector_index
+from app.utils.bulk_insert import ArtifactBulkWriter
+from app.utils.chunking import chunk_spans
+
+
+async def backfill(ufdr_id=None, batch: int = 200) -> int:
+    total, touched = 0, set()
+    while True:
+        async with db_session.SessionLocal() as db:
+            stmt = (
+                select(Artifact.id, Artifact.ufdr_file_id, Artifact.extracted_text)
+                .where(func.length(Artifact.extracted_text) > settings.CHUNK_CHARS)
+                .where(~exists().where(ArtifactChunk.artifact_id == Artifact.id))
+                .limit(batch)
+            )
+            if ufdr_id:
+                stmt = stmt.where(Artifact.ufdr_file_id == ufdr_id)
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                for ufdr in touched:
+                    await vector_index.bump_version(ufdr)
+                return total
+
+            pieces = [
+                (art_id, ufdr, n, start, end, text[start:end])
+                for art_id, ufdr, text in rows
+                for n, (start, end) in enumerate(chunk_spans(text))
+            ]
+            vecs = await embedding_utils.agenerate_embeddings([p[5] for p in pieces])
+            writer = ArtifactBulkWriter(db)
+            for i, (art_id, ufdr, n, start, end, piece) in enumerate(pieces):
+                writer.add_chunk(
+                    artifact_id=art_id, ufdr_file_id=ufdr, chunk_index=n, start=start, end=end,
+                    text=piece, embedding=vecs[i] if vecs is not None and piece.strip() else None,
+                )
+            await writer.flush()
+            await db.commit()
+            touched.update(ufdr for _art_id, ufdr, _text in rows)
+            total += len(rows)
+            print(f"[BACKFILL] chunked {total} artifacts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill artifact_chunks for existing artifacts")
+    parser.add_argument("--ufdr", default=None, help="Only this UFDR file id")
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.ufdr, args.batch))
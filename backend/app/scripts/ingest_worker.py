@@ -0,0 +1,65 @@
+# app/scripts/ingest_worker.py
+"""
+UFDR ingestion worker.
+
+    python -m app.scripts.ingest_worker --concurrency 2
+
+Run one or more of these on any node that can reach Postgres, Redis and
+MinIO. Workers share the Redis Streams consumer group, so adding processes
+(or hosts) spreads the queue across them.
+"""
+import argparse
+import asyncio
+import os
+import socket
+
+import app.db.base  # noqa: F401  (register all models before use)
+from app.core.config import settings
+from app.core.ingest_queue import ensure_group, read_jobs, claim_stale_jobs, ack_job, touch_job
+from app.utils.ingest import run_ingest_job
+
+
+async def _consume(consumer: str) -> None:
+    while True:
+        try:
+            jobs = await claim_stale_jobs(consumer) or await read_jobs(consumer)
+        except Exception as e:
+            print(f"[INGEST WORKER {consumer}] queue error: {e}")
+            await asyncio.sleep(5)
+            continue
+
+        for entry_id, job_id in jobs:
+            async def heartbeat(entry_id=entry_id):
+                await touch_job(consumer, entry_id)
+
+            if job_id:
+                print(f"[INGEST WORKER {consumer}] job {job_id} started")
+                try:
+                    job = await run_ingest_job(job_id, worker=consumer, heartbeat=heartbeat)
+                except Exception as e:
+                    # Left unacked: once idle it is reclaimed and retried
+                    print(f"[INGEST WORKER {consumer}] job {job_id} error: {e}")
+                    continue
+                if job is not None and job.status == "running" and job.worker != consumer:
+                    # another live worker holds the lease; left unacked in case it dies
+                    print(f"[INGEST WORKER {consumer}] job {job_id} is held by {job.worker}")
+                    continue
+                status = job.status if job is not None else "missing"
+                print(f"[INGEST WORKER {consumer}] job {job_id} {status}")
+            try:
+                await ack_job(entry_id)
+            except Exception as e:
+                print(f"[INGEST WORKER {consumer}] ack error for {entry_id}: {e}")
+
+
+async def main(concurrency: int) -> None:
+    await ensure_group()
+    base = f"{socket.gethostname()}-{os.getpid()}"
+    await asyncio.gather(*(_consume(f"{base}-{i}") for i in range(concurrency)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cognis UFDR ingestion worker")
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
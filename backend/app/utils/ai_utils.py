@@ -1,6 +1,79 @@
 # app/utils/ai_utils.py
 
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Sequence, Tuple
+from app.core.config import settings
+
+
+# ---------- Context budgeting ----------
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` (CONTEXT_CHARS_PER_TOKEN characters per token)."""
+    if not text:
+        return 0
+    return -(-len(text) // settings.CONTEXT_CHARS_PER_TOKEN)
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) <= n:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def build_context(
+    passages: Sequence[tuple],
+    types: Dict[str, str],
+    token_budget: Optional[int] = None,
+    min_relative_score: Optional[float] = None,
+    dedup_similarity: Optional[float] = None,
+) -> Tuple[str, int, List[str]]:
+    """
+    Pack retrieved passages into a bounded evidence block.
+
+    `passages` are (artifact_id, text, score, ...) in relevance order; score
+    is a similarity, or None for keyword matches, which are taken in the
+    order given. Packing stops at the first passage scoring below
+    `min_relative_score` x the best score, skips near-duplicates of passages
+    already packed, and never exceeds `token_budget` (a single oversized
+    top passage is truncated rather than dropped). `types` maps artifact ids
+    to their type label; passages of unknown artifacts are skipped.
+    Returns (context, estimated tokens, ids of the artifacts packed).
+    """
+    budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+    ratio = settings.CONTEXT_MIN_RELATIVE_SCORE if min_relative_score is None else min_relative_score
+    dedup = settings.CONTEXT_DEDUP_SIMILARITY if dedup_similarity is None else dedup_similarity
+
+    scores = [p[2] for p in passages if p[2] is not None]
+    floor = max(scores) * ratio if scores and max(scores) > 0 else None
+
+    lines: List[str] = []
+    kept: List[set] = []
+    packed: List[str] = []
+    used = 0
+    for art_id, text, score, *_ in passages:
+        if not text or art_id not in types:
+            continue
+        if floor is not None and score is not None and score < floor:
+            break
+        shingles = _shingles(text)
+        if any(_jaccard(shingles, k) >= dedup for k in kept):
+            continue
+        line = f"[{types[art_id]}] {text}\n"
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            if lines:
+                continue  # a shorter, less relevant passage may still fit
+            line = line[: budget * settings.CONTEXT_CHARS_PER_TOKEN - 1] + "\n"
+            cost = estimate_tokens(line)
+        lines.append(line)
+        kept.append(shingles)
+        used += cost
+        packed.append(art_id)
+    return "".join(lines), used, list(dict.fromkeys(packed))
+
 
 def build_forensic_prompt(
     q: str,
@@ -10,6 +83,7 @@ def build_forensic_prompt(
     """
     Build a forensic-aware prompt for the LLM.
     Includes short system message, evidence context, and prior conversation.
+    `context` is expected to be bounded already (see build_context).
     """
     system = "You are a forensic AI assistant analyzing UFDR data. Be precise and concise."
 
@@ -26,4 +100,4 @@ def build_forensic_prompt(
         f"Context:\n{context}\n\n"
         f"Conversation:\n{history_text}\n"
         f"User: {q}\nAssistant:"
-    )
\ No newline at end of file
+    )
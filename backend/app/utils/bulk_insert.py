@@ -0,0 +1,137 @@
+# app/utils/bulk_insert.py
+"""
+Batched artifact writes for ingestion.
+
+Rows are buffered in memory (at most `batch_size` of them) and written with
+one COPY per batch on asyncpg, or one multi-row INSERT on other drivers,
+instead of an INSERT round-trip per artifact. Chunk rows (artifact_chunks)
+ride along and are written right after the artifacts they belong to.
+"""
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pgvector.asyncpg import register_vector
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+
+COPY_COLUMNS = (
+    "id", "ufdr_file_id", "case_id", "type",
+    "extracted_text", "raw", "created_at", "embedding",
+)
+CHUNK_COPY_COLUMNS = (
+    "id", "artifact_id", "ufdr_file_id", "chunk_index",
+    "start_offset", "end_offset", "text", "embedding",
+)
+
+
+def _clean_text(text: Optional[str]) -> Optional[str]:
+    # Postgres text cannot hold NUL bytes; PDFs and binary-ish CSVs produce them.
+    if text and "\x00" in text:
+        return text.replace("\x00", "")
+    return text
+
+
+class ArtifactBulkWriter:
+    """Accumulates artifact rows and writes them in batches within the session's transaction."""
+
+    def __init__(self, db: AsyncSession, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.INGEST_INSERT_BATCH
+        self.written = 0
+        self.chunks_written = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._chunks: List[tuple] = []
+
+    def add(
+        self,
+        *,
+        ufdr_file_id,
+        case_id=None,
+        type: Optional[str] = None,
+        text: Optional[str] = None,
+        raw: Optional[dict] = None,
+        embedding=None,
+    ) -> uuid.UUID:
+        """Buffer one row and return the id it will be written with."""
+        art_id = uuid.uuid4()
+        self._rows.append({
+            "id": art_id,
+            "ufdr_file_id": ufdr_file_id,
+            "case_id": case_id,
+            "type": type,
+            "extracted_text": _clean_text(text),
+            "raw": raw,
+            "created_at": datetime.utcnow(),
+            "embedding": embedding,
+        })
+        return art_id
+
+    def add_chunk(
+        self, *, artifact_id, ufdr_file_id, chunk_index: int, start: int, end: int, text: str, embedding=None
+    ) -> None:
+        """Buffer one chunk of an artifact already passed to add()/write()."""
+        self._chunks.append((
+            uuid.uuid4(), artifact_id, ufdr_file_id, chunk_index, start, end, _clean_text(text), embedding,
+        ))
+
+    async def write(self, **row) -> uuid.UUID:
+        """add() and flush automatically once a full batch is buffered."""
+        art_id = self.add(**row)
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+        return art_id
+
+    async def flush(self) -> List[uuid.UUID]:
+        """Write buffered rows; returns their ids in insertion order."""
+        rows, self._rows = self._rows, []
+        chunks, self._chunks = self._chunks, []
+        if not rows and not chunks:
+            return []
+
+        conn = await self.db.connection()
+        if conn.dialect.driver == "asyncpg":
+            await self._copy(conn, rows, chunks)
+        else:
+            if rows:
+                await conn.execute(insert(Artifact.__table__), rows)
+            if chunks:
+                await conn.execute(
+                    insert(ArtifactChunk.__table__), [dict(zip(CHUNK_COPY_COLUMNS, c)) for c in chunks]
+                )
+
+        self.written += len(rows)
+        self.chunks_written += len(chunks)
+        return [r["id"] for r in rows]
+
+    async def _copy(self, conn, rows: List[Dict[str, Any]], chunks: List[tuple]) -> None:
+        raw_conn = await conn.get_raw_connection()
+        apg = raw_conn.driver_connection
+        records = [
+            (
+                r["id"], r["ufdr_file_id"], r["case_id"], r["type"],
+                r["extracted_text"],
+                json.dumps(r["raw"]) if r["raw"] is not None else None,
+                r["created_at"], r["embedding"],
+            )
+            for r in rows
+        ]
+        # COPY is binary-only; the vector codec is swapped in just for this
+        # call so the pooled connection keeps the text codec the ORM expects.
+        await register_vector(apg)
+        try:
+            if records:
+                await apg.copy_records_to_table(
+                    Artifact.__tablename__, records=records, columns=COPY_COLUMNS
+                )
+            if chunks:
+                await apg.copy_records_to_table(
+                    ArtifactChunk.__tablename__, records=chunks, columns=CHUNK_COPY_COLUMNS
+                )
+        finally:
+            await apg.reset_type_codec("vector", schema="public")
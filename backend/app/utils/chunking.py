@@ -0,0 +1,47 @@
+# app/utils/chunking.py
+"""
+Ingest-time chunking of long artifact text for retrieval.
+
+Chunks are cut once, when the artifact is written, and embedded alongside
+it; queries rank the stored chunks instead of re-splitting text per request.
+"""
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+# Look this far back from a hard cut for whitespace to break on instead.
+_SNAP_FRACTION = 0.2
+
+
+def chunk_spans(
+    text: Optional[str],
+    size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """
+    (start, end) character spans covering `text` in windows of at most
+    `size` that overlap by about `overlap`, preferring to end on whitespace.
+    Text that fits in one window needs no chunks and returns [].
+    """
+    size = size or settings.CHUNK_CHARS
+    overlap = settings.CHUNK_OVERLAP if overlap is None else overlap
+    max_chunks = max_chunks or settings.CHUNK_MAX_PER_ARTIFACT
+    if not text or len(text) <= size:
+        return []
+
+    overlap = min(overlap, size // 2)
+    spans: List[Tuple[int, int]] = []
+    start, n = 0, len(text)
+    while start < n and len(spans) < max_chunks:
+        end = min(start + size, n)
+        if end < n:
+            floor = end - int(size * _SNAP_FRACTION)
+            cut = max(text.rfind(" ", floor, end), text.rfind("\n", floor, end))
+            if cut > start:
+                end = cut
+        spans.append((start, end))
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return spans
@@ -1,5 +1,9 @@
 # app/utils/embedding_utils.py
+from typing import Dict, List, Sequence
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
 from sentence_transformers import SentenceTransformer
+from app.core import embedding_cache
 from app.core.config import settings
 
 _model = None
@@ -19,3 +23,94 @@ def generate_embedding(text: str) -> list[float]:
     except Exception:
         # as fallback if model returns numpy
         return vec.tolist() if hasattr(vec, "tolist") else list(map(float, vec))
+
+def generate_embeddings(texts: Sequence[str], batch_size: int | None = None) -> np.ndarray:
+    """
+    Encode many texts with one model call per batch.
+
+    Returns a C-contiguous float32 matrix of shape (len(texts), dim) in input
+    order. Texts are encoded longest-first so each batch pads to similar
+    lengths; empty texts are skipped and come back as all-zero rows.
+    """
+    model = _get_model()
+    out = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    order = sorted((i for i, t in enumerate(texts) if t), key=lambda i: len(texts[i]), reverse=True)
+    if not order:
+        return out
+
+    vecs = model.encode(
+        [texts[i] for i in order],
+        batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    out[order] = vecs
+    return np.ascontiguousarray(out)
+
+
+# ---------- Cached (async) variants ----------
+async def agenerate_embedding(text: str) -> list[float]:
+    """generate_embedding behind the embedding cache."""
+    norm = embedding_cache.normalize_text(text) if text else ""
+    if not norm:
+        return []
+    if not settings.EMBED_CACHE_ENABLED:
+        return await run_in_threadpool(generate_embedding, norm)
+
+    key = embedding_cache.text_key(norm)
+    try:
+        cached = (await embedding_cache.get_many([key]))[0]
+    except Exception:
+        cached = None
+    if cached is not None:
+        return cached.tolist()
+
+    vec = await run_in_threadpool(generate_embedding, norm)
+    if vec:
+        try:
+            await embedding_cache.put_many({key: np.asarray(vec, dtype=np.float32)})
+        except Exception:
+            pass
+    return vec
+
+async def agenerate_embeddings(texts: Sequence[str], batch_size: int | None = None) -> np.ndarray:
+    """
+    generate_embeddings behind the embedding cache. Texts are embedded in
+    normalized form, cache or not. Texts that are equal after normalization
+    are looked up (one MGET per call) and embedded only once; just the
+    misses reach the model. Redis being unavailable only costs the cache,
+    not the call.
+    """
+    normalized = [embedding_cache.normalize_text(t) if t else "" for t in texts]
+    if not settings.EMBED_CACHE_ENABLED:
+        return await run_in_threadpool(generate_embeddings, normalized, batch_size)
+
+    positions: Dict[str, List[int]] = {}
+    for i, norm in enumerate(normalized):
+        if norm:
+            positions.setdefault(norm, []).append(i)
+    if not positions:
+        return await run_in_threadpool(generate_embeddings, normalized, batch_size)
+
+    uniq = list(positions)
+    keys = [embedding_cache.text_key(t) for t in uniq]
+    try:
+        vecs = await embedding_cache.get_many(keys)
+    except Exception:
+        vecs = [None] * len(keys)
+
+    miss = [j for j, v in enumerate(vecs) if v is None]
+    if miss:
+        fresh = await run_in_threadpool(generate_embeddings, [uniq[j] for j in miss], batch_size)
+        for n, j in enumerate(miss):
+            vecs[j] = fresh[n]
+        try:
+            await embedding_cache.put_many({keys[j]: vecs[j] for j in miss})
+        except Exception:
+            pass
+
+    out = np.zeros((len(texts), len(vecs[0])), dtype=np.float32)
+    for t, v in zip(uniq, vecs):
+        out[positions[t]] = v
+    return out
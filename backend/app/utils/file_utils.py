@@ -2,9 +2,16 @@
 
 import os
 import shutil
+import hashlib
 import zipfile
 import tempfile
-from typing import List, Tuple
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class UploadTooLargeError(Exception):
+    """Raised when a streamed upload grows past the configured byte limit."""
 
 
 def is_within_directory(directory: str, target: str) -> bool:
@@ -13,19 +20,36 @@ def is_within_directory(directory: str, target: str) -> bool:
     return os.path.commonpath([abs_directory]) == os.path.commonpath([abs_directory, abs_target])
 
 
+def safe_member_name(member_name: str, root: str = "/ufdr") -> Optional[str]:
+    """
+    Normalized relative path for a ZIP member, or None if the name is
+    absolute or would escape `root` (path traversal).
+    """
+    if os.path.isabs(member_name):
+        return None
+    normalized = os.path.normpath(member_name)
+    if normalized.startswith(".."):
+        return None
+    if not is_within_directory(root, os.path.join(root, normalized)):
+        return None
+    return normalized
+
+
+def iter_safe_members(zf: zipfile.ZipFile) -> Iterator[Tuple[zipfile.ZipInfo, str]]:
+    """Yield (info, normalized name) for every regular, traversal-safe member."""
+    for member in zf.infolist():
+        if member.is_dir():
+            continue
+        normalized = safe_member_name(member.filename)
+        if normalized is not None:
+            yield member, normalized
+
+
 def safe_extract_zip(zip_path: str, extract_to: str) -> List[str]:
     """Safely extract ZIP files, blocking path traversal."""
     extracted_files = []
     with zipfile.ZipFile(zip_path, "r") as zf:
-        for member in zf.infolist():
-            if member.is_dir():
-                continue
-            member_name = member.filename
-            if os.path.isabs(member_name):
-                continue
-            normalized = os.path.normpath(member_name)
-            if normalized.startswith(".."):
-                continue
+        for member, normalized in iter_safe_members(zf):
             target_path = os.path.join(extract_to, normalized)
             if not is_within_directory(extract_to, target_path):
                 continue
@@ -36,6 +60,51 @@ def safe_extract_zip(zip_path: str, extract_to: str) -> List[str]:
     return extracted_files
 
 
+async def iter_upload_chunks(upload, chunk_size: int) -> AsyncIterator[bytes]:
+    """Yield an UploadFile's content in fixed-size chunks."""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _write_hashed(out_f, h, chunk: bytes) -> None:
+    h.update(chunk)
+    out_f.write(chunk)
+
+
+async def stream_to_path(
+    chunks: AsyncIterator[bytes], dest_path: str, max_bytes: int | None = None
+) -> Tuple[int, str]:
+    """
+    Write an async stream of byte chunks to dest_path, hashing as it goes.
+    Returns (size, sha256 hex). Raises UploadTooLargeError as soon as the
+    written size exceeds max_bytes; the partial file is removed. Disk I/O
+    and hashing run in the threadpool, never on the event loop.
+    """
+    h = hashlib.sha256()
+    size = 0
+    out_f = None
+    try:
+        out_f = await run_in_threadpool(open, dest_path, "wb")
+        async for chunk in chunks:
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            await run_in_threadpool(_write_hashed, out_f, h, chunk)
+        await run_in_threadpool(out_f.close)
+    except BaseException:
+        if out_f is not None:
+            out_f.close()
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        raise
+    return size, h.hexdigest()
+
+
 def make_tempdir(prefix: str = "ufdr_") -> Tuple[str, tempfile.TemporaryDirectory]:
     """Create a temporary directory and return its path and object."""
     tmp = tempfile.TemporaryDirectory(prefix=prefix)
@@ -0,0 +1,759 @@
+# app/utils/ingest.py
+"""
+UFDR ingestion: extract → parse → embed → insert.
+
+"extract" only reads the archive's central directory; members are parsed
+straight out of the ZIP, never unpacked to a temp dir. Parse, embed and
+insert then run concurrently, connected by bounded queues of
+INGEST_EMBED_BATCH records, so peak memory follows the batch size and
+queue depth rather than the size of the UFDR. Each stage runs its own
+number of workers (INGEST_*_CONCURRENCY, PARSE_WORKERS) and records how long
+it was busy, starved (waiting on the stage before it) and blocked (waiting
+on the stage after it), which shows where a slow ingest is bottlenecked.
+When the upload request ingests inline, the MinIO upload is one more stage
+running alongside the others.
+
+Runs either inside an ingestion worker (app/scripts/ingest_worker.py) or,
+when INGEST_ASYNC is off, directly in the upload request. Progress for each
+stage is written to the IngestJob row so /ufdr/jobs/{id} can report it.
+"""
+import os
+import time
+import uuid
+import asyncio
+import functools
+import shutil
+import zipfile
+import itertools
+import tempfile
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, or_, select, text, update
+
+from app.core.access import assigned_case_ids, is_restricted
+from app.core.cache import del_pattern
+from app.core.config import settings
+from app.core.minio_client import download_from_minio
+from app.db import session as db_session
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+from app.models.ingest_job import IngestJob
+from app.models.ufdrfile import UFDRFile
+from app.models.user import User
+from app.utils import embedding_utils, vector_index
+from app.utils.bulk_insert import ArtifactBulkWriter
+from app.utils.chunking import chunk_spans
+from app.utils.parse_pool import (
+    list_zip_members, split_members, iter_member_records, timed_out,
+    parse_members_parallel, aparse_members_parallel
+)
+from app.utils.parsers import ParsedRecord, Records
+
+STAGES = ("extract", "parse", "embed", "insert", "upload")
+TIMINGS = ("busy", "starved", "blocked")
+
+
+# ---------- Parsing ----------
+def parse_zip(file_path: str) -> Records:
+    """
+    Lazily parse a ZIP's safe, supported members without extracting it.
+    Record formats are streamed in-process; the rest go to the process pool.
+    """
+    streamed, pooled = split_members(list_zip_members(file_path))
+    with zipfile.ZipFile(file_path, "r") as zf:
+        for name, _size in streamed:
+            yield from iter_member_records(zf, name)
+    for _name, parsed in parse_members_parallel(
+        file_path, pooled, settings.PARSE_WORKERS, settings.PARSE_MEMBER_TIMEOUT
+    ):
+        yield from parsed
+
+
+# ---------- Progress ----------
+class IngestProgress:
+    """Per-stage item counts, wall-clock and busy/starved/blocked timings for one ingest run."""
+
+    def __init__(self):
+        self.stages = {
+            s: {
+                "state": "pending", "done": 0, "total": None, "started": None, "finished": None,
+                "workers": 1, "busy": 0.0, "starved": 0.0, "blocked": 0.0,
+            }
+            for s in STAGES
+        }
+
+    def start(self, stage: str, total: Optional[int] = None, workers: int = 1) -> None:
+        st = self.stages[stage]
+        st["state"] = "running"
+        st["total"] = total
+        st["workers"] = workers
+        st["started"] = time.monotonic()
+
+    def add_time(self, stage: str, kind: str, seconds: float) -> None:
+        self.stages[stage][kind] += seconds
+
+    @contextmanager
+    def timing(self, stage: str, kind: str):
+        """Charge the time spent inside the block to `stage` as busy/starved/blocked."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[stage][kind] += time.monotonic() - t0
+
+    def advance(self, stage: str, n: int = 1) -> None:
+        self.stages[stage]["done"] += n
+
+    def skip(self, stage: str) -> None:
+        st = self.stages[stage]
+        st["state"] = "skipped"
+        st["total"] = 0
+
+    def set_done(self, stage: str, done: int) -> None:
+        self.stages[stage]["done"] = done
+
+    def finish(self, stage: str) -> None:
+        st = self.stages[stage]
+        st["state"] = "done"
+        st["finished"] = time.monotonic()
+        if st["total"] is None:
+            st["total"] = st["done"]
+
+    def current(self) -> Optional[str]:
+        for s in STAGES:
+            if self.stages[s]["state"] == "running":
+                return s
+        return None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """JSON-safe view with elapsed seconds and items/second per stage."""
+        now = time.monotonic()
+        out = {}
+        for name, st in self.stages.items():
+            elapsed = 0.0
+            if st["started"] is not None:
+                elapsed = (st["finished"] or now) - st["started"]
+            out[name] = {
+                "state": st["state"],
+                "done": st["done"],
+                "total": st["total"],
+                "elapsed_s": round(elapsed, 3),
+                "throughput_per_s": round(st["done"] / elapsed, 2) if elapsed > 0 else None,
+                "workers": st["workers"],
+                **{f"{k}_s": round(st[k], 3) for k in TIMINGS},
+            }
+        return out
+
+    def bottleneck(self) -> Optional[str]:
+        """The stage with the most busy time per worker, i.e. the one the others waited on."""
+        ran = [s for s in STAGES if self.stages[s]["busy"] > 0]
+        if not ran:
+            return None
+        return max(ran, key=lambda s: self.stages[s]["busy"] / self.stages[s]["workers"])
+
+
+class _ProgressReporter:
+    """Throttles progress writes to the job row."""
+
+    def __init__(self, job_id, progress: IngestProgress):
+        self.job_id = job_id
+        self.progress = progress
+        self._last = 0.0
+
+    async def maybe_flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < settings.INGEST_PROGRESS_INTERVAL:
+            return
+        self._last = now
+        await _update_job(self.job_id, stage=self.progress.current(), progress=self.progress.snapshot())
+
+
+async def _update_job(job_id, **fields) -> None:
+    # Separate short-lived session so progress is visible while the
+    # artifact transaction is still open.
+    async with db_session.SessionLocal() as db:
+        job = await db.get(IngestJob, job_id)
+        if job is None:
+            return
+        for k, v in fields.items():
+            setattr(job, k, v)
+        await db.commit()
+
+
+# ---------- Lease ----------
+async def _claim_job(db, job_id, worker: Optional[str]) -> bool:
+    """
+    Take the job's lease: it must be queued or failed, already ours, or held
+    by a worker whose heartbeat stopped more than INGEST_CLAIM_IDLE_MS ago.
+    False means another live worker is running it (or it is done).
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(milliseconds=settings.INGEST_CLAIM_IDLE_MS)
+    holders = [
+        IngestJob.status.in_(("queued", "failed")),
+        IngestJob.heartbeat_at.is_(None),
+        IngestJob.heartbeat_at < stale,
+    ]
+    if worker is not None:
+        holders.append(IngestJob.worker == worker)
+    res = await db.execute(
+        update(IngestJob)
+        .where(IngestJob.id == job_id, IngestJob.status != "done", or_(*holders))
+        .values(status="running", worker=worker, error=None, started_at=now, heartbeat_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return res.rowcount == 1
+
+
+async def _keep_alive(job_id, worker: Optional[str], heartbeat: Optional[Callable[[], Awaitable]]) -> None:
+    """Renew the job lease and (through `heartbeat`) its queue entry until cancelled."""
+    while True:
+        await asyncio.sleep(settings.INGEST_HEARTBEAT_INTERVAL)
+        try:
+            async with db_session.SessionLocal() as db:
+                await db.execute(
+                    update(IngestJob)
+                    .where(IngestJob.id == job_id, IngestJob.worker.is_not_distinct_from(worker))
+                    .values(heartbeat_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"[INGEST] could not renew the lease on job {job_id}: {e}")
+        if heartbeat is not None:
+            try:
+                await heartbeat()
+            except Exception as e:
+                print(f"[INGEST] could not touch the queue entry of job {job_id}: {e}")
+
+
+# ---------- Pipeline ----------
+_DONE = object()
+
+
+def _take(records: Records, n: int) -> List[ParsedRecord]:
+    return list(itertools.islice(records, n))
+
+
+class _Batcher:
+    """Regroups records from any number of producers into fixed-size batches on a queue."""
+
+    def __init__(self, queue: asyncio.Queue, size: int, progress: IngestProgress):
+        self.queue = queue
+        self.size = size
+        self.progress = progress
+        self._buf: List[ParsedRecord] = []
+
+    async def add(self, records: List[ParsedRecord]) -> None:
+        self._buf.extend(records)
+        while len(self._buf) >= self.size:
+            # slice before awaiting so a concurrent producer never sees a half-cut buffer
+            batch, self._buf = self._buf[:self.size], self._buf[self.size:]
+            with self.progress.timing("parse", "blocked"):
+                await self.queue.put(batch)
+
+    async def flush(self) -> None:
+        if self._buf:
+            batch, self._buf = self._buf, []
+            with self.progress.timing("parse", "blocked"):
+                await self.queue.put(batch)
+
+
+async def _get(in_q: asyncio.Queue, progress: IngestProgress, stage: str):
+    """Next item for one of `stage`'s workers; _DONE is put back so its siblings stop too."""
+    with progress.timing(stage, "starved"):
+        item = await in_q.get()
+    if item is _DONE:
+        in_q.put_nowait(_DONE)  # just taken, so there is room
+    return item
+
+
+def _release_abandoned(records, zf: zipfile.ZipFile, fut: asyncio.Future) -> None:
+    """Done callback for a reader left behind at its deadline: close what it still held."""
+    if not fut.cancelled():
+        fut.exception()  # retrieve it so it isn't logged as never retrieved
+    records.close()
+    zf.close()
+
+
+async def _parse_streamed(zip_path: str, members, batcher: _Batcher, reporter: _ProgressReporter) -> None:
+    """
+    Parse record-format members in-process. Each member gets
+    PARSE_STREAM_TIMEOUT seconds of parsing (time blocked on later stages
+    excluded); past it, what was read so far is kept, as in the pool.
+    """
+    progress = reporter.progress
+    limit = settings.PARSE_STREAM_TIMEOUT
+    loop = asyncio.get_running_loop()
+    zf = None
+    try:
+        for name, _size in members:
+            if zf is None:
+                zf = await run_in_threadpool(zipfile.ZipFile, zip_path, "r")
+            records = iter_member_records(zf, name)
+            pending = None
+            spent = 0.0
+            try:
+                # advance the generator one batch at a time off the event loop
+                while True:
+                    left = limit - spent if limit else None
+                    chunk = None
+                    if left is None or left > 0:
+                        t0 = time.monotonic()
+                        with progress.timing("parse", "busy"):
+                            pending = loop.run_in_executor(None, _take, records, batcher.size)
+                            try:
+                                # shielded: a timeout must not mark the batch done while its thread still reads
+                                chunk = await asyncio.wait_for(asyncio.shield(pending), left)
+                                pending = None
+                            except asyncio.TimeoutError:
+                                pass
+                        spent += time.monotonic() - t0
+                    if chunk is None:
+                        await batcher.add(timed_out(name, limit))
+                        break
+                    if not chunk:
+                        break
+                    await batcher.add(chunk)
+            finally:
+                if pending is not None and not pending.done():
+                    # a thread can't be interrupted: it keeps this handle, released once its
+                    # batch is read, and the next member opens a fresh one
+                    pending.add_done_callback(functools.partial(_release_abandoned, records, zf))
+                    zf = None
+                else:
+                    records.close()
+            progress.advance("parse")
+            await reporter.maybe_flush()
+    finally:
+        if zf is not None:
+            zf.close()
+
+
+async def _parse_pooled(zip_path: str, members, batcher: _Batcher, reporter: _ProgressReporter) -> None:
+    progress = reporter.progress
+    mark = time.monotonic()
+    async for _name, parsed in aparse_members_parallel(
+        zip_path, members, settings.PARSE_WORKERS, settings.PARSE_MEMBER_TIMEOUT
+    ):
+        progress.add_time("parse", "busy", time.monotonic() - mark)
+        await batcher.add(parsed)
+        progress.advance("parse")
+        await reporter.maybe_flush()
+        mark = time.monotonic()
+
+
+async def _parse_stage(zip_path: str, members, out_q: asyncio.Queue, reporter: _ProgressReporter) -> None:
+    streamed, pooled = split_members(members)
+    batcher = _Batcher(out_q, settings.INGEST_EMBED_BATCH, reporter.progress)
+    # streams share one member list; each opens its own ZipFile handle
+    lanes = max(1, min(settings.INGEST_PARSE_STREAMS, len(streamed)))
+    shares = [streamed[i::lanes] for i in range(lanes)]
+    await asyncio.gather(
+        *(_parse_streamed(zip_path, share, batcher, reporter) for share in shares),
+        _parse_pooled(zip_path, pooled, batcher, reporter),
+    )
+    await batcher.flush()
+    reporter.progress.finish("parse")
+    await out_q.put(_DONE)
+
+
+async def _embed_worker(in_q: asyncio.Queue, out_q: asyncio.Queue, progress: IngestProgress) -> None:
+    while True:
+        batch = await _get(in_q, progress, "embed")
+        if batch is _DONE:
+            return
+        with progress.timing("embed", "busy"):
+            texts = [r.text or "" for r in batch]
+            # long texts also get chunk embeddings; they ride in the same model call, after the artifacts
+            spans = [chunk_spans(t) for t in texts]
+            chunk_texts = [texts[i][start:end] for i, sp in enumerate(spans) for start, end in sp]
+            try:
+                vecs = await embedding_utils.agenerate_embeddings(texts + chunk_texts)
+            except Exception:
+                vecs = None
+        progress.advance("embed", len(batch))
+        with progress.timing("embed", "blocked"):
+            await out_q.put((batch, vecs, spans))
+
+
+async def _embed_stage(in_q: asyncio.Queue, out_q: asyncio.Queue, progress: IngestProgress, workers: int = 1) -> None:
+    await asyncio.gather(*(_embed_worker(in_q, out_q, progress) for _ in range(workers)))
+    await out_q.put(_DONE)
+
+
+async def _insert_worker(
+    writer: ArtifactBulkWriter, writers: List[ArtifactBulkWriter],
+    ufdr: UFDRFile, in_q: asyncio.Queue, reporter: _ProgressReporter,
+) -> None:
+    progress = reporter.progress
+    while True:
+        item = await _get(in_q, progress, "insert")
+        if item is _DONE:
+            break
+        batch, vecs, spans = item
+        k = len(batch)  # chunk vectors follow the artifact vectors
+        with progress.timing("insert", "busy"):
+            for i, rec in enumerate(batch):
+                art_id = await writer.write(
+                    ufdr_file_id=ufdr.id,
+                    case_id=ufdr.case_id,
+                    type=rec.type,
+                    text=rec.text,
+                    raw=rec.to_dict(),
+                    embedding=vecs[i] if vecs is not None and rec.text and rec.text.strip() else None,
+                )
+                for j, (start, end) in enumerate(spans[i]):
+                    piece = rec.text[start:end]
+                    writer.add_chunk(
+                        artifact_id=art_id,
+                        ufdr_file_id=ufdr.id,
+                        chunk_index=j,
+                        start=start,
+                        end=end,
+                        text=piece,
+                        embedding=vecs[k] if vecs is not None and piece.strip() else None,
+                    )
+                    k += 1
+        progress.set_done("insert", sum(w.written for w in writers))
+        await reporter.maybe_flush()
+    with progress.timing("insert", "busy"):
+        await writer.flush()
+
+
+async def _insert_stage(sessions, ufdr: UFDRFile, in_q: asyncio.Queue, reporter: _ProgressReporter) -> int:
+    """One writer per session; the caller commits every session once all stages succeed."""
+    writers = [ArtifactBulkWriter(s) for s in sessions]
+    await asyncio.gather(*(_insert_worker(w, writers, ufdr, in_q, reporter) for w in writers))
+    written = sum(w.written for w in writers)
+    reporter.progress.set_done("insert", written)
+    return written
+
+
+async def _upload_stage(store: Callable[[], Awaitable], progress: IngestProgress) -> None:
+    progress.start("upload", total=1)
+    with progress.timing("upload", "busy"):
+        try:
+            await store()
+        except Exception as e:
+            raise RuntimeError(f"Storage upload failed: {e}") from e
+    progress.advance("upload")
+    progress.finish("upload")
+
+
+async def _run_stages(*coros):
+    """Run pipeline stages together; the first failure cancels the rest and is re-raised."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for t in done:
+            t.result()
+        return [t.result() for t in tasks]
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _discard_artifacts(db, ufdr_id) -> None:
+    await db.execute(delete(ArtifactChunk).where(ArtifactChunk.ufdr_file_id == ufdr_id))
+    await db.execute(delete(Artifact).where(Artifact.ufdr_file_id == ufdr_id))
+
+
+async def _ingest(
+    db, ufdr: UFDRFile, zip_path: str, reporter: _ProgressReporter,
+    store: Optional[Callable[[], Awaitable]] = None,
+) -> int:
+    """
+    Parse, embed and insert one ZIP. `store`, if given, is the upload of that
+    ZIP to object storage; it runs alongside the other stages and the
+    artifacts are only committed once it has succeeded too.
+    """
+    progress = reporter.progress
+
+    # A redelivered job may follow a crashed attempt; start from a clean slate.
+    await _discard_artifacts(db, ufdr.id)
+
+    progress.start("extract")
+    await reporter.maybe_flush(force=True)
+    members = await run_in_threadpool(list_zip_members, zip_path)
+    progress.advance("extract", len(members))
+    progress.finish("extract")
+
+    embed_workers = max(1, settings.INGEST_EMBED_CONCURRENCY)
+    # extra insert workers write through their own sessions (one connection each)
+    extra = [db_session.SessionLocal() for _ in range(max(1, settings.INGEST_INSERT_CONCURRENCY) - 1)]
+    progress.start("parse", total=len(members), workers=max(1, settings.INGEST_PARSE_STREAMS) + 1)
+    progress.start("embed", workers=embed_workers)
+    progress.start("insert", workers=1 + len(extra))
+    await reporter.maybe_flush(force=True)
+
+    parsed_q: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+    embedded_q: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_DEPTH)
+    stages = [
+        _parse_stage(zip_path, members, parsed_q, reporter),
+        _embed_stage(parsed_q, embedded_q, progress, embed_workers),
+        _insert_stage([db, *extra], ufdr, embedded_q, reporter),
+    ]
+    if store is not None:
+        stages.append(_upload_stage(store, progress))
+    else:
+        progress.skip("upload")
+    try:
+        count = (await _run_stages(*stages))[2]
+        for s in extra:
+            await s.commit()
+        await db.commit()
+    finally:
+        for s in extra:
+            await s.close()
+
+    progress.finish("embed")
+    progress.finish("insert")
+    return count
+
+
+# ---------- Duplicate uploads ----------
+async def _latest_job(db, ufdr_id) -> Optional[IngestJob]:
+    res = await db.execute(
+        select(IngestJob)
+        .where(IngestJob.ufdr_file_id == ufdr_id)
+        .order_by(IngestJob.created_at.desc())
+        .limit(1)
+    )
+    return res.scalars().first()
+
+
+def _job_status(job: Optional[IngestJob]) -> str:
+    # uploads from before ingest jobs existed were parsed inside the request
+    return job.status if job is not None else "done"
+
+
+async def find_dedup_source(
+    db, file_hash: str, uploader: User, exclude_id=None
+) -> Tuple[Optional[UFDRFile], Optional[str]]:
+    """
+    An earlier live upload of the same ZIP to clone artifacts from, with its
+    ingest status: one that finished ingesting if any, otherwise one whose
+    ingest is still underway. (None, None) if there is nothing to reuse.
+    Only uploads the uploader can already see (admins: all; investigators:
+    their assigned cases) are candidates, so an upload never reveals that the
+    same evidence exists in someone else's case.
+    """
+    stmt = select(UFDRFile).where(UFDRFile.file_hash == file_hash, UFDRFile.is_deleted == False)  # noqa: E712
+    if is_restricted(uploader):
+        stmt = stmt.where(UFDRFile.case_id.in_(assigned_case_ids(uploader)))
+    if exclude_id is not None:
+        stmt = stmt.where(UFDRFile.id != exclude_id)
+    res = await db.execute(stmt.order_by(UFDRFile.uploaded_at).limit(20))
+    in_progress = None
+    for candidate in res.scalars().all():
+        status = _job_status(await _latest_job(db, candidate.id))
+        if status == "done":
+            return candidate, status
+        if status in ("queued", "running") and in_progress is None:
+            in_progress = (candidate, status)
+    return in_progress or (None, None)
+
+
+async def _record_hash(db, ufdr: UFDRFile, file_hash: str, size: int, uploader_id=None):
+    """
+    Store a late-computed hash; returns the id of an ingested upload with the
+    same content that the uploader has access to, if any.
+    """
+    ufdr.file_hash = file_hash
+    ufdr.meta = {**(ufdr.meta or {}), "hash": file_hash, "size": size}
+    await db.commit()
+    uploader = await db.get(User, uploader_id) if uploader_id else None
+    if uploader is None:
+        return None
+    source, status = await find_dedup_source(db, file_hash, uploader, exclude_id=ufdr.id)
+    return source.id if status == "done" else None
+
+
+_CLONE_SQL = text("""
+    WITH src AS (
+        SELECT a.*, gen_random_uuid() AS new_id
+        FROM artifacts a
+        WHERE a.ufdr_file_id = CAST(:source_id AS uuid)
+    ), copied AS (
+        INSERT INTO artifacts (id, ufdr_file_id, case_id, type, extracted_text, raw, created_at, embedding)
+        SELECT new_id, CAST(:ufdr_id AS uuid), CAST(:case_id AS uuid), type, extracted_text, raw,
+               CAST(:now AS timestamp), embedding
+        FROM src
+        RETURNING 1
+    ), chunks AS (
+        INSERT INTO artifact_chunks
+            (id, artifact_id, ufdr_file_id, chunk_index, start_offset, end_offset, text, embedding)
+        SELECT gen_random_uuid(), src.new_id, CAST(:ufdr_id AS uuid),
+               c.chunk_index, c.start_offset, c.end_offset, c.text, c.embedding
+        FROM artifact_chunks c
+        JOIN src ON c.artifact_id = src.id
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM copied), (SELECT count(*) FROM chunks)
+""")
+
+
+async def clone_artifacts(db, source_id, ufdr: UFDRFile) -> int:
+    """
+    Copy another UFDR's artifacts and their chunks (embeddings included) in
+    one statement; chunk rows are re-pointed at the new artifact ids.
+    """
+    res = await db.execute(
+        _CLONE_SQL,
+        {"source_id": source_id, "ufdr_id": ufdr.id, "case_id": ufdr.case_id, "now": datetime.utcnow()},
+    )
+    artifacts, _chunks = res.one()
+    return artifacts
+
+
+async def _clone_duplicate(
+    db, ufdr: UFDRFile, source_id, reporter: _ProgressReporter, wait: Optional[float] = None,
+) -> Optional[int]:
+    """
+    Wait up to `wait` seconds (default INGEST_CLONE_WAIT) for the source
+    upload's ingest, then clone it. Returns None when the source failed,
+    vanished or took too long: the caller ingests the (shared) ZIP itself instead.
+    """
+    source_id = uuid.UUID(str(source_id))
+    deadline = time.monotonic() + (settings.INGEST_CLONE_WAIT if wait is None else wait)
+    while True:
+        # fresh session per poll so the source job's status isn't served from the identity map
+        async with db_session.SessionLocal() as poll:
+            source = await poll.get(UFDRFile, source_id)
+            status = _job_status(await _latest_job(poll, source_id)) if source is not None else None
+        if source is None or source.is_deleted or status == "failed":
+            return None
+        if status == "done":
+            break
+        if time.monotonic() > deadline:
+            return None
+        await reporter.maybe_flush(force=True)
+        await asyncio.sleep(settings.INGEST_CLONE_POLL)
+
+    progress = reporter.progress
+    for stage in ("extract", "parse", "embed", "upload"):
+        progress.skip(stage)
+    progress.start("insert")
+    await _discard_artifacts(db, ufdr.id)
+    count = await clone_artifacts(db, source_id, ufdr)
+    await db.commit()
+    progress.set_done("insert", count)
+    progress.finish("insert")
+    return count
+
+
+async def run_ingest_job(
+    job_id,
+    local_path: Optional[str] = None,
+    worker: Optional[str] = None,
+    heartbeat: Optional[Callable[[], Awaitable]] = None,
+    store: Optional[Callable[[], Awaitable]] = None,
+    clone_wait: Optional[float] = None,
+) -> Optional[IngestJob]:
+    """
+    Execute one ingest job end to end and return the final job row.
+    `local_path` skips the MinIO download when the caller still has the ZIP;
+    `store` then uploads it to MinIO while it is being ingested.
+    Duplicate uploads (meta["deduplicated_from"]) clone their source's
+    artifacts instead of parsing and embedding the same ZIP again, waiting
+    up to `clone_wait` seconds (default INGEST_CLONE_WAIT) for the source
+    to finish ingesting.
+    Failures are recorded on the job (status="failed") rather than raised.
+    The job is leased to `worker` for the whole run and the lease (plus the
+    queue entry, via `heartbeat`) is renewed every INGEST_HEARTBEAT_INTERVAL;
+    a job another live worker holds is returned untouched, still "running".
+    """
+    job_id = uuid.UUID(str(job_id))
+    async with db_session.SessionLocal() as db:
+        job = await db.get(IngestJob, job_id)
+        if job is None or job.status == "done":
+            return job
+        ufdr = await db.get(UFDRFile, job.ufdr_file_id)
+        if ufdr is None:
+            job.status = "failed"
+            job.error = "UFDR file no longer exists"
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            return job
+
+        if not await _claim_job(db, job_id, worker):
+            await db.refresh(job)
+            return job
+        await db.refresh(job)
+
+        ufdr_id = ufdr.id
+        progress = IngestProgress()
+        reporter = _ProgressReporter(job_id, progress)
+        keep_alive = asyncio.ensure_future(_keep_alive(job_id, worker, heartbeat))
+        tmp_dir = None
+        source_id = (ufdr.meta or {}).get("deduplicated_from")
+        try:
+            count = None
+            if source_id:
+                count = await _clone_duplicate(db, ufdr, source_id, reporter, clone_wait)
+                if count is None:
+                    progress = reporter.progress = IngestProgress()
+                    source_id = None
+
+            if count is None and local_path is None:
+                tmp_dir = tempfile.mkdtemp(prefix="ingest_")
+                local_path = os.path.join(tmp_dir, os.path.basename(ufdr.storage_path) or "ufdr.zip")
+                size, digest = await run_in_threadpool(download_from_minio, ufdr.storage_path, local_path)
+                if not ufdr.file_hash:
+                    # resumable uploads are first hashed here, as the object streams down
+                    source_id = await _record_hash(db, ufdr, digest, size, job.created_by)
+                    if source_id:
+                        count = await _clone_duplicate(db, ufdr, source_id, reporter)
+                        if count is None:
+                            progress = reporter.progress = IngestProgress()
+                            source_id = None
+
+            if count is None:
+                count = await _ingest(db, ufdr, local_path, reporter, store=store)
+
+            # progress writes went through another session; reload before the final update
+            await db.refresh(job)
+            job.status = "done"
+            job.stage = None
+            job.progress = {**progress.snapshot(), "artifacts": count, "bottleneck": progress.bottleneck()}
+            if source_id:
+                job.progress["deduplicated_from"] = str(source_id)
+        except Exception as e:
+            print("INGEST ERROR:", traceback.format_exc())
+            await db.rollback()
+            try:
+                # extra insert sessions may have committed their batches before the failure
+                await _discard_artifacts(db, ufdr_id)
+            except Exception as cleanup:
+                print(f"[INGEST] could not remove partial artifacts of {ufdr_id}: {cleanup}")
+                await db.rollback()
+            job = await db.get(IngestJob, job_id)
+            job.status = "failed"
+            job.stage = progress.current()
+            job.progress = progress.snapshot()
+            job.error = str(e)
+        finally:
+            keep_alive.cancel()
+            await asyncio.gather(keep_alive, return_exceptions=True)
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        job.finished_at = datetime.utcnow()
+        await db.commit()
+        if job.status == "done":
+            # searches and answers cached while the UFDR was still empty or half-ingested
+            try:
+                await del_pattern(f"llm:{ufdr_id}:*")
+                await del_pattern(f"search:{ufdr_id}:*")
+                await vector_index.bump_version(ufdr_id)
+            except Exception:
+                pass
+        return job
@@ -0,0 +1,354 @@
+# app/utils/parse_pool.py
+"""
+Process-pool fan-out for parsing UFDR archive members.
+
+PDF/DOCX text extraction, PIL and mutagen are CPU-bound and hold the GIL,
+so members are parsed in separate processes. Workers are handed
+(zip_path, member_name) and read the member straight out of the archive;
+nothing is extracted to disk except formats whose libraries need a real
+seekable file (SPILL_EXTS). Line-oriented record formats (STREAM_EXTS)
+are cheap per byte and can produce millions of records, so they are not
+sent to the pool at all: callers iterate them in-process with
+iter_member_records and never hold a whole member's output at once.
+This module deliberately imports only the
+parsers: pool children are spawned and re-import it, and must not drag in
+the embedding model or the database layer.
+"""
+import asyncio
+import functools
+import os
+import shutil
+import signal
+import tempfile
+import zipfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.utils.file_utils import iter_safe_members
+from app.utils.parsers import (
+    ParsedRecord, Records, Source, parse_csv, parse_xml, parse_image, parse_audio,
+    parse_document, parse_text, parse_video
+)
+
+SUPPORTED_EXTS = (
+    ".csv", ".xml", ".jpg", ".png", ".mp3", ".wav",
+    ".pdf", ".doc", ".docx", ".txt", ".mp4", ".mkv"
+)
+
+STREAM_EXTS = (".csv", ".xml", ".txt")
+
+# PyPDF2 jumps between the trailer and the xref table, and a DOCX is itself a
+# ZIP read from its end; over a deflated ZipExtFile every backwards seek
+# re-decompresses from the start.
+SPILL_EXTS = (".pdf", ".docx")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size: Optional[int] = None
+
+# Per-process handle on the archive being parsed, so a worker reads the
+# central directory once per archive rather than once per member.
+_open_zip: Optional[Tuple[Tuple, zipfile.ZipFile]] = None
+
+
+class MemberTimeout(BaseException):
+    # BaseException so the parsers' own `except Exception` blocks can't swallow it.
+    pass
+
+
+def parse_member(source: Source, name: Optional[str] = None) -> Records:
+    """Dispatch one file (path or binary stream) to its parser by extension."""
+    lower = (name or source).lower()
+    if lower.endswith(".csv"):
+        return parse_csv(source, name)
+    if lower.endswith(".xml"):
+        return parse_xml(source, name)
+    if lower.endswith((".jpg", ".png")):
+        return parse_image(source, name)
+    if lower.endswith((".mp3", ".wav")):
+        return parse_audio(source, name)
+    if lower.endswith((".pdf", ".doc", ".docx")):
+        return parse_document(source, name)
+    if lower.endswith(".txt"):
+        return parse_text(source, name)
+    if lower.endswith((".mp4", ".mkv")):
+        return parse_video(source, name)
+    return iter(())
+
+
+def _failed(fpath: str, reason: str) -> List[ParsedRecord]:
+    return [ParsedRecord("parse_error", f"{reason}: {os.path.basename(fpath)}")]
+
+
+def timed_out(name: str, timeout: float) -> List[ParsedRecord]:
+    """The parse_error record for a member that ran out of parsing time."""
+    return _failed(name, f"Parsing timed out after {timeout:g}s")
+
+
+def _raise_timeout(signum, frame):
+    raise MemberTimeout()
+
+
+def parse_member_limited(
+    source: Source, timeout: Optional[float] = None, name: Optional[str] = None
+) -> List[ParsedRecord]:
+    """
+    parse_member, materialized, with a wall-clock limit, for use inside pool
+    workers. Records produced before the limit (e.g. the pages of a PDF read
+    so far) are kept. The limit relies on SIGALRM and is not enforced on Windows.
+    """
+    if not timeout or not hasattr(signal, "SIGALRM"):
+        return list(parse_member(source, name))
+
+    out: List[ParsedRecord] = []
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        out.extend(parse_member(source, name))
+        return out
+    except MemberTimeout:
+        return out + timed_out(name or source, timeout)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# ---------- Archive members ----------
+def list_zip_members(zip_path: str) -> List[Tuple[str, int]]:
+    """(member name, uncompressed size) for every safe, supported member."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        return [
+            (info.filename, info.file_size)
+            for info, normalized in iter_safe_members(zf)
+            if normalized.lower().endswith(SUPPORTED_EXTS)
+        ]
+
+
+def split_members(
+    members: Sequence[Tuple[str, int]]
+) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """(members to stream in-process, members to send to the pool)."""
+    streamed, pooled = [], []
+    for m in members:
+        (streamed if m[0].lower().endswith(STREAM_EXTS) else pooled).append(m)
+    return streamed, pooled
+
+
+def iter_member_records(zf: zipfile.ZipFile, member_name: str) -> Records:
+    """Lazily parse one member of an open archive in the calling process."""
+    try:
+        with zf.open(member_name) as stream:
+            yield from parse_member(stream, member_name)
+    except Exception as e:
+        yield from _failed(member_name, f"Parser error ({e})")
+
+
+def _get_zip(zip_path: str) -> zipfile.ZipFile:
+    global _open_zip
+    st = os.stat(zip_path)
+    key = (zip_path, st.st_mtime_ns, st.st_size)
+    if _open_zip is None or _open_zip[0] != key:
+        if _open_zip is not None:
+            _open_zip[1].close()
+        _open_zip = (key, zipfile.ZipFile(zip_path, "r"))
+    return _open_zip[1]
+
+
+def parse_zip_member(
+    zip_path: str, member_name: str, timeout: Optional[float] = None
+) -> List[ParsedRecord]:
+    """Parse one archive member in place; only SPILL_EXTS touch the disk."""
+    zf = _get_zip(zip_path)
+    info = zf.getinfo(member_name)
+    ext = os.path.splitext(member_name.lower())[1]
+
+    if ext not in SPILL_EXTS:
+        with zf.open(info) as stream:
+            return parse_member_limited(stream, timeout, name=member_name)
+
+    fd, tmp_path = tempfile.mkstemp(prefix="ufdr_member_", suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as out_f, zf.open(info) as stream:
+            shutil.copyfileobj(stream, out_f, 1024 * 1024)
+        return parse_member_limited(tmp_path, timeout, name=member_name)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def get_parse_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared pool; recreated if the requested size changes or a worker died."""
+    global _pool, _pool_size
+    size = max_workers or os.cpu_count() or 1
+    if _pool is None or _pool_size != size:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+        _pool_size = size
+    return _pool
+
+
+def _reset_pool() -> None:
+    """Drop the shared pool if a worker died; a healthy one (other jobs' futures) is left alone."""
+    global _pool
+    # the executor marks itself broken before failing any of its futures
+    if _pool is not None and getattr(_pool, "_broken", False):
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _largest_first(members: Sequence[Tuple[str, int]]) -> List[str]:
+    # One huge member started last would be the straggler; start it first.
+    return [name for name, _size in sorted(members, key=lambda m: m[1], reverse=True)]
+
+
+# ---------- Scheduling ----------
+# A worker that dies (segfault in a native parser, OOM kill) breaks the whole
+# pool, and every unfinished future fails with BrokenProcessPool although
+# only one member was to blame. Those members become suspects: the pool is
+# replaced and each suspect is re-run on its own, with nothing else in
+# flight, so a crash during that run is its own. A member is recorded as
+# crashed once it has been in MAX_MEMBER_CRASHES crashes; the rest are
+# parsed normally.
+MAX_MEMBER_CRASHES = 3
+
+
+class _Schedule:
+    """Which members to submit next, and what a finished future means."""
+
+    def __init__(self, members: Sequence[Tuple[str, int]], window: int):
+        self.queue = deque(_largest_first(members))
+        self.window = window
+        self.suspects: deque = deque()
+        self.crashes: Dict[str, int] = {}
+        self.alone: Optional[str] = None  # suspect being re-run by itself
+
+    def take(self, in_flight: int) -> List[str]:
+        if self.suspects or self.alone is not None:
+            if in_flight == 0 and self.alone is None:
+                self.alone = self.suspects.popleft()
+                return [self.alone]
+            return []
+        names = []
+        while in_flight + len(names) < self.window and self.queue:
+            names.append(self.queue.popleft())
+        return names
+
+    def crashed(self, name: str) -> Optional[List[ParsedRecord]]:
+        """The member was caught in a pool crash: records if it is now to blame, else None (re-queued)."""
+        _reset_pool()
+        alone = self.alone == name
+        if alone:
+            self.alone = None
+        self.crashes[name] = self.crashes.get(name, 0) + 1
+        if alone and self.crashes[name] >= MAX_MEMBER_CRASHES:
+            return _failed(name, "Parser process crashed")
+        self.suspects.append(name)
+        return None
+
+    def finished(self, fut, name: str) -> Optional[List[ParsedRecord]]:
+        """Records for a completed future, or None if the member was re-queued."""
+        try:
+            records = fut.result()
+        except BrokenProcessPool:
+            return self.crashed(name)
+        except Exception as e:
+            records = _failed(name, f"Parser error ({e})")
+        if self.alone == name:
+            self.alone = None
+        return records
+
+
+def _submit(submit: Callable, max_workers: Optional[int]):
+    """submit(pool) on the current pool, replacing it once if it turns out to be broken."""
+    try:
+        return submit(get_parse_pool(max_workers))
+    except BrokenProcessPool:
+        _reset_pool()
+        return submit(get_parse_pool(max_workers))
+
+
+def _submit_member(pool: ProcessPoolExecutor, zip_path: str, name: str, timeout: Optional[float]) -> Future:
+    return pool.submit(parse_zip_member, zip_path, name, timeout)
+
+
+def parse_members_parallel(
+    zip_path: str,
+    members: Sequence[Tuple[str, int]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[Tuple[str, List[ParsedRecord]]]:
+    """
+    Parse archive members (as returned by list_zip_members) in the pool,
+    yielding (member name, artifacts) as each finishes.
+    """
+    get_parse_pool(max_workers)
+    schedule = _Schedule(members, window=4 * (_pool_size or 1))
+    pending: Dict[Future, str] = {}
+    while True:
+        for name in schedule.take(len(pending)):
+            submit = functools.partial(_submit_member, zip_path=zip_path, name=name, timeout=timeout)
+            try:
+                pending[_submit(submit, max_workers)] = name
+            except BrokenProcessPool:
+                records = schedule.crashed(name)
+                if records is not None:
+                    yield name, records
+        if not pending:
+            if schedule.queue or schedule.suspects:
+                continue
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            name = pending.pop(fut)
+            records = schedule.finished(fut, name)
+            if records is not None:
+                yield name, records
+
+
+async def aparse_members_parallel(
+    zip_path: str,
+    members: Sequence[Tuple[str, int]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, List[ParsedRecord]]]:
+    """
+    Event-loop friendly parse_members_parallel. Only a few tasks per worker
+    are in flight at once, so finished results never pile up behind a slow
+    consumer.
+    """
+    loop = asyncio.get_running_loop()
+    get_parse_pool(max_workers)
+    schedule = _Schedule(members, window=4 * (_pool_size or 1))
+    pending: Dict[asyncio.Future, str] = {}
+
+    def submit(pool: ProcessPoolExecutor, name: str) -> asyncio.Future:
+        return loop.run_in_executor(pool, parse_zip_member, zip_path, name, timeout)
+
+    try:
+        while True:
+            for name in schedule.take(len(pending)):
+                try:
+                    # the current pool each time: a crash replaces it
+                    pending[_submit(functools.partial(submit, name=name), max_workers)] = name
+                except BrokenProcessPool:
+                    records = schedule.crashed(name)
+                    if records is not None:
+                        yield name, records
+            if not pending:
+                if schedule.queue or schedule.suspects:
+                    continue
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                records = schedule.finished(fut, name)
+                if records is not None:
+                    yield name, records
+    finally:
+        for fut in pending:
+            fut.cancel()
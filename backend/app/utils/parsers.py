@@ -1,8 +1,10 @@
+import io
 import os
 import csv
+import time
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import List, Dict
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Union
 
 import types, sys
 if "pyaudioop" not in sys.modules:
@@ -20,10 +22,72 @@ import wave
 import contextlib
 from mutagen import File as MutagenFile
 
+from app.core.config import settings
+
+# Parsers take either a filesystem path or a binary file-like object (e.g. a
+# zipfile.ZipFile.open() stream), so archive members can be read in place.
+Source = Union[str, BinaryIO]
+
+
+def _display_name(source: Source, name: Optional[str] = None) -> str:
+    if name:
+        return os.path.basename(name)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    return os.path.basename(getattr(source, "name", "") or "")
+
+
+@contextlib.contextmanager
+def _open_text(source: Source, newline: Optional[str] = None):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", newline=newline, encoding="utf-8", errors="ignore") as f:
+            yield f
+    else:
+        wrapper = io.TextIOWrapper(source, encoding="utf-8", errors="ignore", newline=newline)
+        try:
+            yield wrapper
+        finally:
+            wrapper.detach()  # leave closing the underlying stream to the caller
+
+
+# ---------- RECORD ----------
+class ParsedRecord:
+    """
+    One parsed artifact. Slotted rather than a dict because a large UFDR
+    yields millions of these; `get` keeps dict-style call sites working.
+    """
+    __slots__ = ("type", "text", "raw")
+
+    def __init__(self, type: str, text: Optional[str], raw: Optional[Dict[str, Any]] = None):
+        self.type = type
+        self.text = text
+        self.raw = raw
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {"type": self.type, "text": self.text}
+        if self.raw is not None:
+            out["raw"] = self.raw
+        return out
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedRecord):
+            return NotImplemented
+        return (self.type, self.text, self.raw) == (other.type, other.text, other.raw)
+
+    def __repr__(self):
+        return f"ParsedRecord(type={self.type!r}, text={self.text!r})"
+
+
+Records = Iterator[ParsedRecord]
+
+
 # ---------- CSV PARSER ----------
-def parse_csv(file_path: str):
-    artifacts = []
-    with open(file_path, newline='', encoding="utf-8", errors="ignore") as csvfile:
+def parse_csv(file_path: Source, name: Optional[str] = None) -> Records:
+    with _open_text(file_path, newline='') as csvfile:
         reader = csv.DictReader(csvfile)
         for row in reader:
             if not row:
@@ -42,91 +106,186 @@ def parse_csv(file_path: str):
             if not keys:
                 continue
 
-            artifacts.append({
-                "type": "csv_record",
-                "text": " ".join(f"{k}: {v}" for k, v in keys.items() if v),
-                "raw": keys,
-            })
+            yield ParsedRecord(
+                "csv_record",
+                " ".join(f"{k}: {v}" for k, v in keys.items() if v),
+                keys,
+            )
 
-    return artifacts
 
+# ---------- XML PARSER ----------
+# Generic exports use <contact>/<sms>/<message>/<call>; Cellebrite report.xml
+# uses namespaced <model type="..."> elements made of <field name=...><value>.
+_XML_RECORD_TAGS = {"contact", "sms", "message", "call", "model"}
+_CELLEBRITE_MODELS = {"Contact", "SMS", "InstantMessage", "Call"}
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _model_fields(model) -> Dict[str, str]:
+    """{field name: value} for a Cellebrite model's own field/multiField children."""
+    fields = {}
+    for child in model:
+        if _local(child.tag) not in ("field", "multiField"):
+            continue
+        values = [(v.text or "").strip() for v in child if _local(v.tag) == "value"]
+        values = [v for v in values if v]
+        if values:
+            fields[child.get("name", "")] = ", ".join(values)
+    return fields
+
+
+def _nested_models(model, field_name: Optional[str] = None) -> list:
+    nested = []
+    for child in model:
+        if _local(child.tag) in ("modelField", "multiModelField") and field_name in (None, child.get("name")):
+            nested.extend(m for m in child if _local(m.tag) == "model")
+    return nested
+
+
+def _party(model, field_name: str, role: Optional[str] = None) -> Optional[str]:
+    for party in _nested_models(model, field_name):
+        fields = _model_fields(party)
+        if role and fields.get("Role") and fields["Role"] != role:
+            continue
+        ident = fields.get("Identifier") or fields.get("Name")
+        if ident:
+            return ident
+    return None
+
+
+def _fmt_duration(duration: Optional[str]) -> str:
+    if not duration:
+        return "?s"
+    return duration if ":" in duration else f"{duration}s"
+
+
+def _cellebrite_record(model) -> Optional[ParsedRecord]:
+    mtype = model.get("type")
+    fields = _model_fields(model)
+    raw = {"model": mtype, **fields}
+
+    if mtype == "Contact":
+        numbers = [
+            _model_fields(e).get("Value")
+            for e in _nested_models(model, "Entries")
+            if e.get("type") == "PhoneNumber"
+        ]
+        numbers = ", ".join(n for n in numbers if n)
+        contact = fields.get("Name")
+        if contact or numbers:
+            return ParsedRecord("contact", f"{contact or ''} - {numbers}".strip(" -"), raw)
+
+    elif mtype == "SMS":
+        body = fields.get("Body")
+        if body:
+            sender = _party(model, "Parties", role="From") or _party(model, "From")
+            return ParsedRecord("message", f"SMS from {sender}: {body}", raw)
 
+    elif mtype == "InstantMessage":
+        body = fields.get("Body")
+        if body:
+            sender = _party(model, "From") or _party(model, "Participants")
+            app = fields.get("SourceApplication") or fields.get("Source") or "Chat"
+            rtype = "whatsapp" if "whatsapp" in app.lower() else "chat"
+            return ParsedRecord(rtype, f"{app} from {sender}: {body}", raw)
+
+    elif mtype == "Call":
+        number = _party(model, "Parties") or fields.get("Number")
+        if number:
+            direction = "from" if fields.get("Direction", fields.get("Type", "")).lower() == "incoming" else "to"
+            return ParsedRecord("call", f"Call {direction} {number}, duration {_fmt_duration(fields.get('Duration'))}", raw)
+
+    return None
 
-# ---------- XML PARSER ----------
-def parse_xml(file_path: str) -> List[Dict]:
-    artifacts = []
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-    except ET.ParseError:
-        return artifacts
 
-    # Generic contact/message extraction
-    for elem in root.findall(".//contact"):
-        name = elem.attrib.get("name") or elem.findtext("name")
+def _generic_record(tag: str, elem) -> Optional[ParsedRecord]:
+    if tag == "contact":
+        contact = elem.attrib.get("name") or elem.findtext("name")
         number = elem.attrib.get("number") or elem.findtext("number")
-        if name or number:
-            artifacts.append({
-                "type": "contact",
-                "text": f"{name or ''} - {number or ''}".strip(" -"),
-            })
-
-    for sms in root.findall(".//sms"):
-        sender = sms.attrib.get("address") or sms.findtext("address")
-        body = sms.attrib.get("body") or sms.findtext("body")
+        if contact or number:
+            return ParsedRecord("contact", f"{contact or ''} - {number or ''}".strip(" -"))
+    elif tag == "sms":
+        sender = elem.attrib.get("address") or elem.findtext("address")
+        body = elem.attrib.get("body") or elem.findtext("body")
         if body:
-            artifacts.append({
-                "type": "message",
-                "text": f"SMS from {sender}: {body}",
-            })
-
-    for msg in root.findall(".//message"):
-        sender = msg.attrib.get("sender") or msg.findtext("sender")
-        body = msg.attrib.get("body") or msg.findtext("body")
+            return ParsedRecord("message", f"SMS from {sender}: {body}")
+    elif tag == "message":
+        sender = elem.attrib.get("sender") or elem.findtext("sender")
+        body = elem.attrib.get("body") or elem.findtext("body")
         if body:
-            artifacts.append({
-                "type": "whatsapp",
-                "text": f"WhatsApp from {sender}: {body}",
-            })
-
-    for call in root.findall(".//call"):
-        number = call.attrib.get("number") or call.findtext("number")
-        duration = call.attrib.get("duration") or call.findtext("duration")
+            return ParsedRecord("whatsapp", f"WhatsApp from {sender}: {body}")
+    elif tag == "call":
+        number = elem.attrib.get("number") or elem.findtext("number")
+        duration = elem.attrib.get("duration") or elem.findtext("duration")
         if number:
-            artifacts.append({
-                "type": "call",
-                "text": f"Call to {number}, duration {duration or '?'}s",
-            })
+            return ParsedRecord("call", f"Call to {number}, duration {duration or '?'}s")
+    return None
+
+
+def parse_xml(file_path: Source, name: Optional[str] = None) -> Records:
+    """
+    Single streaming pass over the document. Elements are detached from
+    the tree as soon as nothing still needs them, so memory stays flat for
+    multi-GB report.xml files. A malformed document stops the stream; the
+    records already yielded are kept.
+    """
+    stack = []       # open elements, to detach finished ones from their parent
+    record_depth = 0  # open record elements whose subtree must stay intact
+    try:
+        for event, elem in ET.iterparse(file_path, events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                stack.append(elem)
+                if tag in _XML_RECORD_TAGS:
+                    record_depth += 1
+                continue
 
-    return artifacts
+            stack.pop()
+            drop = record_depth == 0
+            if tag in _XML_RECORD_TAGS:
+                record_depth -= 1
+                if tag == "model":
+                    # nested helper models (PhoneNumber, Party) stay for their parent
+                    record = _cellebrite_record(elem) if elem.get("type") in _CELLEBRITE_MODELS else None
+                    drop = record is not None or record_depth == 0
+                else:
+                    record = _generic_record(tag, elem)
+                    drop = True
+                if record is not None:
+                    yield record
+
+            if drop:
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+    except ET.ParseError:
+        return
 
 
 # ---------- IMAGE PARSER ----------
-def parse_image(file_path: str) -> List[Dict]:
-    artifacts = []
+def parse_image(file_path: Source, name: Optional[str] = None) -> Records:
+    basename = _display_name(file_path, name)
     try:
+        # Image.open only reads the header; pixel data is never decoded here.
         img = Image.open(file_path)
         width, height = img.size
-        artifacts.append({
-            "type": "image",
-            "text": f"Image file {os.path.basename(file_path)} ({width}x{height}px)",
-        })
+        record = ParsedRecord("image", f"Image file {basename} ({width}x{height}px)")
     except Exception:
-        artifacts.append({
-            "type": "image",
-            "text": f"Unreadable image: {os.path.basename(file_path)}",
-        })
-    return artifacts
+        record = ParsedRecord("image", f"Unreadable image: {basename}")
+    yield record
 
 
 # ---------- AUDIO PARSER ----------
-def parse_audio(file_path: str):
+def parse_audio(file_path: Source, name: Optional[str] = None) -> Records:
     """
     Parses audio metadata safely without using deprecated audioop.
     Supports .wav and .mp3 using mutagen and wave modules.
     """
-    artifacts = []
-    ext = os.path.splitext(file_path.lower())[1]
+    basename = _display_name(file_path, name)
+    ext = os.path.splitext(basename.lower())[1]
 
     try:
         # --- WAV metadata ---
@@ -136,11 +295,11 @@ def parse_audio(file_path: str):
                 channels = wf.getnchannels()
                 sample_rate = wf.getframerate()
 
-            artifacts.append({
-                "type": "audio",
-                "text": f"WAV file '{os.path.basename(file_path)}' - {duration:.2f}s, "
-                        f"{channels} channel(s), {sample_rate}Hz."
-            })
+            record = ParsedRecord(
+                "audio",
+                f"WAV file '{basename}' - {duration:.2f}s, "
+                f"{channels} channel(s), {sample_rate}Hz."
+            )
 
         # --- MP3 / others (mutagen handles metadata) ---
         else:
@@ -150,83 +309,170 @@ def parse_audio(file_path: str):
                 duration = getattr(info, "length", None)
                 bitrate = getattr(info, "bitrate", None)
 
-                artifacts.append({
-                    "type": "audio",
-                    "text": f"Audio file '{os.path.basename(file_path)}' - "
-                            f"Duration: {duration:.2f}s, Bitrate: {bitrate or 'unknown'}."
-                })
+                record = ParsedRecord(
+                    "audio",
+                    f"Audio file '{basename}' - "
+                    f"Duration: {duration:.2f}s, Bitrate: {bitrate or 'unknown'}."
+                )
             else:
-                artifacts.append({
-                    "type": "audio",
-                    "text": f"Audio file '{os.path.basename(file_path)}' - metadata unavailable."
-                })
+                record = ParsedRecord("audio", f"Audio file '{basename}' - metadata unavailable.")
 
     except Exception as e:
-        artifacts.append({
-            "type": "audio",
-            "text": f"Error parsing audio file '{os.path.basename(file_path)}': {str(e)}"
-        })
+        record = ParsedRecord("audio", f"Error parsing audio file '{basename}': {str(e)}")
 
-    return artifacts
+    yield record
 
 
 # ---------- DOCUMENT PARSER ----------
-def parse_document(file_path: str) -> List[Dict]:
-    artifacts = []
-    basename = os.path.basename(file_path)
+# Full-text mode yields one artifact per PDF page, or per DOC_WINDOW_CHARS
+# window of DOCX/TXT text, as it is read: only the current page and window
+# are held in memory. DOC_MAX_PAGES and DOC_TIME_LIMIT cap each document;
+# hitting either keeps what was read and adds a record saying where it stopped.
+def _windows(pieces: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    """Re-cut a stream of text pieces into `size`-character windows that overlap by `overlap`."""
+    overlap = min(overlap, size - 1)
+    buf, carried = "", 0
+    for piece in pieces:
+        buf += piece
+        while len(buf) >= size:
+            yield buf[:size]
+            buf = buf[size - overlap:]
+            carried = overlap
+    if len(buf) > carried and buf.strip():
+        yield buf
+
+
+class _DocLimits:
+    """Page/window and wall-clock budget for one document."""
+
+    def __init__(self):
+        self.max_pages = settings.DOC_MAX_PAGES
+        self.deadline = time.monotonic() + settings.DOC_TIME_LIMIT
+        self.reason: Optional[str] = None
+
+    def exhausted(self, used: int) -> bool:
+        if used >= self.max_pages:
+            self.reason = f"page limit ({self.max_pages})"
+        elif time.monotonic() > self.deadline:
+            self.reason = f"time limit ({settings.DOC_TIME_LIMIT:g}s)"
+        return self.reason is not None
+
+    def notice(
+        self, type: str, kind: str, basename: str, used: int, total: Optional[int] = None, unit: str = "pages"
+    ) -> ParsedRecord:
+        of = f" of {total}" if total is not None else ""
+        return ParsedRecord(
+            type,
+            f"{kind} {basename}: extraction stopped after {used}{of} {unit} at the {self.reason}",
+            {"file": basename, "truncated": self.reason, "read": used, "total": total},
+        )
+
+
+def _pdf_pages(file_path: Source, basename: str) -> Records:
+    reader = PyPDF2.PdfReader(file_path)
+    total = len(reader.pages)
+    limits = _DocLimits()
+    n = 0
+    while n < total and not limits.exhausted(n):
+        try:
+            text = reader.pages[n].extract_text() or ""
+        except Exception:
+            text = ""  # one bad page shouldn't cost the rest of the document
+        n += 1
+        for window in _windows([text], settings.DOC_WINDOW_CHARS, settings.DOC_WINDOW_OVERLAP):
+            yield ParsedRecord(
+                "document", f"PDF {basename} p.{n}: {window}", {"file": basename, "page": n, "pages": total}
+            )
+    if limits.reason:
+        yield limits.notice("document", "PDF", basename, n, total)
+
+
+def _docx_windows(file_path: Source, basename: str) -> Records:
+    doc = docx.Document(file_path)
+    limits = _DocLimits()
+    n = 0
+    paragraphs = (p.text + "\n" for p in doc.paragraphs)
+    for window in _windows(paragraphs, settings.DOC_WINDOW_CHARS, settings.DOC_WINDOW_OVERLAP):
+        if limits.exhausted(n):
+            yield limits.notice("document", "DOCX", basename, n, unit="windows")
+            return
+        n += 1
+        yield ParsedRecord("document", f"DOCX {basename}: {window}", {"file": basename, "chunk": n})
+
+
+def _document_preview(file_path: Source, basename: str) -> Optional[ParsedRecord]:
+    lower = basename.lower()
+    if lower.endswith(".pdf"):
+        reader = PyPDF2.PdfReader(file_path)
+        text = ""
+        for page in reader.pages[:2]:  # limit to first 2 pages
+            text += page.extract_text() or ""
+        return ParsedRecord("document", f"PDF {basename}: {text[:500]}")
+    if lower.endswith(".docx"):
+        doc = docx.Document(file_path)
+        text = "\n".join([p.text for p in doc.paragraphs])
+        return ParsedRecord("document", f"DOCX {basename}: {text[:500]}")
+    return None
+
+
+def parse_document(file_path: Source, name: Optional[str] = None) -> Records:
+    basename = _display_name(file_path, name)
+    lower = basename.lower()
+    if lower.endswith(".doc"):
+        yield ParsedRecord("document", f"DOC file {basename} (binary format not parsed)")
+        return
+    if settings.DOC_FULL_TEXT and lower.endswith((".pdf", ".docx")):
+        pages = _pdf_pages if lower.endswith(".pdf") else _docx_windows
+        try:
+            yield from pages(file_path, basename)
+        except Exception:
+            yield ParsedRecord("document", f"Unreadable document: {basename}")
+        return
+
+    record = None
     try:
-        if file_path.lower().endswith(".pdf"):
-            reader = PyPDF2.PdfReader(file_path)
-            text = ""
-            for page in reader.pages[:2]:  # limit to first 2 pages
-                text += page.extract_text() or ""
-            artifacts.append({
-                "type": "document",
-                "text": f"PDF {basename}: {text[:500]}",
-            })
-        elif file_path.lower().endswith(".doc"):
-            artifacts.append({
-                "type": "document",
-                "text": f"DOC file {basename} (binary format not parsed)",
-            })
-        elif file_path.lower().endswith(".docx"):
-            doc = docx.Document(file_path)
-            text = "\n".join([p.text for p in doc.paragraphs])
-            artifacts.append({
-                "type": "document",
-                "text": f"DOCX {basename}: {text[:500]}",
-            })
+        record = _document_preview(file_path, basename)
     except Exception:
-        artifacts.append({
-            "type": "document",
-            "text": f"Unreadable document: {basename}",
-        })
-    return artifacts
+        record = ParsedRecord("document", f"Unreadable document: {basename}")
+    if record is not None:
+        yield record
 
 
 # ---------- TEXT PARSER ----------
-def parse_text(file_path: str) -> List[Dict]:
-    artifacts = []
+def parse_text(file_path: Source, name: Optional[str] = None) -> Records:
+    basename = _display_name(file_path, name)
+    if not settings.DOC_FULL_TEXT:
+        try:
+            with _open_text(file_path) as f:
+                content = f.read(500)
+            record = ParsedRecord("text", f"Text file {basename}: {content}")
+        except Exception:
+            record = ParsedRecord("text", f"Unreadable text file: {basename}")
+        yield record
+        return
+
+    size = settings.DOC_WINDOW_CHARS
+    limits = _DocLimits()
+    n = 0
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-        artifacts.append({
-            "type": "text",
-            "text": f"Text file {os.path.basename(file_path)}: {content[:500]}",
-        })
+        with _open_text(file_path) as f:
+            blocks = iter(lambda: f.read(size), "")
+            for window in _windows(blocks, size, settings.DOC_WINDOW_OVERLAP):
+                if limits.exhausted(n):
+                    yield limits.notice("text", "Text file", basename, n, unit="windows")
+                    return
+                n += 1
+                yield ParsedRecord("text", f"Text file {basename}: {window}", {"file": basename, "chunk": n})
     except Exception:
-        artifacts.append({
-            "type": "text",
-            "text": f"Unreadable text file: {os.path.basename(file_path)}",
-        })
-    return artifacts
+        if n == 0:
+            yield ParsedRecord("text", f"Unreadable text file: {basename}")
+        return
+    if n == 0:
+        yield ParsedRecord("text", f"Text file {basename}: ")
 
 
 # ---------- VIDEO PARSER ----------
-def parse_video(file_path: str) -> List[Dict]:
+def parse_video(file_path: Source, name: Optional[str] = None) -> Records:
     # We don’t process actual video content — just metadata.
-    basename = os.path.basename(file_path)
-    return [{
-        "type": "video",
-        "text": f"Video file {basename} (metadata not parsed)",
-    }]
+    basename = _display_name(file_path, name)
+    yield ParsedRecord("video", f"Video file {basename} (metadata not parsed)")
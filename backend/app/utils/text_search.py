@@ -0,0 +1,55 @@
+# app/utils/text_search.py
+"""
+Substring and fuzzy matching over artifact text.
+
+artifacts.extracted_text carries a pg_trgm GIN index (gin_trgm_ops), which
+serves ILIKE '%term%' and the word-similarity operator without a sequential
+scan. Trigrams need three characters, so shorter terms cannot use the
+index. Terms are always escaped: a user's "%" or "_" is literal text, not a
+wildcard that turns a substring lookup into a match-everything scan.
+"""
+from typing import List
+
+from sqlalchemy import Text, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+LIKE_ESCAPE = "\\"
+TRIGRAM_MIN_CHARS = 3
+
+
+def escape_like(term: str) -> str:
+    """`term` with LIKE wildcards and the escape character made literal."""
+    return (
+        term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", LIKE_ESCAPE + "%")
+        .replace("_", LIKE_ESCAPE + "_")
+    )
+
+
+def contains(column, term: str):
+    """Case-insensitive substring match that the trigram index can answer."""
+    return column.ilike(f"%{escape_like(term)}%", escape=LIKE_ESCAPE)
+
+
+def indexable_terms(q: str) -> List[str]:
+    """
+    Whitespace-separated terms of `q`, dropping those too short for a
+    trigram lookup unless nothing longer is left.
+    """
+    terms = [t for t in q.split() if t]
+    long_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_CHARS]
+    return long_terms or terms
+
+
+async def set_word_similarity_threshold(db: AsyncSession, threshold: float) -> None:
+    """Cut-off for the `<%` operator, for the rest of the current transaction."""
+    await db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(float(threshold)), True)))
+
+
+def fuzzy_match(column, q: str):
+    """`q` is similar to some run of words in `column` (pg_trgm `<%`, index-assisted)."""
+    return literal(q, Text).op("<%")(column)
+
+
+def fuzzy_score(column, q: str):
+    return func.word_similarity(q, column)
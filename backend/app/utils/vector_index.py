@@ -0,0 +1,258 @@
+# app/utils/vector_index.py
+"""
+In-process exact vector search over one UFDR's embeddings.
+
+Investigators ask many questions of the same UFDR in a row. With
+VECTOR_INDEX_ENABLED, the first search of a UFDR starts loading its chunk
+and (unchunked) artifact embeddings into one contiguous, L2-normalised
+float32 matrix, and later searches are a single matrix-vector product plus
+argpartition, with no vector scan in Postgres. Until the matrix is
+resident the caller uses pgvector as before.
+
+Matrices are kept per process, LRU by total bytes (VECTOR_INDEX_MAX_BYTES).
+Each UFDR has a version token in Redis that is replaced whenever its
+artifacts change (ingest, backfill, delete); a resident matrix with an old
+token is dropped and reloaded. With VECTOR_INDEX_DIR set, a loaded matrix
+is also written there as <ufdr>-<version>.npy and later memory-mapped, so
+other processes and restarts skip the database read.
+"""
+import asyncio
+import glob
+import json
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_redis, vector_index_version_key
+from app.core.config import settings
+from app.db import session as db_session
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+from app.utils import vector_search  # imports this module; used at call time only
+
+_LOAD_PARTITION = 10_000
+
+
+class ResidentMatrix:
+    """One UFDR's normalised embeddings and, per row, (artifact id, chunk id or None)."""
+
+    __slots__ = ("version", "matrix", "keys")
+
+    def __init__(self, version: str, matrix: np.ndarray, keys: List[list]):
+        self.version = version
+        self.matrix = matrix
+        self.keys = keys
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes)
+
+
+_resident: "OrderedDict[str, ResidentMatrix]" = OrderedDict()
+_resident_bytes = 0
+_loading: Dict[str, asyncio.Task] = {}
+
+
+# ---------- Versions ----------
+async def current_version(ufdr_file_id) -> str:
+    """The UFDR's version token, created on first use (so a flushed Redis never revives old snapshots)."""
+    r = get_redis()
+    key = vector_index_version_key(str(ufdr_file_id))
+    version = await r.get(key)
+    if version is None:
+        await r.set(key, uuid.uuid4().hex, nx=True)
+        version = await r.get(key)
+    return version
+
+
+async def bump_version(ufdr_file_id) -> None:
+    """Mark a UFDR's artifacts as changed; resident copies and snapshots stop matching."""
+    await get_redis().set(vector_index_version_key(str(ufdr_file_id)), uuid.uuid4().hex)
+
+
+# ---------- Residency ----------
+def drop(ufdr_file_id) -> None:
+    global _resident_bytes
+    entry = _resident.pop(str(ufdr_file_id), None)
+    if entry is not None:
+        _resident_bytes -= entry.nbytes
+
+
+def _admit(ufdr_file_id: str, entry: ResidentMatrix) -> bool:
+    global _resident_bytes
+    drop(ufdr_file_id)
+    if entry.nbytes > settings.VECTOR_INDEX_MAX_BYTES:
+        print(f"[VECTOR INDEX] {ufdr_file_id} needs {entry.nbytes} bytes, over the budget; staying on pgvector")
+        return False
+    while _resident and _resident_bytes + entry.nbytes > settings.VECTOR_INDEX_MAX_BYTES:
+        _evicted, old = _resident.popitem(last=False)
+        _resident_bytes -= old.nbytes
+    _resident[ufdr_file_id] = entry
+    _resident_bytes += entry.nbytes
+    return True
+
+
+def resident_stats() -> Dict:
+    return {
+        "ufdrs": len(_resident),
+        "bytes": _resident_bytes,
+        "max_bytes": settings.VECTOR_INDEX_MAX_BYTES,
+        "loading": len(_loading),
+    }
+
+
+# ---------- Loading ----------
+def _snapshot_paths(ufdr_file_id: str, version: str) -> tuple:
+    base = os.path.join(settings.VECTOR_INDEX_DIR, f"{ufdr_file_id}-{version}")
+    return base + ".npy", base + ".keys.json"
+
+
+def _read_snapshot(ufdr_file_id: str, version: str) -> Optional[ResidentMatrix]:
+    if not settings.VECTOR_INDEX_DIR:
+        return None
+    npy, keys_path = _snapshot_paths(ufdr_file_id, version)
+    try:
+        with open(keys_path, "r", encoding="utf-8") as f:
+            keys = json.load(f)
+        return ResidentMatrix(version, np.load(npy, mmap_mode="r"), keys)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(ufdr_file_id: str, entry: ResidentMatrix) -> None:
+    if not settings.VECTOR_INDEX_DIR:
+        return
+    os.makedirs(settings.VECTOR_INDEX_DIR, exist_ok=True)
+    npy, keys_path = _snapshot_paths(ufdr_file_id, entry.version)
+    try:
+        # keys first: a snapshot is only readable once its .npy exists
+        with open(keys_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry.keys, f)
+        os.replace(keys_path + ".tmp", keys_path)
+        with open(npy + ".tmp", "wb") as f:
+            np.save(f, entry.matrix)
+        os.replace(npy + ".tmp", npy)
+    except OSError as e:
+        print(f"[VECTOR INDEX] snapshot write failed for {ufdr_file_id}: {e}")
+        return
+    for old in glob.glob(os.path.join(settings.VECTOR_INDEX_DIR, f"{ufdr_file_id}-*")):
+        if not old.startswith((npy, keys_path)):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _normalise(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+
+async def _read_rows(db: AsyncSession, ufdr_file_id) -> ResidentMatrix:
+    # the same rows vector_search.rank_passages ranks: chunks, plus artifacts that have none
+    chunks = select(
+        ArtifactChunk.artifact_id.label("artifact_id"), ArtifactChunk.id.label("chunk_id"),
+        ArtifactChunk.embedding.label("embedding"),
+    ).where(ArtifactChunk.ufdr_file_id == ufdr_file_id, ArtifactChunk.embedding.isnot(None))
+    whole = select(
+        Artifact.id.label("artifact_id"), Artifact.id.label("chunk_id"), Artifact.embedding.label("embedding"),
+    ).where(
+        Artifact.ufdr_file_id == ufdr_file_id,
+        Artifact.embedding.isnot(None),
+        ~exists().where(ArtifactChunk.artifact_id == Artifact.id),
+    )
+    # chunk_id doubles as the artifact id for whole-artifact rows; told apart below
+    stmt = union_all(chunks, whole)
+
+    blocks, keys = [], []
+    result = await db.stream(stmt)
+    async for part in result.partitions(_LOAD_PARTITION):
+        blocks.append(np.asarray([row.embedding for row in part], dtype=np.float32))
+        keys.extend(
+            [str(row.artifact_id), None if row.chunk_id == row.artifact_id else str(row.chunk_id)]
+            for row in part
+        )
+    matrix = np.vstack(blocks) if blocks else np.zeros((0, Artifact.embedding.type.dim), dtype=np.float32)
+    return ResidentMatrix("", _normalise(matrix), keys)
+
+
+async def load(ufdr_file_id, version: Optional[str] = None) -> Optional[ResidentMatrix]:
+    """Make a UFDR resident (snapshot if present, else Postgres). None if it won't fit."""
+    ufdr_file_id = str(ufdr_file_id)
+    version = version or await current_version(ufdr_file_id)
+    entry = await run_in_threadpool(_read_snapshot, ufdr_file_id, version)
+    if entry is None:
+        async with db_session.SessionLocal() as db:
+            entry = await _read_rows(db, ufdr_file_id)
+        entry.version = version
+        await run_in_threadpool(_write_snapshot, ufdr_file_id, entry)
+    return entry if _admit(ufdr_file_id, entry) else None
+
+
+def _schedule_load(ufdr_file_id: str, version: str) -> None:
+    if ufdr_file_id in _loading:
+        return
+
+    async def run():
+        try:
+            await load(ufdr_file_id, version)
+        except Exception as e:
+            print(f"[VECTOR INDEX] load failed for {ufdr_file_id}: {e}")
+        finally:
+            _loading.pop(ufdr_file_id, None)
+
+    _loading[ufdr_file_id] = asyncio.create_task(run())
+
+
+# ---------- Search ----------
+def top_rows(matrix: np.ndarray, q_emb: Sequence[float], top_k: int) -> tuple:
+    """(row indices, cosine similarities) of the `top_k` closest rows, best first."""
+    q = np.asarray(q_emb, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm == 0 or matrix.shape[0] == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+    scores = matrix @ (q / norm)
+    if top_k < scores.shape[0]:
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        idx = np.arange(scores.shape[0])
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return idx, scores[idx]
+
+
+async def _passages(db: AsyncSession, entry: ResidentMatrix, rows: np.ndarray, scores: np.ndarray) -> List[tuple]:
+    # rows deleted since the load are skipped; the next version bump reloads
+    refs = [(*entry.keys[i], float(score)) for i, score in zip(rows, scores)]
+    return await vector_search.load_passages(db, refs)
+
+
+async def search(db: AsyncSession, ufdr_file_id, q_emb: Sequence[float], top_k: int) -> Optional[List[tuple]]:
+    """
+    (artifact_id, text, similarity, chunk_id) passages closest first, like rank_passages, or None
+    when the UFDR is not resident yet (a background load is started) or the
+    index is disabled. The caller then queries pgvector.
+    """
+    if not settings.VECTOR_INDEX_ENABLED:
+        return None
+    ufdr_file_id = str(ufdr_file_id)
+    try:
+        version = await current_version(ufdr_file_id)
+    except Exception:
+        return None  # without Redis a resident copy can't be shown to be current
+
+    entry = _resident.get(ufdr_file_id)
+    if entry is None or entry.version != version:
+        drop(ufdr_file_id)
+        _schedule_load(ufdr_file_id, version)
+        return None
+    _resident.move_to_end(ufdr_file_id)
+
+    rows, scores = await run_in_threadpool(top_rows, entry.matrix, q_emb, top_k)
+    return await _passages(db, entry, rows, scores)
@@ -0,0 +1,143 @@
+# app/utils/vector_search.py
+"""
+Nearest-neighbour queries over pgvector columns, exact or approximate.
+
+artifacts.embedding and artifact_chunks.embedding carry HNSW indexes
+(vector_cosine_ops), so ordering by cosine distance with a LIMIT can be
+answered from the index: fast, but approximate, and the index is global, so
+the per-UFDR filter is applied to the candidates it returns. Small UFDRs
+are cheaper and fully accurate to scan exactly; `auto` picks per UFDR.
+
+Long artifacts were cut into embedded chunks at ingest (artifact_chunks), so
+a query ranks stored chunks directly; artifacts without chunks (short ones,
+or ingested before chunking existed) compete with their whole-text embedding.
+"""
+from typing import List, Literal, Optional, Sequence
+
+from sqlalchemy import cast, exists, func, null, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.artifact import Artifact
+from app.utils import vector_index
+from app.models.artifact_chunk import ArtifactChunk
+
+SEARCH_MODES = ("auto", "exact", "approximate")
+SearchMode = Literal["auto", "exact", "approximate"]
+_ITERATIVE_SCAN = ("off", "strict_order", "relaxed_order")
+
+
+async def resolve_mode(db: AsyncSession, mode: Optional[str], table, ufdr_file_id) -> str:
+    """'exact' or 'approximate'. `auto` counts the UFDR's rows, but never past the threshold."""
+    mode = mode or settings.VECTOR_SEARCH_MODE
+    if mode in ("exact", "approximate"):
+        return mode
+    limit = settings.VECTOR_EXACT_MAX_ROWS
+    capped = select(table.c.id).where(table.c.ufdr_file_id == ufdr_file_id).limit(limit + 1).subquery()
+    n = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+    return "exact" if n <= limit else "approximate"
+
+
+async def use_ann_settings(db: AsyncSession, top_k: int) -> None:
+    """Index scan knobs for the rest of the current transaction."""
+    # SET takes no bind parameters; every value is an int or from a fixed list
+    ef = max(settings.HNSW_EF_SEARCH, top_k)
+    await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef)}"))
+    await db.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.IVFFLAT_PROBES)}"))
+    if settings.HNSW_ITERATIVE_SCAN in _ITERATIVE_SCAN:
+        await db.execute(text(f"SET LOCAL hnsw.iterative_scan = {settings.HNSW_ITERATIVE_SCAN}"))
+
+
+def nearest(
+    columns: Sequence, embedding, filters: Sequence, q_emb, top_k: int, exact: bool, name: str
+):
+    """
+    SELECT `columns` + distance, closest `top_k` first. The exact form reads
+    the filtered rows through a MATERIALIZED CTE, which no index can serve,
+    so every candidate's distance is computed.
+    """
+    if exact:
+        src = select(*columns, embedding).where(*filters).cte(name).prefix_with("MATERIALIZED")
+        columns = [src.c[c.key] for c in columns]
+        embedding = src.c[embedding.key]
+        filters = ()
+    distance = embedding.cosine_distance(q_emb).label("distance")
+    return select(*columns, distance).where(*filters).order_by(distance).limit(top_k)
+
+
+async def rank_passages(
+    db: AsyncSession, ufdr_file_id, q_emb: List[float], top_k: int, exact: bool
+) -> List[tuple]:
+    """
+    Nearest (artifact_id, text, cosine similarity, chunk_id or None)
+    passages: chunks and unchunked artifacts ranked together.
+    """
+    chunk_q = nearest(
+        [
+            ArtifactChunk.artifact_id.label("artifact_id"), ArtifactChunk.text.label("text"),
+            ArtifactChunk.id.label("chunk_id"),
+        ],
+        ArtifactChunk.embedding,
+        [ArtifactChunk.ufdr_file_id == ufdr_file_id, ArtifactChunk.embedding.isnot(None)],
+        q_emb, top_k, exact, name="chunk_candidates",
+    )
+    whole_q = nearest(
+        [
+            Artifact.id.label("artifact_id"), Artifact.extracted_text.label("text"),
+            cast(null(), ArtifactChunk.id.type).label("chunk_id"),
+        ],
+        Artifact.embedding,
+        [
+            Artifact.ufdr_file_id == ufdr_file_id,
+            Artifact.embedding.isnot(None),
+            ~exists().where(ArtifactChunk.artifact_id == Artifact.id),
+        ],
+        q_emb, top_k, exact, name="artifact_candidates",
+    )
+    ranked = union_all(select(chunk_q.subquery()), select(whole_q.subquery())).subquery()
+    res = await db.execute(
+        select(ranked.c.artifact_id, ranked.c.text, ranked.c.distance, ranked.c.chunk_id)
+        .order_by(ranked.c.distance).limit(top_k)
+    )
+    return [
+        (str(art_id), text, 1.0 - float(distance), str(chunk_id) if chunk_id else None)
+        for art_id, text, distance, chunk_id in res.all()
+    ]
+
+
+async def load_passages(db: AsyncSession, refs: Sequence[Sequence]) -> List[tuple]:
+    """
+    Passages for [artifact_id, chunk_id or None, score] references, in the
+    order given: chunk text from the chunk store, or the artifact's own text
+    for unchunked artifacts. References to rows deleted since are skipped.
+    """
+    chunk_ids = [c for _a, c, _s in refs if c]
+    artifact_ids = [a for a, c, _s in refs if not c]
+    texts = {}
+    if chunk_ids:
+        res = await db.execute(select(ArtifactChunk.id, ArtifactChunk.text).where(ArtifactChunk.id.in_(chunk_ids)))
+        texts.update((str(i), t) for i, t in res.all())
+    if artifact_ids:
+        res = await db.execute(select(Artifact.id, Artifact.extracted_text).where(Artifact.id.in_(artifact_ids)))
+        texts.update((str(i), t) for i, t in res.all())
+    return [(a, texts[c or a], s, c) for a, c, s in refs if (c or a) in texts]
+
+
+async def search_passages(
+    db: AsyncSession, ufdr_file_id, q_emb: List[float], top_k: int, mode: Optional[str] = None
+) -> List[tuple]:
+    """rank_passages in the resolved mode; `auto` falls back to exact when the index under-fills."""
+    resident = await vector_index.search(db, ufdr_file_id, q_emb, top_k)
+    if resident is not None:
+        return resident
+
+    resolved = await resolve_mode(db, mode, Artifact.__table__, ufdr_file_id)
+    if resolved == "exact":
+        return await rank_passages(db, ufdr_file_id, q_emb, top_k, exact=True)
+
+    await use_ann_settings(db, top_k)
+    passages = await rank_passages(db, ufdr_file_id, q_emb, top_k, exact=False)
+    if len(passages) < top_k and (mode or settings.VECTOR_SEARCH_MODE) == "auto":
+        # the global index ran out of candidates from this UFDR before filling top_k
+        passages = await rank_passages(db, ufdr_file_id, q_emb, top_k, exact=True)
+    return passages
@@ -6,6 +6,7 @@ import io
 import zipfile
 from pathlib import Path
 
+import numpy as np
 import pytest
 import pytest_asyncio
 import httpx
@@ -84,16 +85,34 @@ async def init_test_db():
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
+    # optional: fuzzy-search tests skip themselves without pg_trgm
+    if engine.dialect.name == "postgresql":
+        try:
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        except Exception as e:
+            print(f"[WARN] Could not create pg_trgm extension: {e}")
+
     yield
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+def fresh_redis_clients(monkeypatch):
+    """Each test runs on its own event loop; never reuse a Redis client bound to a closed one."""
+    import app.core.cache as cache_mod
+    monkeypatch.setattr(cache_mod, "_redis", None)
+    monkeypatch.setattr(cache_mod, "_redis_bytes", None)
+    monkeypatch.setattr(cache_mod, "_local", cache_mod._new_local_tier())
+    monkeypatch.setattr(cache_mod, "_listener", None)
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def clean_db(db_session):
     """Truncate key tables between tests."""
-    tables = ["artifacts", "ufdr_files", "cases", "users", "audit_logs"]
+    tables = ["artifact_chunks", "artifacts", "ingest_jobs", "ufdr_files", "cases", "audit_logs", "users"]
     for table in tables:
         try:
             await db_session.execute(text(f"DELETE FROM {table}"))
@@ -187,6 +206,83 @@ async def investigator_token(investigator_user):
     return create_access_token({"sub": str(investigator_user.id), "role": investigator_user.role})
 
 
+# ---------------------------------------------------
+# 🧭 Embedding vectors
+# ---------------------------------------------------
+def one_hot(*hot: int):
+    """384-dim float32 embedding with 1.0 at each `hot` index; combine them for similar-but-not-equal vectors."""
+    v = np.zeros(384, dtype=np.float32)
+    v[list(hot)] = 1.0
+    return v
+
+
+# ---------------------------------------------------
+# 🧠 Embedding model stub
+# ---------------------------------------------------
+@pytest.fixture()
+def embedding_model_down(monkeypatch):
+    """No embedding model: ingest stores artifacts without vectors, search falls back to text."""
+    import app.utils.embedding_utils as emb_mod
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("embedding model unavailable")
+
+    monkeypatch.setattr(emb_mod, "generate_embedding", unavailable)
+    monkeypatch.setattr(emb_mod, "generate_embeddings", unavailable)
+
+
+@pytest.fixture()
+def fake_embeddings(monkeypatch):
+    """Constant 0.5 vectors instead of the model, embedding cache off; returns the batch sizes it was asked for."""
+    import app.utils.embedding_utils as emb_mod
+    from app.core.config import settings
+
+    batches = []
+
+    def embed(texts, batch_size=None):
+        batches.append(len(texts))
+        return np.full((len(texts), 384), 0.5, dtype=np.float32)
+
+    monkeypatch.setattr(settings, "EMBED_CACHE_ENABLED", False)
+    monkeypatch.setattr(emb_mod, "generate_embeddings", embed)
+    return batches
+
+
+# ---------------------------------------------------
+# 🛠️ Ingest job fixture
+# ---------------------------------------------------
+@pytest.fixture()
+def make_ingest_job(db_session: AsyncSession, tmp_path):
+    """
+    Factory for an ingest job run straight from a local ZIP: writes
+    `content` (ZIP bytes or a {member: data} dict; None for no local copy)
+    to tmp_path, adds its UFDRFile row and a queued IngestJob, and returns
+    (ufdr, job, zip_path). `ufdr_fields` and `job_fields` override columns.
+    """
+    from app.models.ingest_job import IngestJob
+
+    async def make(content, filename="sample.zip", ufdr_fields=None, **job_fields):
+        zip_path = None
+        if content is not None:
+            zip_path = str(tmp_path / filename)
+            if isinstance(content, bytes):
+                Path(zip_path).write_bytes(content)
+            else:
+                with zipfile.ZipFile(zip_path, "w") as zf:
+                    for name, data in content.items():
+                        zf.writestr(name, data)
+
+        ufdr = UFDRFile(**{"filename": filename, "storage_path": f"cognis-ufdr/test/{filename}", **(ufdr_fields or {})})
+        db_session.add(ufdr)
+        await db_session.flush()
+        job = IngestJob(ufdr_file_id=ufdr.id, **{"status": "queued", **job_fields})
+        db_session.add(job)
+        await db_session.commit()
+        return ufdr, job, zip_path
+
+    return make
+
+
 # ---------------------------------------------------
 # 📦 Sample UFDR ZIP fixture
 # ---------------------------------------------------
@@ -204,10 +300,8 @@ async def sample_zip_bytes():
 # 🧠 UFDR Upload Fixture (ensures artifacts exist)
 # ---------------------------------------------------
 @pytest_asyncio.fixture()
-async def uploaded_ufdr(client: AsyncClient, admin_token: str, db_session: AsyncSession, monkeypatch, sample_zip_bytes):
+async def uploaded_ufdr(client: AsyncClient, admin_token: str, db_session: AsyncSession, embedding_model_down, sample_zip_bytes):
     """Upload fake UFDR ZIP and ensure artifacts exist for chat endpoint."""
-    import app.utils.embedding_utils as emb_mod
-    monkeypatch.setattr(emb_mod, "generate_embedding", lambda text: None, raising=False)
 
     files = {"file": ("sample.zip", sample_zip_bytes, "application/zip")}
     headers = {"Authorization": f"Bearer {admin_token}"}
@@ -0,0 +1,39 @@
+# backend/tests/test_ai_utils.py
+from app.utils.ai_utils import build_context, build_forensic_prompt, estimate_tokens
+
+TYPES = {"a": "sms", "b": "note", "c": "call", "d": "chat"}
+
+
+def test_build_context_cuts_off_when_relevance_drops():
+    passages = [("a", "meet at the harbour", 0.8), ("b", "harbour fees", 0.6), ("c", "missed call", 0.3)]
+    context, tokens, ids = build_context(passages, TYPES, token_budget=1000, min_relative_score=0.5)
+    assert ids == ["a", "b"]
+    assert context == "[sms] meet at the harbour\n[note] harbour fees\n"
+    assert tokens == estimate_tokens("[sms] meet at the harbour\n") + estimate_tokens("[note] harbour fees\n")
+
+    # keyword matches carry no score and are packed in the order given
+    _, _, ids = build_context([(p[0], p[1], None) for p in passages], TYPES, token_budget=1000)
+    assert ids == ["a", "b", "c"]
+
+
+def test_build_context_budget_and_duplicates():
+    forwarded = "the package arrives tomorrow at the north gate, bring the keys"
+    passages = [
+        ("a", forwarded, 0.9),
+        ("b", "Fwd: " + forwarded, 0.9),  # the same message forwarded
+        ("c", "x" * 400, 0.85),  # does not fit what is left of the budget
+        ("d", "ok see you", 0.8),
+    ]
+    context, tokens, ids = build_context(passages, TYPES, token_budget=40, min_relative_score=0.5)
+    assert ids == ["a", "d"]
+    assert tokens <= 40
+
+    # an oversized best passage is truncated rather than dropped
+    context, tokens, ids = build_context([("c", "y" * 400, 0.9)], TYPES, token_budget=10)
+    assert ids == ["c"] and tokens == 10 and context.endswith("\n")
+
+
+def test_prompt_includes_context_and_history():
+    prompt = build_forensic_prompt("who?", "[sms] hi\n", prior_messages=[{"role": "user", "text": "hello"}])
+    assert "Context:\n[sms] hi\n" in prompt
+    assert prompt.endswith("User: who?\nAssistant:")
@@ -0,0 +1,45 @@
+# backend/tests/test_bulk_insert.py
+import numpy as np
+import pytest
+from sqlalchemy import select, func
+from app.models.artifact import Artifact
+from app.models.ufdrfile import UFDRFile
+from app.utils.bulk_insert import ArtifactBulkWriter
+
+
+@pytest.mark.asyncio
+async def test_bulk_writer_batches_and_keeps_order(db_session):
+    ufdr = UFDRFile(filename="bulk.zip", storage_path="cognis-ufdr/x/bulk.zip")
+    db_session.add(ufdr)
+    await db_session.commit()
+
+    writer = ArtifactBulkWriter(db_session, batch_size=100)
+    ids = []
+    for i in range(250):
+        vec = np.full(384, i / 1000, dtype=np.float32) if i % 2 == 0 else None
+        ids.append(await writer.write(
+            ufdr_file_id=ufdr.id,
+            type="sms",
+            text=f"message {i}\x00",
+            raw={"n": i},
+            embedding=vec,
+        ))
+        # never more than one batch buffered
+        assert len(writer._rows) < 100
+
+    assert writer.written == 200
+    tail = await writer.flush()
+    assert tail == ids[200:]
+    assert writer.written == 250
+    await db_session.commit()
+
+    count = await db_session.scalar(
+        select(func.count()).select_from(Artifact).where(Artifact.ufdr_file_id == ufdr.id)
+    )
+    assert count == 250
+
+    art = await db_session.get(Artifact, ids[42])
+    assert art.extracted_text == "message 42"
+    assert art.raw == {"n": 42}
+    assert np.allclose(art.embedding, 0.042)
+    assert (await db_session.get(Artifact, ids[43])).embedding is None
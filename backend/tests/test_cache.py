@@ -0,0 +1,195 @@
+# backend/tests/test_cache.py
+import uuid
+import pytest
+from app.core.cache import acquire_lock, release_lock
+
+
+@pytest.mark.asyncio
+async def test_lock_is_exclusive_until_released():
+    key = f"lock:test:{uuid.uuid4().hex}"
+    token = await acquire_lock(key, ttl_seconds=30)
+    assert token
+
+    assert await acquire_lock(key, ttl_seconds=30, wait_seconds=0.3, poll_seconds=0.05) is None
+    assert not await release_lock(key, "not-the-owner")
+    assert await release_lock(key, token)
+
+    again = await acquire_lock(key, ttl_seconds=30)
+    assert again and again != token
+    await release_lock(key, again)
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_coalesces_concurrent_misses():
+    import asyncio
+    from app.core.cache import get_or_compute
+
+    key = f"sf:test:{uuid.uuid4().hex}"
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"answer": 42}
+
+    results = await asyncio.gather(*(get_or_compute(key, compute, expire_seconds=30) for _ in range(5)))
+    assert results == [{"answer": 42}] * 5
+    assert len(calls) == 1
+    # now cached
+    assert await get_or_compute(key, compute, expire_seconds=30) == {"answer": 42}
+    assert len(calls) == 1
+
+    async def boom():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("gemini down")
+
+    failing = f"sf:test:{uuid.uuid4().hex}"
+    outcomes = await asyncio.gather(*(get_or_compute(failing, boom) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_waits_on_other_process():
+    import asyncio
+    from app.core.cache import get_or_compute, set_cached, single_flight_key
+
+    key = f"sf:test:{uuid.uuid4().hex}"
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "mine"
+
+    # another process holds the pending marker and then publishes its result
+    token = await acquire_lock(single_flight_key(key), ttl_seconds=30)
+    waiter = asyncio.create_task(get_or_compute(key, compute, wait_seconds=5))
+    await asyncio.sleep(0.2)
+    await set_cached(key, "theirs")
+    assert await waiter == "theirs" and not calls
+    await release_lock(single_flight_key(key), token)
+
+    # the holder gives up without a result: the waiter takes over
+    key = f"sf:test:{uuid.uuid4().hex}"
+    token = await acquire_lock(single_flight_key(key), ttl_seconds=30)
+    waiter = asyncio.create_task(get_or_compute(key, compute, wait_seconds=5))
+    await asyncio.sleep(0.2)
+    await release_lock(single_flight_key(key), token)
+    assert await waiter == "mine" and len(calls) == 1
+
+    # the holder hangs: the waiter stops waiting and computes
+    key = f"sf:test:{uuid.uuid4().hex}"
+    token = await acquire_lock(single_flight_key(key), ttl_seconds=30)
+    assert await get_or_compute(key, compute, wait_seconds=0.3) == "mine"
+    assert len(calls) == 2
+    await release_lock(single_flight_key(key), token)
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_serves_stale_while_revalidating():
+    import app.core.cache as cache_mod
+    from app.core.cache import get_cached, get_or_compute, get_redis, set_cached_fresh
+
+    key = f"sf:test:{uuid.uuid4().hex}"
+    await set_cached_fresh(key, "old", expire_seconds=60, stale_seconds=60)
+
+    async def compute():
+        return "new"
+
+    assert await get_or_compute(key, compute, expire_seconds=60, stale_seconds=60) == "old"
+    assert key not in cache_mod._refreshing
+
+    await get_redis().delete(f"{key}:fresh")  # TTL passed
+    assert await get_or_compute(key, compute, expire_seconds=60, stale_seconds=60) == "old"
+    await cache_mod._refreshing[key]
+    assert await get_cached(key) == "new"
+    assert await get_or_compute(key, compute, expire_seconds=60, stale_seconds=60) == "new"
+
+
+@pytest.mark.asyncio
+async def test_local_tier_follows_invalidations_from_other_processes():
+    import asyncio
+    import app.core.cache as cache_mod
+
+    key = f"llm:test:{uuid.uuid4().hex}"
+    r = cache_mod.get_redis()
+    await cache_mod.set_cached(key, {"response": "kept"}, 60)
+    for _ in range(50):  # the first write starts this process's listener
+        if (await r.pubsub_numsub(cache_mod.INVALIDATION_CHANNEL))[0][1]:
+            break
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.1)
+    await cache_mod.set_cached(key, {"response": "kept"}, 60)
+    assert key in cache_mod._local
+
+    # another process overwrites the key and announces it
+    await r.set(key, '{"response": "newer"}', ex=60)
+    await r.publish(cache_mod.INVALIDATION_CHANNEL, f"other-process key {key}")
+    for _ in range(50):
+        if key not in cache_mod._local:
+            break
+        await asyncio.sleep(0.05)
+    assert await cache_mod.get_cached(key) == {"response": "newer"}
+
+    cache_mod._apply_announcement("other-process pattern llm:test:*")
+    assert key not in cache_mod._local
+
+
+@pytest.mark.asyncio
+async def test_local_tier_keeps_serving_without_redis(monkeypatch):
+    import app.core.cache as cache_mod
+
+    key = f"search:test:{uuid.uuid4().hex}"
+    await cache_mod.set_cached(key, {"artifact_ids": ["a"]}, 60)
+
+    class _Down:
+        def pipeline(self, *a, **kw):
+            raise cache_mod.redis.ConnectionError("redis is down")
+
+    monkeypatch.setattr(cache_mod, "get_redis_bytes", lambda: _Down())
+    cache_mod._local[key].check_after = 0  # due for a Redis re-check
+    assert await cache_mod.get_cached(key) == {"artifact_ids": ["a"]}
+    with pytest.raises(cache_mod.redis.ConnectionError):
+        await cache_mod.get_cached("search:test:never-cached")
+
+
+@pytest.mark.asyncio
+async def test_del_pattern_clears_local_tier():
+    import app.core.cache as cache_mod
+
+    ufdr = uuid.uuid4().hex
+    await cache_mod.set_cached(f"llm:{ufdr}:q", {"response": "x"}, 60)
+    await cache_mod.del_pattern(f"llm:{ufdr}:*")
+    assert f"llm:{ufdr}:q" not in cache_mod._local
+    assert await cache_mod.get_cached(f"llm:{ufdr}:q") is None
+
+
+def test_codecs_round_trip_and_compress_large_values(monkeypatch):
+    import app.core.cache as cache_mod
+
+    value = {"hits": [["a" * 36, None, 0.91], ["b" * 36, "c" * 36, None]], "text": "harbour " * 2000}
+    for codec in ("json", "orjson", "msgpack"):
+        monkeypatch.setattr(cache_mod.settings, "CACHE_CODEC", codec)
+        blob = cache_mod.encode_value(value)
+        assert blob[:2] == bytes((0xC1, cache_mod.FORMAT_VERSION))
+        assert blob[3] == cache_mod.COMPRESSORS["zstd"][0]
+        assert len(blob) < len(value["text"]) // 10
+        assert cache_mod.decode_value(blob) == value
+    # small values are stored uncompressed
+    assert cache_mod.encode_value({"response": "ok"})[3] == 0
+    # plain JSON written before the header existed still reads
+    assert cache_mod.decode_value(b'{"response": "old"}') == {"response": "old"}
+    with pytest.raises(ValueError):
+        cache_mod.decode_value(bytes((0xC1, 99, 1, 0)) + b"{}")
+
+
+@pytest.mark.asyncio
+async def test_memory_report_groups_by_namespace():
+    import app.core.cache as cache_mod
+
+    key = f"search:{uuid.uuid4().hex}:q"
+    await cache_mod.set_cached(key, {"hits": list(range(100))}, 60)
+    report = await cache_mod.cache_memory_report()
+    assert report["namespaces"]["search"]["keys"] >= 1
+    assert report["namespaces"]["search"]["bytes"] > 0
+    assert report["total_bytes"] >= report["namespaces"]["search"]["bytes"]
+    assert report["local"]["entries"] >= 1
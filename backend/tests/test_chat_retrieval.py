@@ -0,0 +1,122 @@
+# backend/tests/test_chat_retrieval.py
+import json
+import uuid
+import pytest
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+from app.models.ufdrfile import UFDRFile
+import app.api.routes.conversation as conv
+from app.utils.ai_utils import estimate_tokens
+from conftest import one_hot
+
+
+@pytest.mark.asyncio
+async def test_ask_ranks_stored_chunks(client, admin_token, db_session, monkeypatch):
+    ufdr = UFDRFile(filename="chunks.zip", storage_path="cognis-ufdr/x/chunks.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+
+    report = Artifact(
+        id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="document",
+        extracted_text="intro text. the meeting is at the harbour at 9pm.", embedding=one_hot(0),
+    )
+    sms = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms", extracted_text="see you", embedding=one_hot(2))
+    db_session.add_all([report, sms])
+    await db_session.flush()
+    harbour = ArtifactChunk(artifact_id=report.id, ufdr_file_id=ufdr.id, chunk_index=1,
+                            start_offset=12, end_offset=49, text="the meeting is at the harbour at 9pm.", embedding=one_hot(1))
+    db_session.add_all([
+        ArtifactChunk(artifact_id=report.id, ufdr_file_id=ufdr.id, chunk_index=0,
+                      start_offset=0, end_offset=11, text="intro text.", embedding=-one_hot(1)),
+        harbour,
+    ])
+    await db_session.commit()
+
+    prompts = []
+
+    async def fake_llm(ufdr_id, q, prompt):
+        prompts.append(prompt)
+        return "At the harbour."
+
+    async def fake_embedding(text):
+        # closest to the harbour chunk, still fairly close to the sms
+        return (one_hot(1) + 0.8 * one_hot(2)).tolist()
+
+    async def uncached(key, compute, **kwargs):
+        return await compute()
+
+    monkeypatch.setattr(conv, "ask_llm_cached", fake_llm)
+    monkeypatch.setattr(conv, "agenerate_embedding", fake_embedding)
+    monkeypatch.setattr(conv, "get_or_compute", uncached)
+
+    resp = await client.post(
+        f"/api/v1/chat/ask/{ufdr.id}",
+        params={"q": "where is the meeting?", "top_k": 2},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+
+    # the matching chunk wins, and only that slice of the document reaches the prompt
+    assert data["context_ids"][0] == str(report.id)
+    assert "[document] the meeting is at the harbour at 9pm." in prompts[0]
+    assert "intro text." not in prompts[0]
+    # short artifacts have no chunks and compete with their own embedding
+    assert data["context_ids"] == [str(report.id), str(sms.id)]
+    assert "[sms] see you" in prompts[0]
+    assert data["context_tokens"] == sum(
+        estimate_tokens(line) for line in ("[document] the meeting is at the harbour at 9pm.\n", "[sms] see you\n")
+    )
+    assert data["prompt_tokens"] > data["context_tokens"]
+
+    # the search cache keeps references only; texts come back from the chunk store
+    entry = await conv._search_context(str(ufdr.id), "where is the meeting?", 2, None)
+    assert [p[:2] for p in entry["passages"]] == [[str(report.id), str(harbour.id)], [str(sms.id), None]]
+    assert "harbour" not in json.dumps(entry)
+    passages = await conv.load_passages(db_session, entry["passages"])
+    assert [p[1] for p in passages] == ["the meeting is at the harbour at 9pm.", "see you"]
+
+
+@pytest.mark.asyncio
+async def test_exact_and_approximate_paths(db_session, monkeypatch):
+    from sqlalchemy import text
+    from sqlalchemy.dialects import postgresql
+    from app.core.config import settings
+    from app.utils.vector_search import nearest, resolve_mode, use_ann_settings
+
+    ufdr = UFDRFile(filename="ann.zip", storage_path="cognis-ufdr/x/ann.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+    db_session.add_all([
+        Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms", extracted_text=f"m{i}", embedding=one_hot(i))
+        for i in range(5)
+    ])
+    await db_session.commit()
+
+    monkeypatch.setattr(settings, "VECTOR_EXACT_MAX_ROWS", 4)
+    table = Artifact.__table__
+    assert await resolve_mode(db_session, "auto", table, ufdr.id) == "approximate"
+    monkeypatch.setattr(settings, "VECTOR_EXACT_MAX_ROWS", 5)
+    assert await resolve_mode(db_session, "auto", table, ufdr.id) == "exact"
+    assert await resolve_mode(db_session, "approximate", table, ufdr.id) == "approximate"
+
+    def query(exact):
+        return nearest(
+            [Artifact.extracted_text.label("text")], Artifact.embedding,
+            [Artifact.ufdr_file_id == ufdr.id], one_hot(3).tolist(), 2, exact, name="c",
+        )
+
+    async def plan(stmt):
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        return "\n".join(r[0] for r in (await db_session.execute(text("EXPLAIN " + sql))).all())
+
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    await use_ann_settings(db_session, 40)
+    assert (await db_session.execute(text("SHOW hnsw.ef_search"))).scalar() == "100"
+    assert "ix_artifacts_embedding_hnsw" in await plan(query(exact=False))
+    assert "ix_artifacts_embedding_hnsw" not in await plan(query(exact=True))
+
+    for exact in (True, False):
+        rows = (await db_session.execute(query(exact))).all()
+        assert rows[0].text == "m3" and rows[0].distance == pytest.approx(0.0)
+    await db_session.rollback()
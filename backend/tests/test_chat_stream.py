@@ -0,0 +1,177 @@
+# backend/tests/test_chat_stream.py
+import json
+import uuid
+import pytest
+from app.models.artifact import Artifact
+from app.models.ufdrfile import UFDRFile
+import app.api.routes.conversation as conv
+import app.core.llm as llm_mod
+
+
+def _events(body: str):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeLLM:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        for p in self.pieces:
+            yield _Chunk(p)
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_context_then_tokens(client, admin_token, db_session, monkeypatch):
+    ufdr = UFDRFile(filename="stream.zip", storage_path="cognis-ufdr/x/stream.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+    art = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms", extracted_text="meet at the harbour")
+    db_session.add(art)
+    await db_session.commit()
+
+    async def no_embedding(text):
+        return []
+
+    async def uncached(key, compute, **kwargs):
+        return await compute()
+
+    async def fake_stream(ufdr_id, q, prompt):
+        for piece in ("At the ", "harbour", "."):
+            yield piece
+
+    saved = []
+
+    async def fake_save(session_data, db=None):
+        saved.append(json.loads(json.dumps(session_data)))
+
+    monkeypatch.setattr(conv, "agenerate_embedding", no_embedding)
+    monkeypatch.setattr(conv, "get_or_compute", uncached)
+    monkeypatch.setattr(conv, "stream_llm_cached", fake_stream)
+    monkeypatch.setattr(conv, "save_session", fake_save)
+
+    resp = await client.post(
+        f"/api/v1/chat/ask/{ufdr.id}/stream",
+        params={"q": "where is the harbour meeting?"},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+
+    assert [e for e, _ in events] == ["context", "token", "token", "token", "done"]
+    assert events[0][1]["context_ids"] == [str(art.id)]
+    assert events[0][1]["context_tokens"] > 0
+    assert "".join(d["text"] for e, d in events if e == "token") == "At the harbour."
+    assert events[-1][1]["answer"] == "At the harbour."
+    # the session is written once, with the complete answer
+    assert len(saved) == 1
+    assert [m["role"] for m in saved[0]["messages"]][-2:] == ["user", "assistant"]
+    assert saved[0]["messages"][-1]["text"] == "At the harbour."
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_cached_caches_only_complete_answers(monkeypatch):
+    store = {}
+
+    async def fake_get(key, *args, **kwargs):
+        return store.get(key)
+
+    async def fake_set(key, value, expire_seconds=None, stale_seconds=0):
+        store[key] = value
+
+    fake = _FakeLLM(["Hel", "lo", [{"type": "text", "text": " there"}]])
+    monkeypatch.setattr(llm_mod, "llm", fake)
+    monkeypatch.setattr(llm_mod, "get_cached_revalidating", fake_get)
+    monkeypatch.setattr(llm_mod, "set_cached_fresh", fake_set)
+    monkeypatch.setattr(llm_mod.settings, "SEMANTIC_CACHE_ENABLED", False)
+
+    # abandoned after the first piece (client went away): nothing cached
+    stream = llm_mod.stream_llm_cached("u1", "q", "prompt")
+    assert await stream.__anext__() == "Hel"
+    await stream.aclose()
+    assert store == {}
+
+    assert [t async for t in llm_mod.stream_llm_cached("u1", "q", "prompt")] == ["Hel", "lo", " there"]
+    assert list(store.values()) == [{"response": "Hello there"}]
+
+    # a cache hit comes back whole without calling Gemini
+    assert [t async for t in llm_mod.stream_llm_cached("u1", "q", "prompt")] == ["Hello there"]
+    assert fake.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_cached_skips_empty_answers_and_refreshes_stale_ones(monkeypatch):
+    import app.core.cache as cache_mod
+    from app.core.cache import get_cached, get_redis, llm_cache_key, set_cached_fresh
+
+    ufdr_id = uuid.uuid4().hex
+    key = llm_cache_key(ufdr_id, "q")
+    monkeypatch.setattr(llm_mod.settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_mod.settings, "LOCAL_CACHE_MAX_BYTES", 0)  # staleness straight from Redis
+    monkeypatch.setattr(llm_mod, "llm", _FakeLLM(["  ", "\n"]))
+
+    assert [t async for t in llm_mod.stream_llm_cached(ufdr_id, "q", "prompt")] == ["  ", "\n"]
+    assert await get_cached(key) is None
+
+    async def fresh_answer(prompt):
+        return "new answer"
+
+    monkeypatch.setattr(llm_mod, "_generate_response_raw", fresh_answer)
+    await set_cached_fresh(key, {"response": "old answer"}, 60, 60)
+    await get_redis().delete(f"{key}:fresh")  # TTL passed
+
+    assert [t async for t in llm_mod.stream_llm_cached(ufdr_id, "q", "prompt")] == ["old answer"]
+    await cache_mod._refreshing[key]
+    assert await get_cached(key) == {"response": "new answer"}
+
+
+@pytest.mark.asyncio
+async def test_ask_waits_for_a_streaming_answer_to_the_same_question(monkeypatch):
+    import asyncio
+
+    release = asyncio.Event()
+    calls = []
+
+    class _SlowLLM(_FakeLLM):
+        async def astream(self, messages):
+            calls.append("stream")
+            yield _Chunk("At the ")
+            await release.wait()
+            yield _Chunk("harbour.")
+
+    async def raw(prompt):
+        calls.append("raw")
+        return "a second answer"
+
+    ufdr_id = uuid.uuid4().hex
+    monkeypatch.setattr(llm_mod.settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_mod, "llm", _SlowLLM([]))
+    monkeypatch.setattr(llm_mod, "_generate_response_raw", raw)
+
+    stream = llm_mod.stream_llm_cached(ufdr_id, "where?", "prompt")
+    assert await stream.__anext__() == "At the "
+    asked = asyncio.create_task(llm_mod.ask_llm_cached(ufdr_id, "where?", "prompt"))
+    second = asyncio.create_task(_collect(llm_mod.stream_llm_cached(ufdr_id, "where?", "prompt")))
+    await asyncio.sleep(0.2)
+    release.set()
+    assert [t async for t in stream] == ["harbour."]
+
+    assert await asked == "At the harbour."
+    assert await second == ["At the harbour."]
+    assert calls == ["stream"]
+
+
+async def _collect(stream):
+    return [t async for t in stream]
@@ -0,0 +1,22 @@
+# backend/tests/test_chunking.py
+from app.utils.chunking import chunk_spans
+
+
+def test_short_text_needs_no_chunks():
+    assert chunk_spans("short", size=10) == []
+    assert chunk_spans(None) == []
+
+
+def test_chunks_cover_text_with_overlap_on_word_boundaries():
+    text = " ".join(f"word{i}" for i in range(200))
+    spans = chunk_spans(text, size=100, overlap=20)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for (s1, e1), (s2, _e2) in zip(spans, spans[1:]):
+        assert e1 - s1 <= 100
+        assert s2 < e1  # consecutive chunks overlap
+    assert all(text[e] == " " for _s, e in spans[:-1])
+
+
+def test_chunk_count_is_capped():
+    assert len(chunk_spans("x" * 10_000, size=100, overlap=0, max_chunks=5)) == 5
@@ -0,0 +1,119 @@
+# backend/tests/test_embedding_utils.py
+import uuid
+import numpy as np
+import pytest
+import app.utils.embedding_utils as emb_mod
+from app.core import embedding_cache
+from app.core.cache import get_redis_bytes
+from app.core.config import settings
+
+
+class RecordingModel:
+    """Tiny stand-in for SentenceTransformer: embeds a text as [len, first char]."""
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        return np.array([[len(t), ord(t[0])] for t in texts], dtype=np.float64)
+
+
+@pytest.fixture()
+def model(monkeypatch):
+    m = RecordingModel()
+    monkeypatch.setattr(emb_mod, "_model", m)
+    return m
+
+
+def test_generate_embeddings_single_call_input_order(model):
+    texts = ["bb", "", "a", "cccc"]
+    out = emb_mod.generate_embeddings(texts, batch_size=8)
+
+    assert out.dtype == np.float32
+    assert out.flags["C_CONTIGUOUS"]
+    assert out.shape == (4, 2)
+    # one model call, longest first, empty strings never sent to the model
+    assert model.calls == [["cccc", "bb", "a"]]
+    assert out[0].tolist() == [2, ord("b")]
+    assert out[1].tolist() == [0, 0]
+    assert out[2].tolist() == [1, ord("a")]
+    assert out[3].tolist() == [4, ord("c")]
+
+
+def test_generate_embeddings_all_empty(model):
+    out = emb_mod.generate_embeddings(["", ""])
+    assert out.shape == (2, 2)
+    assert not out.any()
+    assert model.calls == []
+
+
+@pytest.mark.asyncio
+async def test_agenerate_embeddings_uses_cache(model, monkeypatch):
+    # unique model name keeps this run's keys apart from anything already cached
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", f"test-{uuid.uuid4().hex}")
+    monkeypatch.setattr(settings, "EMBED_CACHE_ENABLED", True)
+    before = await embedding_cache.embedding_cache_stats()
+
+    first = await emb_mod.agenerate_embeddings(["hello  world", "", "hello world", "bye"])
+    # duplicates after whitespace normalization are embedded once
+    assert model.calls == [["hello world", "bye"]]
+    assert first[0].tolist() == first[2].tolist() == [11, ord("h")]
+    assert not first[1].any()
+
+    second = await emb_mod.agenerate_embeddings(["bye", "hello world", "new"])
+    assert model.calls[-1] == ["new"]
+    assert second[0].tolist() == [3, ord("b")]
+
+    stats = await embedding_cache.embedding_cache_stats()
+    assert stats["hits"] - before["hits"] == 2
+    assert stats["misses"] - before["misses"] == 3
+
+    keys = [embedding_cache.text_key(t) for t in ("hello world", "bye", "new")]
+    r = get_redis_bytes()
+    await r.delete(*keys)
+    await r.zrem(embedding_cache.LRU_KEY, *keys)
+
+
+@pytest.mark.asyncio
+async def test_cache_setting_does_not_change_vectors(model, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", f"test-{uuid.uuid4().hex}")
+    texts = ["hello  world", " bye"]
+
+    monkeypatch.setattr(settings, "EMBED_CACHE_ENABLED", False)
+    uncached = await emb_mod.agenerate_embeddings(texts)
+    monkeypatch.setattr(settings, "EMBED_CACHE_ENABLED", True)
+    cached = await emb_mod.agenerate_embeddings(texts)
+
+    # both paths send the normalized text to the model
+    assert model.calls == [["hello world", "bye"], ["hello world", "bye"]]
+    assert uncached.tolist() == cached.tolist()
+
+    keys = [embedding_cache.text_key(t) for t in ("hello world", "bye")]
+    r = get_redis_bytes()
+    await r.delete(*keys)
+    await r.zrem(embedding_cache.LRU_KEY, *keys)
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", f"test-{uuid.uuid4().hex}")
+    monkeypatch.setattr(embedding_cache, "LRU_KEY", f"emb:lru:test-{uuid.uuid4().hex}")
+    monkeypatch.setattr(settings, "EMBED_CACHE_MAX_ENTRIES", 3)
+    r = get_redis_bytes()
+
+    keys = [embedding_cache.text_key(t) for t in ("a", "b", "c")]
+    vec = np.ones(2, dtype=np.float32)
+    for k in keys:
+        await embedding_cache.put_many({k: vec})
+    await embedding_cache.get_many([keys[0]])  # touch "a" so "b" is the oldest of ours
+
+    keys.append(embedding_cache.text_key("d"))
+    await embedding_cache.put_many({keys[3]: vec})
+    assert await r.exists(keys[0])
+    assert not await r.exists(keys[1])
+    assert await r.zcard(embedding_cache.LRU_KEY) == 3
+
+    await r.delete(embedding_cache.LRU_KEY, *keys)
@@ -0,0 +1,62 @@
+# backend/tests/test_file_utils.py
+import io
+import os
+import hashlib
+import pytest
+from starlette.datastructures import UploadFile
+from app.utils.file_utils import iter_upload_chunks, stream_to_path, UploadTooLargeError
+
+
+@pytest.mark.asyncio
+async def test_stream_to_path_hashes_while_writing(tmp_path):
+    payload = os.urandom(300_000)
+    upload = UploadFile(file=io.BytesIO(payload), filename="x.zip")
+    dest = tmp_path / "x.zip"
+
+    size, digest = await stream_to_path(iter_upload_chunks(upload, 64 * 1024), str(dest))
+
+    assert size == len(payload)
+    assert digest == hashlib.sha256(payload).hexdigest()
+    assert dest.read_bytes() == payload
+
+
+@pytest.mark.asyncio
+async def test_stream_to_path_aborts_over_limit(tmp_path):
+    read_chunks = []
+
+    async def chunks():
+        for i in range(10):
+            read_chunks.append(i)
+            yield b"a" * 1024
+
+    dest = tmp_path / "big.zip"
+    with pytest.raises(UploadTooLargeError):
+        await stream_to_path(chunks(), str(dest), max_bytes=2500)
+
+    # stopped at the third chunk instead of draining the stream
+    assert len(read_chunks) == 3
+    assert not dest.exists()
+
+
+@pytest.mark.asyncio
+async def test_stream_to_path_writes_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+    import app.utils.file_utils as file_utils_mod
+
+    threads = []
+    real_write = file_utils_mod._write_hashed
+
+    def spy(out_f, h, chunk):
+        threads.append(threading.current_thread())
+        real_write(out_f, h, chunk)
+
+    monkeypatch.setattr(file_utils_mod, "_write_hashed", spy)
+
+    async def chunks():
+        for _ in range(3):
+            yield b"z" * 1024
+
+    size, _digest = await stream_to_path(chunks(), str(tmp_path / "z.zip"))
+
+    assert size == 3 * 1024
+    assert len(threads) == 3 and threading.main_thread() not in threads
@@ -0,0 +1,232 @@
+# backend/tests/test_parse_pool.py
+import os
+import time
+import signal
+import zipfile
+import pytest
+import app.utils.parse_pool as pool_mod
+from app.utils.parse_pool import (
+    list_zip_members, parse_member_limited, parse_members_parallel, parse_zip_member
+)
+
+
+def _make_zip(tmp_path, members):
+    zip_path = tmp_path / "ufdr.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(zip_path)
+
+
+def test_parse_members_parallel_yields_every_member(tmp_path):
+    zip_path = _make_zip(tmp_path, {
+        "notes.txt": "owner: Alice",
+        "logs/calls.csv": "number,duration\n" + "".join(f"98765{i},{i}\n" for i in range(500)),
+    })
+    members = list_zip_members(zip_path)
+
+    results = dict(parse_members_parallel(zip_path, members, max_workers=2, timeout=30))
+
+    assert set(results) == {"notes.txt", "logs/calls.csv"}
+    assert len(results["logs/calls.csv"]) == 500
+    assert results["notes.txt"][0].text == "Text file notes.txt: owner: Alice"
+
+
+def test_list_zip_members_skips_unsafe_and_unsupported(tmp_path):
+    zip_path = _make_zip(tmp_path, {
+        "ok.txt": "fine",
+        "../escape.txt": "nope",
+        "/abs.txt": "nope",
+        "binary.bin": "skip",
+    })
+    assert [name for name, _ in list_zip_members(zip_path)] == ["ok.txt"]
+
+
+def test_parse_zip_member_reads_in_place(tmp_path, monkeypatch):
+    zip_path = _make_zip(tmp_path, {"contacts.csv": "name,phone\nAlice,123\n"})
+    monkeypatch.setattr(pool_mod.tempfile, "mkstemp", lambda *a, **k: pytest.fail("spilled to disk"))
+
+    out = parse_zip_member(zip_path, "contacts.csv")
+
+    assert out[0].raw == {"name": "Alice", "phone": "123"}
+
+
+def test_largest_member_is_scheduled_first():
+    assert pool_mod._largest_first([("a.txt", 1), ("b.txt", 1000)]) == ["b.txt", "a.txt"]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGALRM"), reason="member time limit needs SIGALRM")
+def test_member_time_limit(monkeypatch, tmp_path):
+    def stuck(source, name=None):
+        try:
+            time.sleep(5)
+        except Exception:
+            pass  # parsers swallow Exception; the timeout must still get through
+        return iter([])
+
+    monkeypatch.setattr(pool_mod, "parse_member", stuck)
+    started = time.monotonic()
+    out = parse_member_limited(str(tmp_path / "evil.pdf"), timeout=0.2)
+
+    assert time.monotonic() - started < 2
+    assert out[0].type == "parse_error"
+    assert "timed out" in out[0].text
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGALRM"), reason="member time limit needs SIGALRM")
+def test_member_time_limit_keeps_records_read_so_far(monkeypatch, tmp_path):
+    from app.utils.parsers import ParsedRecord
+
+    def slow_pages(source, name=None):
+        yield ParsedRecord("document", "page 1")
+        time.sleep(5)
+        yield ParsedRecord("document", "page 2")
+
+    monkeypatch.setattr(pool_mod, "parse_member", slow_pages)
+    out = parse_member_limited(str(tmp_path / "big.pdf"), timeout=0.2)
+
+    assert [r.type for r in out] == ["document", "parse_error"]
+
+
+def _crash_on_evil(zip_path, member_name, timeout=None):
+    # runs in a pool worker: dies the way a segfaulting native parser would
+    if member_name.startswith("evil"):
+        os._exit(1)
+    return parse_zip_member(zip_path, member_name, timeout)
+
+
+def test_crashing_member_is_blamed_alone(tmp_path, monkeypatch):
+    zip_path = _make_zip(tmp_path, {
+        **{f"note{i}.txt": f"owner {i}" for i in range(8)},
+        "evil.txt": "boom",
+    })
+    monkeypatch.setattr(pool_mod, "parse_zip_member", _crash_on_evil)
+
+    results = dict(parse_members_parallel(zip_path, list_zip_members(zip_path), max_workers=2, timeout=30))
+
+    assert set(results) == {"evil.txt", *(f"note{i}.txt" for i in range(8))}
+    assert [r.text for r in results["evil.txt"]] == ["Parser process crashed: evil.txt"]
+    for i in range(8):
+        assert results[f"note{i}.txt"][0].text == f"Text file note{i}.txt: owner {i}"
+
+
+def _killed_once(zip_path, member_name, timeout=None):
+    # the first member to get here has its worker SIGKILLed; every member parses fine otherwise
+    from app.utils.parsers import ParsedRecord
+
+    try:
+        fd = os.open(os.path.join(os.path.dirname(zip_path), "killed"), os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        return [ParsedRecord("image", f"parsed {member_name}")]
+    os.close(fd)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+async def test_ingest_survives_a_killed_parse_worker(make_ingest_job, fake_embeddings, db_session, monkeypatch):
+    from sqlalchemy import select
+    from app.models.artifact import Artifact
+    from app.utils import ingest
+
+    monkeypatch.setattr(pool_mod, "parse_zip_member", _killed_once)
+    monkeypatch.setattr(ingest.settings, "PARSE_WORKERS", 2)
+    ufdr, job, zip_path = await make_ingest_job(
+        {f"photo{i}.jpg": b"jpeg" for i in range(6)}, filename="killed.zip",
+    )
+
+    finished = await ingest.run_ingest_job(job.id, local_path=zip_path)
+
+    assert finished.status == "done", finished.error
+    texts = (await db_session.execute(
+        select(Artifact.extracted_text).where(Artifact.ufdr_file_id == ufdr.id)
+    )).scalars().all()
+    # the member whose worker was killed is re-run, not recorded as a crash
+    assert sorted(texts) == sorted(f"parsed photo{i}.jpg" for i in range(6))
+
+
+@pytest.mark.asyncio
+async def test_streamed_member_gets_a_parse_deadline(make_ingest_job, fake_embeddings, db_session, monkeypatch):
+    from sqlalchemy import select
+    from app.models.artifact import Artifact
+    from app.utils import ingest
+    from app.utils.parsers import ParsedRecord
+
+    real_iter = ingest.iter_member_records
+
+    def slow_iter(zf, name):
+        if name != "huge.csv":
+            yield from real_iter(zf, name)
+            return
+        for i in range(1000):  # a pathological member that never finishes in time
+            time.sleep(0.02)
+            yield ParsedRecord("sms", f"row {i}")
+
+    monkeypatch.setattr(ingest, "iter_member_records", slow_iter)
+    monkeypatch.setattr(ingest.settings, "PARSE_STREAM_TIMEOUT", 0.3)
+    monkeypatch.setattr(ingest.settings, "INGEST_EMBED_BATCH", 4)
+    ufdr, job, zip_path = await make_ingest_job(
+        {"huge.csv": "a,b\n1,2\n", "notes.txt": "owner: Alice"}, filename="slow.zip",
+    )
+
+    finished = await ingest.run_ingest_job(job.id, local_path=zip_path)
+
+    assert finished.status == "done", finished.error
+    rows = (await db_session.execute(
+        select(Artifact.type, Artifact.extracted_text).where(Artifact.ufdr_file_id == ufdr.id)
+    )).all()
+    errors = [t for kind, t in rows if kind == "parse_error"]
+    assert errors == ["Parsing timed out after 0.3s: huge.csv"]
+    # rows read before the deadline are kept, the other member is unaffected
+    assert 0 < sum(kind == "sms" for kind, _t in rows) < 1000
+    assert any("Alice" in t for kind, t in rows if kind not in ("sms", "parse_error"))
+
+
+@pytest.mark.asyncio
+async def test_timed_out_stream_reader_keeps_its_zip_handle(make_ingest_job, fake_embeddings, db_session, monkeypatch):
+    import asyncio
+    import threading
+    from sqlalchemy import select
+    from app.models.artifact import Artifact
+    from app.utils import ingest
+    from app.utils.parsers import ParsedRecord
+
+    real_iter = ingest.iter_member_records
+    reader = {}
+    finished = threading.Event()
+
+    def late_iter(zf, name):
+        if name != "huge.csv":
+            yield from real_iter(zf, name)
+            return
+        reader["zf"] = zf
+        try:
+            time.sleep(0.6)  # its first batch outlives the deadline
+            zf.read(name)    # then it goes on reading the archive it was given
+            yield ParsedRecord("sms", "late row")
+        except Exception as e:
+            reader["error"] = e
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(ingest, "iter_member_records", late_iter)
+    monkeypatch.setattr(ingest.settings, "PARSE_STREAM_TIMEOUT", 0.2)
+    monkeypatch.setattr(ingest.settings, "INGEST_PARSE_STREAMS", 1)
+    ufdr, job, zip_path = await make_ingest_job(
+        {"huge.csv": "a,b\n1,2\n", "notes.txt": "owner: Alice"}, filename="late.zip",
+    )
+
+    finished_job = await ingest.run_ingest_job(job.id, local_path=zip_path)
+    assert finished_job.status == "done", finished_job.error
+    assert await asyncio.to_thread(finished.wait, 5)
+    await asyncio.sleep(0.05)  # let the done callback run
+
+    assert "error" not in reader
+    assert reader["zf"].fp is None  # released by the abandoned reader, not under it
+    rows = (await db_session.execute(
+        select(Artifact.type, Artifact.extracted_text).where(Artifact.ufdr_file_id == ufdr.id)
+    )).all()
+    assert ("parse_error", "Parsing timed out after 0.2s: huge.csv") in rows
+    assert not any(t == "late row" for _kind, t in rows)
+    # the member after it was read through a fresh handle
+    assert any("Alice" in t for kind, t in rows if kind != "parse_error")
@@ -0,0 +1,148 @@
+# backend/tests/test_parsers.py
+import io
+from app.core.config import settings
+from app.utils.parsers import parse_xml, parse_document, parse_text, _windows
+
+
+def _pdf(pages):
+    """Minimal text PDF, one content stream per page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 712 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>"
+        )
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = b"%PDF-1.4\n", []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+CELLEBRITE = b"""<?xml version="1.0" encoding="utf-8"?>
+<project xmlns="http://pa.cellebrite.com/report/2.0">
+  <decodedData>
+    <modelType type="Contact">
+      <model type="Contact" id="c1">
+        <field name="Name"><value type="String">Alice</value></field>
+        <multiModelField name="Entries">
+          <model type="PhoneNumber"><field name="Value"><value type="String">+15550001</value></field></model>
+          <model type="EmailAddress"><field name="Value"><value type="String">a@x.io</value></field></model>
+        </multiModelField>
+      </model>
+    </modelType>
+    <modelType type="Chat">
+      <model type="Chat" id="ch1">
+        <field name="Source"><value type="String">WhatsApp</value></field>
+        <multiModelField name="Messages">
+          <model type="InstantMessage">
+            <field name="Body"><value type="String">meet at 9</value></field>
+            <field name="SourceApplication"><value type="String">WhatsApp</value></field>
+            <modelField name="From">
+              <model type="Party"><field name="Identifier"><value type="String">+15550002</value></field></model>
+            </modelField>
+          </model>
+        </multiModelField>
+      </model>
+    </modelType>
+    <modelType type="Call">
+      <model type="Call">
+        <field name="Direction"><value type="String">Incoming</value></field>
+        <field name="Duration"><value type="TimeSpan">00:01:05</value></field>
+        <multiModelField name="Parties">
+          <model type="Party"><field name="Identifier"><value type="String">+15550003</value></field></model>
+        </multiModelField>
+      </model>
+      <model type="SMS">
+        <field name="Body"><value type="String">code 4411</value></field>
+        <multiModelField name="Parties">
+          <model type="Party">
+            <field name="Identifier"><value type="String">+15550004</value></field>
+            <field name="Role"><value type="String">From</value></field>
+          </model>
+        </multiModelField>
+      </model>
+    </modelType>
+  </decodedData>
+</project>
+"""
+
+
+def test_parse_xml_cellebrite_models():
+    records = list(parse_xml(io.BytesIO(CELLEBRITE), "report.xml"))
+
+    assert [(r.type, r.text) for r in records] == [
+        ("contact", "Alice - +15550001"),
+        ("whatsapp", "WhatsApp from +15550002: meet at 9"),
+        ("call", "Call from +15550003, duration 00:01:05"),
+        ("message", "SMS from +15550004: code 4411"),
+    ]
+    assert records[0].raw == {"model": "Contact", "Name": "Alice"}
+
+
+def test_parse_xml_generic_tags_single_pass():
+    xml = (
+        b"<root><contacts><contact name='Bob' number='123'/></contacts>"
+        b"<sms address='555'><body>hi</body></sms>"
+        b"<message sender='Eve' body='yo'/><call number='777' duration='42'/></root>"
+    )
+    records = parse_xml(io.BytesIO(xml))
+
+    assert next(records).text == "Bob - 123"  # yields before the document is fully read
+    assert [r.text for r in records] == [
+        "SMS from 555: hi", "WhatsApp from Eve: yo", "Call to 777, duration 42s"
+    ]
+
+
+def test_parse_xml_truncated_keeps_earlier_records():
+    xml = b"<root><contact name='Bob'/><sms address='1'><body>cut"
+    assert [r.type for r in parse_xml(io.BytesIO(xml))] == ["contact"]
+
+
+def test_windows_overlap_without_repeating_the_tail():
+    assert list(_windows(["abcdef", "ghij"], 4, 1)) == ["abcd", "defg", "ghij"]
+    assert list(_windows(["abc"], 4, 1)) == ["abc"]
+
+
+def test_pdf_yields_one_record_per_page(monkeypatch):
+    monkeypatch.setattr(settings, "DOC_MAX_PAGES", 3)
+    pdf = _pdf([f"page number {i}" for i in range(1, 6)])
+
+    records = list(parse_document(io.BytesIO(pdf), "report.pdf"))
+
+    assert [r.raw.get("page") for r in records[:3]] == [1, 2, 3]
+    assert "page number 3" in records[2].text
+    assert records[-1].raw["truncated"] == "page limit (3)"
+    assert records[-1].raw["total"] == 5
+
+
+def test_docx_and_text_are_windowed(monkeypatch):
+    import docx
+    monkeypatch.setattr(settings, "DOC_WINDOW_CHARS", 50)
+    monkeypatch.setattr(settings, "DOC_WINDOW_OVERLAP", 10)
+
+    doc = docx.Document()
+    for i in range(10):
+        doc.add_paragraph(f"paragraph {i} " + "x" * 20)
+    buf = io.BytesIO()
+    doc.save(buf)
+    chunks = list(parse_document(io.BytesIO(buf.getvalue()), "memo.docx"))
+    assert len(chunks) > 5 and all(r.type == "document" for r in chunks)
+    assert "paragraph 9" in chunks[-1].text
+
+    text = "".join(f"line {i}\n" for i in range(200))
+    windows = list(parse_text(io.BytesIO(text.encode()), "log.txt"))
+    assert "line 0" in windows[0].text and "line 199" in windows[-1].text
+    assert [r.raw["chunk"] for r in windows] == list(range(1, len(windows) + 1))
+
+    monkeypatch.setattr(settings, "DOC_FULL_TEXT", False)
+    (preview,) = parse_text(io.BytesIO(text.encode()), "log.txt")
+    assert len(preview.text) == len("Text file log.txt: ") + 500
@@ -0,0 +1,234 @@
+# backend/tests/test_resumable_upload.py
+import hashlib
+import pytest
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.artifact import Artifact
+from app.models.ufdrfile import UFDRFile
+import app.api.routes.ufdr as ufdr_routes
+
+
+class FakeMultipart:
+    """In-memory stand-in for the MinIO multipart calls the routes make."""
+    def __init__(self):
+        self.parts = {}
+        self.objects = {}
+        self.aborted = []
+
+    def create(self, object_name, content_type="application/zip"):
+        return f"mp-{object_name}"
+
+    def upload(self, object_name, upload_id, part_number, data):
+        self.parts[(upload_id, part_number)] = data
+        return hashlib.md5(data).hexdigest()
+
+    def complete(self, object_name, upload_id, parts):
+        self.objects[f"cognis-ufdr/{object_name}"] = b"".join(self.parts[(upload_id, n)] for n, _ in sorted(parts))
+        return f"cognis-ufdr/{object_name}"
+
+    def abort(self, object_name, upload_id):
+        self.aborted.append(upload_id)
+
+    def list_parts(self, object_name, upload_id):
+        return [
+            (n, hashlib.md5(data).hexdigest(), len(data))
+            for (uid, n), data in sorted(self.parts.items()) if uid == upload_id
+        ]
+
+    def object_size(self, object_name):
+        data = self.objects.get(f"cognis-ufdr/{object_name}")
+        return None if data is None else len(data)
+
+    # what a client PUTting to the presigned URLs amounts to
+    def client_put(self, url, data):
+        kind, object_name, upload_id, n = url.split("|")
+        if kind == "object":
+            self.objects[f"cognis-ufdr/{object_name}"] = data
+        else:
+            self.parts[(upload_id, int(n))] = data
+
+    def download(self, storage_path, file_path, chunk_size=1024 * 1024):
+        data = self.objects[storage_path]
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return len(data), hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture()
+def storage(monkeypatch, embedding_model_down):
+    fake = FakeMultipart()
+    monkeypatch.setattr(ufdr_routes, "create_multipart_upload", fake.create)
+    monkeypatch.setattr(ufdr_routes, "upload_part", fake.upload)
+    monkeypatch.setattr(ufdr_routes, "complete_multipart_upload", fake.complete)
+    monkeypatch.setattr(ufdr_routes, "abort_multipart_upload", fake.abort)
+    monkeypatch.setattr(ufdr_routes, "list_uploaded_parts", fake.list_parts)
+    monkeypatch.setattr(ufdr_routes, "object_size", fake.object_size)
+    monkeypatch.setattr(ufdr_routes, "presigned_put_url", lambda obj: f"object|{obj}||")
+    monkeypatch.setattr(ufdr_routes, "presigned_part_url", lambda obj, uid, n: f"part|{obj}|{uid}|{n}")
+    monkeypatch.setattr("app.utils.ingest.download_from_minio", fake.download)
+    return fake
+
+
+def _put(client, headers, upload_id, n, data, checksum=None):
+    return client.put(
+        f"/api/v1/ufdr/uploads/{upload_id}/chunks/{n}",
+        content=data,
+        headers={**headers, "X-Chunk-SHA256": checksum or hashlib.sha256(data).hexdigest()},
+    )
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_roundtrip(client, admin_token, storage, monkeypatch, sample_zip_bytes, db_session):
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    monkeypatch.setattr(ufdr_routes, "MIN_PART_SIZE", 100)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    first, second = sample_zip_bytes[:150], sample_zip_bytes[150:]
+
+    resp = await client.post(
+        "/api/v1/ufdr/uploads", headers=headers, json={"filename": "phone.zip", "size": len(sample_zip_bytes)}
+    )
+    assert resp.status_code == 200, resp.text
+    upload_id = resp.json()["upload_id"]
+
+    assert (await _put(client, headers, upload_id, 1, first, checksum="0" * 64)).status_code == 400
+    assert (await _put(client, headers, upload_id, 2, second)).status_code == 409  # out of order
+
+    resp = await _put(client, headers, upload_id, 1, first)
+    assert resp.status_code == 200, resp.text
+    # a retried chunk whose response was lost is accepted again without duplicating it
+    resp = await _put(client, headers, upload_id, 1, first)
+    assert resp.json()["offset"] == 150
+
+    status = (await client.get(f"/api/v1/ufdr/uploads/{upload_id}", headers=headers)).json()
+    assert status["next_part"] == 2 and status["offset"] == 150
+
+    assert (await _put(client, headers, upload_id, 2, second)).status_code == 200
+    resp = await client.post(f"/api/v1/ufdr/uploads/{upload_id}/complete", headers=headers)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["status"] == "done"
+    assert data["artifacts_parsed"] == 3
+
+    # the worker hashed the object while streaming it down
+    ufdr = await db_session.get(UFDRFile, data["id"])
+    await db_session.refresh(ufdr)
+    assert ufdr.file_hash == hashlib.sha256(sample_zip_bytes).hexdigest()
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    assert len(res.scalars().all()) == 3
+
+    # the session is gone once completed
+    assert (await client.get(f"/api/v1/ufdr/uploads/{upload_id}", headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_only_last_chunk_may_be_small(client, admin_token, storage):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await client.post("/api/v1/ufdr/uploads", headers=headers, json={"filename": "phone.zip"})
+    upload_id = resp.json()["upload_id"]
+
+    assert (await _put(client, headers, upload_id, 1, b"tiny")).status_code == 200
+    resp = await _put(client, headers, upload_id, 2, b"more")
+    assert resp.status_code == 400
+
+    assert (await client.delete(f"/api/v1/ufdr/uploads/{upload_id}", headers=headers)).status_code == 200
+    assert len(storage.aborted) == 1
+    assert (await client.get(f"/api/v1/ufdr/uploads/{upload_id}", headers=headers)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_direct_multipart_upload(client, admin_token, storage, monkeypatch, sample_zip_bytes, db_session):
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    monkeypatch.setattr(settings, "DIRECT_UPLOAD_SINGLE_MAX", 100)
+    monkeypatch.setattr(settings, "DIRECT_UPLOAD_PART_SIZE", 150)
+    monkeypatch.setattr(ufdr_routes, "MIN_PART_SIZE", 100)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    size = len(sample_zip_bytes)
+
+    resp = await client.post(
+        "/api/v1/ufdr/uploads/direct", headers=headers, json={"filename": "phone.zip", "size": size}
+    )
+    assert resp.status_code == 200, resp.text
+    plan = resp.json()
+    upload_id, part_size = plan["upload_id"], plan["part_size"]
+    assert plan["multipart"] and part_size == 150
+    assert [p["part_number"] for p in plan["parts"]] == list(range(1, plan["part_count"] + 1))
+
+    # chunks never go through the API for a direct upload
+    assert (await _put(client, headers, upload_id, 1, sample_zip_bytes[:150])).status_code == 409
+
+    storage.client_put(plan["parts"][0]["url"], sample_zip_bytes[:part_size])
+    assert (await client.post(f"/api/v1/ufdr/uploads/{upload_id}/complete", headers=headers)).status_code == 400
+
+    # resuming: only the missing parts are signed again
+    status = (await client.get(f"/api/v1/ufdr/uploads/{upload_id}", headers=headers)).json()
+    assert status["offset"] == part_size
+    assert [p["part_number"] for p in status["parts"]] == list(range(2, plan["part_count"] + 1))
+    for p in status["parts"]:
+        start = (p["part_number"] - 1) * part_size
+        storage.client_put(p["url"], sample_zip_bytes[start:start + part_size])
+
+    resp = await client.post(f"/api/v1/ufdr/uploads/{upload_id}/complete", headers=headers)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["status"] == "done" and data["size"] == size
+    assert data["artifacts_parsed"] == 3
+
+    ufdr = await db_session.get(UFDRFile, data["id"])
+    await db_session.refresh(ufdr)
+    assert ufdr.file_hash == hashlib.sha256(sample_zip_bytes).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_direct_single_put_upload(client, admin_token, storage, monkeypatch, sample_zip_bytes):
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    resp = await client.post(
+        "/api/v1/ufdr/uploads/direct", headers=headers,
+        json={"filename": "phone.zip", "size": len(sample_zip_bytes)},
+    )
+    plan = resp.json()
+    assert not plan["multipart"] and len(plan["parts"]) == 1
+
+    # a truncated PUT is caught at completion; the client can simply PUT again
+    storage.client_put(plan["parts"][0]["url"], sample_zip_bytes[:-10])
+    resp = await client.post(f"/api/v1/ufdr/uploads/{plan['upload_id']}/complete", headers=headers)
+    assert resp.status_code == 400
+    storage.client_put(plan["parts"][0]["url"], sample_zip_bytes)
+
+    resp = await client.post(f"/api/v1/ufdr/uploads/{plan['upload_id']}/complete", headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["artifacts_parsed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_complete_retry_after_failed_record(client, admin_token, storage, monkeypatch, sample_zip_bytes):
+    from fastapi import HTTPException
+
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await client.post(
+        "/api/v1/ufdr/uploads/direct", headers=headers,
+        json={"filename": "phone.zip", "size": len(sample_zip_bytes)},
+    )
+    plan = resp.json()
+    storage.client_put(plan["parts"][0]["url"], sample_zip_bytes)
+
+    real_record = ufdr_routes._record_upload
+    calls = []
+
+    async def flaky_record(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPException(status_code=500, detail="database unavailable")
+        return await real_record(*args, **kwargs)
+
+    monkeypatch.setattr(ufdr_routes, "_record_upload", flaky_record)
+    url = f"/api/v1/ufdr/uploads/{plan['upload_id']}/complete"
+    assert (await client.post(url, headers=headers)).status_code == 500
+
+    # the session survived, so the retry records the object already assembled
+    resp = await client.post(url, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["artifacts_parsed"] == 3
+    assert (await client.post(url, headers=headers)).status_code == 404
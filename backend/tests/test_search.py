@@ -0,0 +1,158 @@
+# backend/tests/test_search.py
+import uuid
+import pytest
+from app.models.artifact import Artifact
+from app.models.ufdrfile import UFDRFile
+import app.api.routes.search as search_mod
+from conftest import one_hot
+
+
+def test_reciprocal_rank_fusion():
+    rows = search_mod.reciprocal_rank_fusion([["a", "b"], ["c", "a"]], k=60)
+    assert [r[0] for r in rows] == ["a", "c", "b"]
+    assert rows[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert rows[1][2:] == [None, 1]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_and_paginates(client, admin_token, db_session, monkeypatch):
+    ufdr = UFDRFile(filename="search.zip", storage_path="cognis-ufdr/x/search.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+
+    both = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms",
+                    extracted_text="meeting at the harbour tonight", embedding=one_hot(1))
+    fts_only = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="note",
+                        extracted_text="harbour fees invoice", embedding=one_hot(2))
+    vec_only = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="chat",
+                        extracted_text="see you at the dock", embedding=one_hot(1, 3))
+    far = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="call",
+                   extracted_text="missed call", embedding=-one_hot(1))
+    db_session.add_all([both, fts_only, vec_only, far])
+    await db_session.commit()
+
+    store, embeds = {}, []
+
+    async def fake_get_or_compute(key, compute, **kwargs):
+        if key not in store:
+            store[key] = await compute()
+        return store[key]
+
+    async def fake_embedding(text):
+        embeds.append(text)
+        return one_hot(1).tolist()
+
+    monkeypatch.setattr(search_mod, "get_or_compute", fake_get_or_compute)
+    monkeypatch.setattr(search_mod, "agenerate_embedding", fake_embedding)
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    params = {"q": "harbour", "limit": 2, "search_mode": "exact"}
+    resp = await client.get(f"/api/v1/search/{ufdr.id}", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    first = resp.json()
+
+    # found by both rankers beats found by either; FTS-only and vector-only follow
+    assert [r["id"] for r in first["results"]] == [str(both.id), str(fts_only.id)]
+    assert first["total"] == 4
+    assert "<mark>harbour</mark>" in first["results"][0]["snippet"]
+    assert first["results"][0]["vector_rank"] == 1
+    assert first["next_cursor"]
+
+    resp = await client.get(
+        f"/api/v1/search/{ufdr.id}", params={**params, "cursor": first["next_cursor"]}, headers=headers
+    )
+    assert resp.status_code == 200, resp.text
+    second = resp.json()
+    assert [r["id"] for r in second["results"]] == [str(vec_only.id), str(far.id)]
+    assert second["results"][0]["fts_rank"] is None
+    assert second["next_cursor"] is None
+    # the second page was served from the cached hit list
+    assert embeds == ["harbour"]
+
+    resp = await client.get(f"/api/v1/search/{ufdr.id}", params={**params, "cursor": "%%%"}, headers=headers)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_does_not_cache_without_vector_side(client, admin_token, db_session, monkeypatch):
+    ufdr = UFDRFile(filename="novec.zip", storage_path="cognis-ufdr/x/novec.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+    hit = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms",
+                   extracted_text="meeting at the harbour tonight", embedding=one_hot(1))
+    db_session.add(hit)
+    await db_session.commit()
+
+    stored = {}
+
+    async def fake_get_or_compute(key, compute, cacheable=None, **kwargs):
+        if key not in stored:
+            value = await compute()
+            if cacheable is not None and not cacheable(value):
+                return value
+            stored[key] = value
+        return stored[key]
+
+    async def embedding_down(text):
+        raise ConnectionError("embedding service down")
+
+    monkeypatch.setattr(search_mod, "get_or_compute", fake_get_or_compute)
+    monkeypatch.setattr(search_mod, "agenerate_embedding", embedding_down)
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await client.get(f"/api/v1/search/{ufdr.id}", params={"q": "harbour"}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert [r["id"] for r in resp.json()["results"]] == [str(hit.id)]
+    assert stored == {}
+
+    async def embedding_up(text):
+        return one_hot(1).tolist()
+
+    monkeypatch.setattr(search_mod, "agenerate_embedding", embedding_up)
+    resp = await client.get(f"/api/v1/search/{ufdr.id}", params={"q": "harbour"}, headers=headers)
+    assert resp.json()["results"][0]["vector_rank"] == 1
+    assert len(stored) == 1
+
+
+def test_escape_like():
+    from app.utils.text_search import escape_like, indexable_terms
+    assert escape_like("100%_done\\") == "100\\%\\_done\\\\"
+    assert indexable_terms("call 98765 at 9") == ["call", "98765"]
+    assert indexable_terms("at 9") == ["at", "9"]
+
+
+@pytest.mark.asyncio
+async def test_artifacts_substring_and_fuzzy(client, admin_token, db_session):
+    from sqlalchemy import text
+
+    ufdr = UFDRFile(filename="trgm.zip", storage_path="cognis-ufdr/x/trgm.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+    number = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="call", extracted_text="+91 98765 43210 outgoing")
+    name = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="contact", extracted_text="Mohammed Rahman, driver")
+    percent = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="note", extracted_text="battery at 100% now")
+    db_session.add_all([number, name, percent])
+    await db_session.commit()
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    url = f"/api/v1/artifacts/list/{ufdr.id}"
+
+    async def ids(**params):
+        resp = await client.get(url, params=params, headers=headers)
+        assert resp.status_code == 200, resp.text
+        return {a["id"] for a in resp.json()}
+
+    # stemmed FTS can't see inside a number; substring can
+    assert await ids(q="9876") == set()
+    assert await ids(q="9876", match="substring") == {str(number.id)}
+    # wildcards in the term are literal
+    assert await ids(q="%", match="substring") == {str(percent.id)}
+    assert await ids(q="9_7", match="substring") == set()
+
+    has_trgm = (await db_session.execute(
+        text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+    )).scalar_one()
+    if not has_trgm:
+        pytest.skip("pg_trgm is not installed")
+    assert await ids(q="Muhammad Rahman", match="fuzzy", threshold=0.5) == {str(name.id)}
+    assert await ids(q="Muhammad Rahman", match="fuzzy", threshold=0.95) == set()
@@ -0,0 +1,93 @@
+# backend/tests/test_semantic_cache.py
+import uuid
+import pytest
+import app.core.llm as llm_mod
+from app.core.semantic_cache import lookup, remember, semantic_cache_stats
+from conftest import one_hot
+
+
+# paraphrases share an embedding direction; the unrelated question does not
+EMBEDDINGS = {
+    "Who did the suspect call on Monday?": (one_hot(0) + 0.1 * one_hot(1)).tolist(),
+    "Which person did the suspect phone on Monday?": (one_hot(0) + 0.12 * one_hot(1)).tolist(),
+    "List the bitcoin wallets found": (0.1 * one_hot(0) + one_hot(1)).tolist(),
+}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    calls = []
+
+    async def fake_embedding(text):
+        return EMBEDDINGS[text]
+
+    async def fake_generate(prompt):
+        calls.append(prompt)
+        return f"answer to: {prompt}"
+
+    monkeypatch.setattr(llm_mod, "agenerate_embedding", fake_embedding)
+    monkeypatch.setattr(llm_mod, "_generate_response_raw", fake_generate)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_reuses_answer(fake_llm):
+    ufdr = uuid.uuid4().hex
+    before = await semantic_cache_stats()
+
+    first = await llm_mod.ask_llm_cached(ufdr, "Who did the suspect call on Monday?", "p1")
+    again = await llm_mod.ask_llm_cached(ufdr, "Which person did the suspect phone on Monday?", "p2")
+    assert again == first == "answer to: p1"
+    assert fake_llm == ["p1"]
+
+    other = await llm_mod.ask_llm_cached(ufdr, "List the bitcoin wallets found", "p3")
+    assert other == "answer to: p3"
+    assert fake_llm == ["p1", "p3"]
+
+    after = await semantic_cache_stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_skips_the_semantic_tier(fake_llm, monkeypatch):
+    ufdr = uuid.uuid4().hex
+    q = "Who did the suspect call on Monday?"
+    await llm_mod.ask_llm_cached(ufdr, q, "p1")
+    before = await semantic_cache_stats()
+
+    async def no_embedding(text):
+        raise AssertionError("an exact hit must not embed the question")
+
+    monkeypatch.setattr(llm_mod, "agenerate_embedding", no_embedding)
+    assert await llm_mod.ask_llm_cached(ufdr, q, "p2") == "answer to: p1"
+    after = await semantic_cache_stats()
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
+
+
+@pytest.mark.asyncio
+async def test_answers_are_not_shared_across_ufdrs(fake_llm):
+    q = "Who did the suspect call on Monday?"
+    await llm_mod.ask_llm_cached(uuid.uuid4().hex, q, "p1")
+    await llm_mod.ask_llm_cached(uuid.uuid4().hex, q, "p2")
+    assert fake_llm == ["p1", "p2"]
+
+
+@pytest.mark.asyncio
+async def test_index_is_bounded_and_skips_expired_answers(monkeypatch):
+    from app.core.cache import delete_cached, get_redis_bytes, set_cached
+
+    monkeypatch.setattr(llm_mod.settings, "SEMANTIC_CACHE_MAX_PER_UFDR", 2)
+    ufdr = uuid.uuid4().hex
+    for i in range(3):
+        await set_cached(f"llm:{ufdr}:{i}", {"response": str(i)}, 60)
+        await remember(ufdr, f"llm:{ufdr}:{i}", one_hot(i))
+    # oldest question evicted
+    assert await lookup(ufdr, one_hot(0)) is None
+    assert await get_redis_bytes().hlen(f"llm:{ufdr}:sem") == 2
+
+    # an answer that has expired is not served, and its entry goes
+    await delete_cached(f"llm:{ufdr}:2")
+    assert await lookup(ufdr, one_hot(2)) is None
+    assert await get_redis_bytes().hlen(f"llm:{ufdr}:sem") == 1
+    assert await lookup(ufdr, one_hot(1)) == {"response": "1"}
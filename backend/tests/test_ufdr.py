@@ -1,28 +1,29 @@
 # backend/tests/test_ufdr.py
+import hashlib
+import zipfile
 import pytest
 from sqlalchemy import select
 from app.models.artifact import Artifact
 from app.models.ufdrfile import UFDRFile
+from app.models.ingest_job import IngestJob
+from app.utils.ingest import run_ingest_job
+from app.utils.parsers import ParsedRecord
 
 
-@pytest.mark.asyncio
-async def test_ufdr_upload_and_parsing(client, admin_token, monkeypatch, sample_zip_bytes, db_session):
-    # patch embedding to avoid external model call during upload
-    try:
-        monkeypatch.setattr("app.utils.embedding_utils.generate_embedding", lambda text: None)
-    except Exception:
-        import app.utils.embedding_utils as emb_mod
-        emb_mod.generate_embedding = lambda text: None
+def _blank_or_text(zip_path, member_name, timeout=None):
+    return [ParsedRecord("text", "  \n\t" if member_name == "blank.jpg" else "meeting at the docks")]
+
 
+@pytest.mark.asyncio
+async def test_ufdr_upload_and_parsing(client, admin_token, embedding_model_down, sample_zip_bytes, db_session):
+    # no external model call during upload
     files = {"file": ("sample.zip", sample_zip_bytes, "application/zip")}
     headers = {"Authorization": f"Bearer {admin_token}"}
     resp = await client.post("/api/v1/ufdr/upload", headers=headers, files=files)
     assert resp.status_code == 200, resp.text
     data = resp.json()
 
-    assert "artifacts_parsed" in data
-    assert int(data["artifacts_parsed"]) >= 1
-
+    assert "job_id" in data
     ufdr_id = data["id"]
 
     # verify UFDR row exists
@@ -31,7 +32,406 @@ async def test_ufdr_upload_and_parsing(client, admin_token, monkeypatch, sample_
     assert uf is not None
     assert uf.filename is not None
 
+    # run the queued job the way an ingestion worker would
+    job = await run_ingest_job(data["job_id"], worker="test")
+    assert job.status == "done", job.error
+
+    resp = await client.get(f"/api/v1/ufdr/jobs/{data['job_id']}", headers=headers)
+    assert resp.status_code == 200, resp.text
+    status = resp.json()
+    assert status["status"] == "done"
+    assert set(["extract", "parse", "embed", "insert"]) <= set(status["progress"])
+    assert status["progress"]["insert"]["done"] >= 1
+
     # verify at least one artifact created
     res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr_id))
     arts = res.scalars().all()
     assert len(arts) >= 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_from_local_zip(make_ingest_job, sample_zip_bytes, db_session, embedding_model_down):
+    ufdr, job, zip_path = await make_ingest_job(sample_zip_bytes)
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "done", done.error
+    assert done.progress["parse"]["done"] == 2      # contacts.csv + notes.txt
+    assert done.progress["insert"]["done"] == done.progress["artifacts"] == 3
+
+    # a redelivered job that already finished is a no-op
+    again = await run_ingest_job(job.id, local_path=zip_path)
+    assert again.status == "done"
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    assert len(res.scalars().all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_finished_ingest_clears_results_cached_while_it_ran(make_ingest_job, sample_zip_bytes, embedding_model_down):
+    from app.core.cache import get_cached, llm_cache_key, search_cache_key, set_cached
+
+    ufdr, job, zip_path = await make_ingest_job(sample_zip_bytes)
+
+    # what /search and /chat/ask would have cached before any artifact existed
+    search_key = search_cache_key(str(ufdr.id), "alice")
+    llm_key = llm_cache_key(str(ufdr.id), "who is alice?")
+    await set_cached(search_key, {"hits": []}, 3600)
+    await set_cached(llm_key, {"answer": "No evidence found."}, 3600)
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "done", done.error
+    assert await get_cached(search_key) is None
+    assert await get_cached(llm_key) is None
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_lease(monkeypatch, make_ingest_job, sample_zip_bytes, db_session, embedding_model_down):
+    import asyncio
+    from datetime import datetime, timedelta
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_HEARTBEAT_INTERVAL", 0.05)
+    ufdr, job, zip_path = await make_ingest_job(
+        sample_zip_bytes, status="running", worker="other", heartbeat_at=datetime.utcnow(),
+    )
+
+    # a live worker holds it: the redelivered job is left alone
+    held = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert held.status == "running" and held.worker == "other"
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    assert res.scalars().all() == []
+
+    # once its heartbeat is older than the claim idle time, the job is taken over
+    job.heartbeat_at = datetime.utcnow() - timedelta(milliseconds=settings.INGEST_CLAIM_IDLE_MS + 1000)
+    await db_session.commit()
+    beats = []
+
+    async def heartbeat():
+        beats.append(1)
+
+    async def slow_store():
+        await asyncio.sleep(0.3)  # renewed while a long download or upload is underway
+
+    done = await run_ingest_job(
+        job.id, local_path=zip_path, worker="test", heartbeat=heartbeat, store=slow_store,
+    )
+    assert done.status == "done", done.error
+    assert done.worker == "test"
+    assert len(beats) >= 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_pipeline_runs_in_small_batches(monkeypatch, make_ingest_job, fake_embeddings, db_session):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_EMBED_BATCH", 7)
+    monkeypatch.setattr(settings, "INGEST_INSERT_BATCH", 5)
+    monkeypatch.setattr(settings, "INGEST_QUEUE_DEPTH", 1)
+    ufdr, job, zip_path = await make_ingest_job({
+        "sms.csv": "sender,body\n" + "".join(f"+1555{i},msg {i}\n" for i in range(40)),
+        "clip.mp4": b"\x00",
+    }, filename="big.zip")
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "done", done.error
+    assert done.progress["artifacts"] == 41
+    assert max(fake_embeddings) == 7 and sum(fake_embeddings) == 41
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    arts = res.scalars().all()
+    assert len(arts) == 41
+    assert all(a.embedding is not None for a in arts)
+    assert {a.type for a in arts} == {"csv_record", "video"}
+
+
+def _hashed(zip_bytes):
+    # the content hash uploads are deduplicated by
+    return {"file_hash": hashlib.sha256(zip_bytes).hexdigest()}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_clones_instead_of_reingesting(
+    client, admin_token, monkeypatch, make_ingest_job, sample_zip_bytes, db_session, embedding_model_down
+):
+    source, job, zip_path = await make_ingest_job(sample_zip_bytes, "source.zip", _hashed(sample_zip_bytes))
+    assert (await run_ingest_job(job.id, local_path=zip_path)).status == "done"
+
+    def no_minio(*args, **kwargs):
+        raise AssertionError("duplicate content must not be uploaded again")
+
+    monkeypatch.setattr("app.api.routes.ufdr.upload_to_minio", no_minio)
+    monkeypatch.setattr("app.utils.ingest._ingest", no_minio)
+
+    files = {"file": ("again.zip", sample_zip_bytes, "application/zip")}
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await client.post("/api/v1/ufdr/upload", headers=headers, files=files)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+
+    assert data["deduplicated_from"] == str(source.id)
+    assert data["status"] == "queued"  # the clone runs on a worker, not in the request
+    assert data["storage_path"] == source.storage_path
+
+    done = await run_ingest_job(data["job_id"], worker="test")
+    assert done.status == "done", done.error
+    assert done.progress["artifacts"] == 3
+    assert done.progress["deduplicated_from"] == str(source.id)
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == data["id"]))
+    clones = res.scalars().all()
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == source.id))
+    originals = res.scalars().all()
+    assert sorted(a.extracted_text for a in clones) == sorted(a.extracted_text for a in originals)
+    assert not {a.id for a in clones} & {a.id for a in originals}
+
+
+@pytest.mark.asyncio
+async def test_inline_duplicate_of_unfinished_upload_parses_its_own_copy(
+    client, admin_token, monkeypatch, make_ingest_job, sample_zip_bytes, db_session, embedding_model_down
+):
+    import asyncio
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    monkeypatch.setattr(settings, "INGEST_CLONE_POLL", 60)
+    source, _job, _zip_path = await make_ingest_job(sample_zip_bytes, "source.zip", _hashed(sample_zip_bytes))  # still queued
+
+    files = {"file": ("again.zip", sample_zip_bytes, "application/zip")}
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await asyncio.wait_for(
+        client.post("/api/v1/ufdr/upload", headers=headers, files=files), timeout=30,
+    )
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["deduplicated_from"] == str(source.id)
+    assert data["status"] == "done"
+    assert data["artifacts_parsed"] == 3
+
+    job = await db_session.get(IngestJob, data["job_id"])
+    assert "deduplicated_from" not in job.progress
+    assert job.progress["parse"]["state"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_dedup_only_considers_uploads_the_uploader_can_see(
+    make_ingest_job, sample_zip_bytes, db_session, admin_user, investigator_user, embedding_model_down
+):
+    from app.models.case import Case
+    from app.models.case_assignment import CaseAssignment
+    from app.utils.ingest import find_dedup_source
+
+    source, job, zip_path = await make_ingest_job(sample_zip_bytes, "source.zip", _hashed(sample_zip_bytes))
+    other_case = Case(title="someone else's case")
+    db_session.add(other_case)
+    await db_session.flush()
+    source.case_id = other_case.id
+    await db_session.commit()
+    assert (await run_ingest_job(job.id, local_path=zip_path)).status == "done"
+
+    # same evidence in a case the investigator isn't on: not even its existence is revealed
+    assert await find_dedup_source(db_session, source.file_hash, investigator_user) == (None, None)
+    found, _ = await find_dedup_source(db_session, source.file_hash, admin_user)
+    assert found.id == source.id
+
+    db_session.add(CaseAssignment(case_id=other_case.id, user_id=investigator_user.id))
+    await db_session.commit()
+    found, _ = await find_dedup_source(db_session, source.file_hash, investigator_user)
+    assert found.id == source.id
+
+
+@pytest.mark.asyncio
+async def test_duplicate_job_waits_for_source_then_clones(monkeypatch, make_ingest_job, sample_zip_bytes, embedding_model_down):
+    import asyncio
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_CLONE_POLL", 0.05)
+    source, source_job, zip_path = await make_ingest_job(sample_zip_bytes, "source.zip", _hashed(sample_zip_bytes))
+    _dup, dup_job, _ = await make_ingest_job(None, "dup.zip", {
+        "storage_path": source.storage_path,
+        "file_hash": source.file_hash,
+        "meta": {"deduplicated_from": str(source.id)},
+    })
+
+    waiting = asyncio.ensure_future(run_ingest_job(dup_job.id, worker="test"))
+    await asyncio.sleep(0.2)
+    assert not waiting.done()  # source not ingested yet
+
+    await run_ingest_job(source_job.id, local_path=zip_path)
+    done = await asyncio.wait_for(waiting, timeout=10)
+
+    assert done.status == "done", done.error
+    assert done.progress["deduplicated_from"] == str(source.id)
+    assert done.progress["parse"]["state"] == "skipped"
+    assert done.progress["artifacts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_inline_upload_stores_to_minio_while_parsing(client, admin_token, monkeypatch, fake_embeddings, db_session):
+    import io
+    import time
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_ASYNC", False)
+    monkeypatch.setattr(settings, "INGEST_EMBED_BATCH", 4)
+    monkeypatch.setattr(settings, "INGEST_INSERT_BATCH", 3)
+    monkeypatch.setattr(settings, "INGEST_PARSE_STREAMS", 2)
+    monkeypatch.setattr(settings, "INGEST_EMBED_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "INGEST_INSERT_CONCURRENCY", 2)
+    stored = []
+
+    def slow_minio(file_path, object_name):
+        time.sleep(0.3)
+        stored.append(object_name)
+        return f"cognis-ufdr/{object_name}"
+
+    monkeypatch.setattr("app.api.routes.ufdr.upload_to_minio", slow_minio)
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("sms.csv", "sender,body\n" + "".join(f"+1555{i},msg {i}\n" for i in range(20)))
+        zf.writestr("calls.csv", "number,duration\n" + "".join(f"+1666{i},{i}\n" for i in range(10)))
+        zf.writestr("notes.txt", "inline pipeline")
+    files = {"file": ("inline.zip", buf.getvalue(), "application/zip")}
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    resp = await client.post("/api/v1/ufdr/upload", headers=headers, files=files)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["status"] == "done"
+    assert data["artifacts_parsed"] == 31
+    assert data["storage_path"] == f"cognis-ufdr/{stored[0]}"
+
+    job = await db_session.get(IngestJob, data["job_id"])
+    progress = job.progress
+    assert progress["upload"]["state"] == "done"
+    assert progress["upload"]["busy_s"] >= 0.3
+    assert progress["embed"]["workers"] == 2 and progress["insert"]["workers"] == 2
+    # the upload overlapped parsing instead of preceding it
+    assert progress["parse"]["elapsed_s"] < progress["upload"]["elapsed_s"] + progress["parse"]["busy_s"] + 0.3
+    assert progress["bottleneck"] in ("upload", "parse", "embed", "insert")
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == data["id"]))
+    assert len(res.scalars().all()) == 31
+
+
+@pytest.mark.asyncio
+async def test_failed_store_fails_job_without_committing_artifacts(
+    monkeypatch, make_ingest_job, sample_zip_bytes, db_session, embedding_model_down
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "INGEST_INSERT_CONCURRENCY", 2)
+    ufdr, job, zip_path = await make_ingest_job(sample_zip_bytes)
+
+    async def broken_store():
+        raise ConnectionError("minio down")
+
+    done = await run_ingest_job(job.id, local_path=zip_path, store=broken_store)
+    assert done.status == "failed"
+    assert "Storage upload failed" in done.error
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    assert res.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_removes_batches_committed_by_other_insert_workers(
+    monkeypatch, make_ingest_job, fake_embeddings, db_session
+):
+    from app.core.config import settings
+    from app.models.artifact_chunk import ArtifactChunk
+    from app.utils import ingest
+
+    monkeypatch.setattr(settings, "INGEST_INSERT_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "INGEST_EMBED_BATCH", 4)
+    monkeypatch.setattr(settings, "INGEST_INSERT_BATCH", 4)
+    monkeypatch.setattr(settings, "CHUNK_CHARS", 200)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 20)
+    writers = []
+
+    class _Writer(ingest.ArtifactBulkWriter):
+        def __init__(self, db, *args, **kwargs):
+            super().__init__(db, *args, **kwargs)
+            if not writers:
+                # the job's own session: its commit fails once, after the extra worker's went through
+                commit = db.commit
+
+                async def lost_commit():
+                    db.commit = commit
+                    raise ConnectionError("connection lost")
+
+                db.commit = lost_commit
+            writers.append(self)
+
+    monkeypatch.setattr(ingest, "ArtifactBulkWriter", _Writer)
+
+    ufdr, job, zip_path = await make_ingest_job({
+        "sms.csv": "sender,body\n" + "".join(f"+1555{i},{'words ' * 50}{i}\n" for i in range(40)),
+    }, filename="many.zip")
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "failed" and "connection lost" in done.error
+    assert len(writers) == 2 and all(w.written for w in writers)
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    assert res.scalars().all() == []
+    res = await db_session.execute(select(ArtifactChunk).where(ArtifactChunk.ufdr_file_id == ufdr.id))
+    assert res.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_long_artifacts_are_chunked_at_ingest_and_cloned(monkeypatch, make_ingest_job, fake_embeddings, db_session):
+    from app.core.config import settings
+    from app.models.artifact_chunk import ArtifactChunk
+    from app.utils.ingest import clone_artifacts
+
+    monkeypatch.setattr(settings, "CHUNK_CHARS", 200)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 20)
+    ufdr, job, zip_path = await make_ingest_job({
+        "sms.csv": "sender,body\n+1555,short message\n+1556," + "long words " * 60 + "\n",
+    }, filename="long.zip")
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "done", done.error
+    assert done.progress["artifacts"] == 2
+
+    res = await db_session.execute(select(ArtifactChunk).where(ArtifactChunk.ufdr_file_id == ufdr.id))
+    chunks = sorted(res.scalars().all(), key=lambda c: c.chunk_index)
+    assert len(chunks) > 1 and len({c.artifact_id for c in chunks}) == 1
+    long_art = await db_session.get(Artifact, chunks[0].artifact_id)
+    assert all(long_art.extracted_text[c.start_offset:c.end_offset] == c.text for c in chunks)
+    assert all(c.embedding is not None for c in chunks)
+
+    copy = UFDRFile(filename="copy.zip", storage_path=ufdr.storage_path)
+    db_session.add(copy)
+    await db_session.commit()
+    assert await clone_artifacts(db_session, ufdr.id, copy) == 2
+    await db_session.commit()
+
+    res = await db_session.execute(select(ArtifactChunk).where(ArtifactChunk.ufdr_file_id == copy.id))
+    cloned = res.scalars().all()
+    assert len(cloned) == len(chunks)
+    (owner,) = {c.artifact_id for c in cloned}
+    assert (await db_session.get(Artifact, owner)).ufdr_file_id == copy.id
+
+
+@pytest.mark.asyncio
+async def test_whitespace_only_artifacts_get_no_embedding(monkeypatch, make_ingest_job, db_session):
+    import app.utils.parse_pool as pool_mod
+    from app.utils import ingest
+
+    async def fake_embeddings(texts):
+        # a whitespace-only text would come back as the zero vector
+        return [[1.0 if t.strip() else 0.0] + [0.0] * 383 for t in texts]
+
+    monkeypatch.setattr(pool_mod, "parse_zip_member", _blank_or_text)
+    monkeypatch.setattr(ingest.embedding_utils, "agenerate_embeddings", fake_embeddings)
+
+    ufdr, job, zip_path = await make_ingest_job({"notes.jpg": b"jpeg", "blank.jpg": b"jpeg"}, filename="blank.zip")
+
+    done = await run_ingest_job(job.id, local_path=zip_path, worker="test")
+    assert done.status == "done", done.error
+
+    res = await db_session.execute(select(Artifact).where(Artifact.ufdr_file_id == ufdr.id))
+    arts = {a.extracted_text.strip(): a for a in res.scalars().all()}
+    assert arts["meeting at the docks"].embedding is not None
+    assert arts[""].embedding is None
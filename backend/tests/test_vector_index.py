@@ -0,0 +1,108 @@
+# backend/tests/test_vector_index.py
+import uuid
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.models.artifact import Artifact
+from app.models.artifact_chunk import ArtifactChunk
+from app.models.ufdrfile import UFDRFile
+from app.utils import vector_index
+from app.utils.vector_search import rank_passages, search_passages
+from conftest import one_hot
+
+
+def _same(got, expected):
+    assert [p[:2] for p in got] == [p[:2] for p in expected]
+    assert [p[2] for p in got] == pytest.approx([p[2] for p in expected], abs=1e-5)
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_ENABLED", True)
+    monkeypatch.setattr(vector_index, "_resident", vector_index.OrderedDict())
+    monkeypatch.setattr(vector_index, "_resident_bytes", 0)
+    monkeypatch.setattr(vector_index, "_loading", {})
+
+
+async def _ufdr_with_passages(db_session, n_short=3):
+    ufdr = UFDRFile(filename="idx.zip", storage_path="cognis-ufdr/x/idx.zip")
+    db_session.add(ufdr)
+    await db_session.flush()
+    doc = Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="document", extracted_text="a b", embedding=one_hot(0))
+    shorts = [
+        Artifact(id=uuid.uuid4(), ufdr_file_id=ufdr.id, type="sms", extracted_text=f"sms {i}", embedding=one_hot(i + 2, 50))
+        for i in range(n_short)
+    ]
+    db_session.add_all([doc, *shorts])
+    await db_session.flush()
+    db_session.add_all([
+        ArtifactChunk(artifact_id=doc.id, ufdr_file_id=ufdr.id, chunk_index=0, start_offset=0, end_offset=1,
+                      text="a", embedding=one_hot(1) * 3),
+        ArtifactChunk(artifact_id=doc.id, ufdr_file_id=ufdr.id, chunk_index=1, start_offset=2, end_offset=3,
+                      text="b", embedding=one_hot(2)),
+    ])
+    await db_session.commit()
+    return ufdr, doc, shorts
+
+
+def test_top_rows_orders_by_cosine():
+    matrix = vector_index._normalise(np.array([[1, 0], [0, 1], [1, 1], [-1, 0]], dtype=np.float32))
+    rows, scores = vector_index.top_rows(matrix, [2.0, 0.1], 2)
+    assert rows.tolist() == [0, 2]
+    assert scores[0] == pytest.approx(2.0 / np.hypot(2.0, 0.1))
+    assert vector_index.top_rows(matrix, [0.0, 1.0], 10)[0].tolist()[:2] == [1, 2]
+    assert vector_index.top_rows(matrix, [0.0, 0.0], 2)[0].size == 0
+
+
+@pytest.mark.asyncio
+async def test_resident_search_matches_pgvector(db_session):
+    ufdr, doc, shorts = await _ufdr_with_passages(db_session)
+    q = (one_hot(1) + 0.5 * one_hot(2) + 0.2 * one_hot(50)).tolist()
+
+    # not resident yet: pgvector answers and a background load starts
+    assert await vector_index.search(db_session, ufdr.id, q, 3) is None
+    await vector_index._loading[str(ufdr.id)]
+    entry = vector_index._resident[str(ufdr.id)]
+    assert entry.matrix.shape == (5, 384) and entry.matrix.flags["C_CONTIGUOUS"]
+
+    resident = await vector_index.search(db_session, ufdr.id, q, 3)
+    expected = await rank_passages(db_session, ufdr.id, q, 3, exact=True)
+    _same(resident, expected)
+    assert resident[0][:2] == (str(doc.id), "a")
+    _same(await search_passages(db_session, ufdr.id, q, 3), expected)
+
+    # artifacts changed: the resident copy no longer counts
+    await vector_index.bump_version(ufdr.id)
+    assert await vector_index.search(db_session, ufdr.id, q, 3) is None
+    await vector_index._loading[str(ufdr.id)]
+    _same(await vector_index.search(db_session, ufdr.id, q, 3), expected)
+
+
+@pytest.mark.asyncio
+async def test_lru_by_bytes_and_snapshots(db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_DIR", str(tmp_path))
+    first, *_ = await _ufdr_with_passages(db_session)
+    second, *_ = await _ufdr_with_passages(db_session)
+    one = 5 * 384 * 4
+    monkeypatch.setattr(settings, "VECTOR_INDEX_MAX_BYTES", one + one // 2)
+
+    await vector_index.load(first.id)
+    await vector_index.load(second.id)
+    assert list(vector_index._resident) == [str(second.id)]
+    assert vector_index.resident_stats()["bytes"] == one
+
+    # the evicted UFDR comes back from its snapshot, memory-mapped, without Postgres
+    async def no_db(*args, **kwargs):
+        raise AssertionError("snapshot should have been used")
+
+    read_rows = vector_index._read_rows
+    monkeypatch.setattr(vector_index, "_read_rows", no_db)
+    entry = await vector_index.load(first.id)
+    assert isinstance(entry.matrix, np.memmap)
+    assert list(vector_index._resident) == [str(first.id)]
+
+    # a new version replaces the old snapshot files
+    monkeypatch.setattr(vector_index, "_read_rows", read_rows)
+    await vector_index.bump_version(first.id)
+    await vector_index.load(first.id)
+    assert len([p for p in tmp_path.iterdir() if p.name.startswith(str(first.id))]) == 2